@@ -0,0 +1,124 @@
+"""Sliding-window TPM/RPM admission control for LLM calls."""
+
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+DEFAULT_PRIORITY = 2
+
+
+class AdmissionController:
+    """Sliding-window TPM/RPM limiter with a priority queue of waiting calls."""
+
+    def __init__(
+        self,
+        tpm: int,
+        rpm: int,
+        window: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.tpm = max(1, tpm)
+        self.rpm = max(1, rpm)
+        self.window = window
+        self._clock = clock
+        self._requests: Deque[float] = deque()
+        self._tokens: Deque[Tuple[float, int]] = deque()
+        self._tokens_in_window = 0
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._paused_until = 0.0
+
+    # ── budget bookkeeping ───────────────────────────────────────────
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._requests and self._requests[0] <= cutoff:
+            self._requests.popleft()
+        while self._tokens and self._tokens[0][0] <= cutoff:
+            self._tokens_in_window -= self._tokens.popleft()[1]
+
+    def _fits(self, tokens: int) -> bool:
+        if len(self._requests) >= self.rpm:
+            return False
+        # A single call bigger than the whole budget runs once the window is empty.
+        return self._tokens_in_window + min(tokens, self.tpm) <= self.tpm
+
+    def _record(self, now: float, tokens: int) -> None:
+        self._requests.append(now)
+        self._tokens.append((now, tokens))
+        self._tokens_in_window += tokens
+
+    def reconcile(self, estimated: int, actual: int) -> None:
+        """Replace an admitted call's estimate with the provider-reported usage."""
+        delta = actual - estimated
+        if delta:
+            self._tokens.append((self._clock(), delta))
+            self._tokens_in_window += delta
+
+    def pause(self, seconds: float) -> None:
+        """Stop admitting calls for a while (e.g. after a 429 with Retry-After)."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w[3].done())
+
+    # ── scheduling ───────────────────────────────────────────────────
+
+    async def acquire(self, tokens: int, priority: int = DEFAULT_PRIORITY) -> None:
+        """Wait until a call of ``tokens`` estimated tokens fits the quota."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._waiters, self._timer = loop, [], None
+        fut = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, fut))
+        self._dispatch()
+        await fut
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Admit a call only if it fits right now and nothing is queued ahead.
+
+        Used for optional traffic (hedges) that should soak up spare quota
+        but never delay a queued call.
+        """
+        now = self._clock()
+        self._expire(now)
+        if now < self._paused_until or self.queued or not self._fits(tokens):
+            return False
+        self._record(now, tokens)
+        return True
+
+    def _dispatch(self) -> None:
+        now = self._clock()
+        self._expire(now)
+        while self._waiters and now >= self._paused_until:
+            _, _, tokens, fut = self._waiters[0]
+            if fut.done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if not self._fits(tokens):
+                break
+            heapq.heappop(self._waiters)
+            self._record(now, tokens)
+            fut.set_result(None)
+        if self._waiters and self._timer is None:
+            self._timer = self._loop.call_later(self._next_wakeup(now), self._on_timer)
+
+    def _next_wakeup(self, now: float) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+        oldest = min(
+            (self._requests[0] if self._requests else now),
+            (self._tokens[0][0] if self._tokens else now),
+        )
+        return max(0.01, oldest + self.window - now)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
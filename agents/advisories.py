@@ -0,0 +1,363 @@
+"""Offline known-vulnerability checks for changed dependencies.
+
+``import_advisories.py`` turns OSV-format dumps (the per-ecosystem
+``all.zip`` files, directories or single ``.json`` advisories) into a
+compact index at ``ADVISORY_INDEX_FILE``. Every package version a PR
+introduces (``agents.lockfiles.new_versions``) is looked up in that index
+and matched against the advisory's affected ranges with the ecosystem's
+own version ordering (semver for npm, crates.io and Go; PEP 440 for PyPI;
+Maven's and RubyGems' rules). Matches become ``ReviewComment``s directly,
+without an LLM call.
+"""
+
+from __future__ import annotations
+import functools
+import json
+import math
+import os
+import re
+import zipfile
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agents.lockfiles import ECOSYSTEMS, new_versions
+from agents.types import SEVERITY_CODES, ReviewComment, ReviewResult
+from config import ADVISORY_INDEX_FILE
+
+INDEX_FORMAT = 1
+MAX_ADVISORIES_PER_VERSION = 5  # one comment lists at most this many
+
+# ── Version ordering per ecosystem ───────────────────────────────────
+# Each key function returns a tuple that orders like the ecosystem's
+# versions, or None when the string is not a version of that ecosystem.
+
+_SEMVER = re.compile(r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.\-]+))?(?:\+[0-9A-Za-z.\-]+)?$")
+_PEP440 = re.compile(
+    r"^v?(?:(\d+)!)?(\d+(?:\.\d+)*)"
+    r"(?:[-_.]?(a|alpha|b|beta|c|rc|pre|preview)[-_.]?(\d*))?"
+    r"(?:-(\d+)|[-_.]?(?:post|rev|r)[-_.]?(\d*))?"
+    r"(?:[-_.]?dev[-_.]?(\d*))?(?:\+[a-z0-9.]+)?$",
+    re.I,
+)
+_PEP440_PHASES = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+_MAVEN_QUALIFIERS = {
+    "alpha": 1, "a": 1, "beta": 2, "b": 2, "milestone": 3, "m": 3, "rc": 4, "cr": 4,
+    "snapshot": 5, "": 6, "ga": 6, "final": 6, "release": 6, "sp": 7,
+}
+_SEGMENTS = re.compile(r"\d+|[A-Za-z]+")
+
+
+def semver_key(version: str) -> Optional[Tuple]:
+    m = _SEMVER.match(version.strip())
+    if not m:
+        return None
+    major, minor, patch, pre = m.groups()
+    release = (int(major), int(minor or 0), int(patch or 0))
+    if pre is None:
+        return release + (1, ())
+    ids = tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in pre.split("."))
+    return release + (0, ids)
+
+
+def pep440_key(version: str) -> Optional[Tuple]:
+    m = _PEP440.match(version.strip())
+    if not m:
+        return None
+    epoch, release, phase, pre_n, post_implicit, post_n, dev_n = m.groups()
+    parts = [int(p) for p in release.split(".")]
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    post = post_implicit or post_n
+    if phase:
+        pre = (_PEP440_PHASES[phase.lower()], int(pre_n or 0))
+    elif dev_n is not None and post is None:
+        pre = (-1, 0)  # 1.0.dev1 sorts before 1.0a1
+    else:
+        pre = (3, 0)
+    post_key = (1, int(post or 0)) if post is not None else (0, 0)
+    dev_key = (0, int(dev_n or 0)) if dev_n is not None else (1, 0)
+    return (int(epoch or 0), tuple(parts), pre, post_key, dev_key)
+
+
+def maven_key(version: str) -> Optional[Tuple]:
+    if not version.strip():
+        return None
+    items = []
+    for token in _SEGMENTS.findall(version.lower()):
+        if token.isdigit():
+            items.append((2, int(token), ""))
+        else:
+            while items and items[-1] == (2, 0, ""):  # 1.0-alpha == 1-alpha
+                items.pop()
+            items.append((1, _MAVEN_QUALIFIERS.get(token, 8), token))
+    while items and (items[-1] == (2, 0, "") or items[-1][:2] == (1, 6)):  # 1.0-final == 1
+        items.pop()
+    return tuple(items) + ((1, 6, ""),)  # the end sorts like a release: 1-alpha < 1 < 1-sp
+
+
+def rubygems_key(version: str) -> Optional[Tuple]:
+    if not re.match(r"^[0-9]+[0-9A-Za-z.\-]*$", version.strip()):
+        return None
+    items = []
+    for token in _SEGMENTS.findall(version):
+        if not token.isdigit():
+            while items and items[-1] == (3, 0, ""):  # 1.0.0.pre == 1.pre
+                items.pop()
+        items.append((3, int(token), "") if token.isdigit() else (1, 0, token))
+    while items and items[-1] == (3, 0, ""):
+        items.pop()
+    return tuple(items) + ((2, 0, ""),)  # a string segment (pre-release) sorts below the end
+
+
+VERSION_KEYS: Dict[str, Callable[[str], Optional[Tuple]]] = {
+    "npm": semver_key,
+    "crates.io": semver_key,
+    "Go": semver_key,
+    "PyPI": pep440_key,
+    "Maven": maven_key,
+    "RubyGems": rubygems_key,
+}
+
+
+def normalize_name(ecosystem: str, name: str) -> str:
+    if ecosystem == "PyPI":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    return name.lower() if ecosystem in ("npm", "Maven") else name
+
+
+# ── Severity ─────────────────────────────────────────────────────────
+
+_CVSS3_WEIGHTS = {
+    "AV": {"N": 0.85, "A": 0.62, "L": 0.55, "P": 0.2},
+    "AC": {"L": 0.77, "H": 0.44},
+    "UI": {"N": 0.85, "R": 0.62},
+    "C": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "I": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "A": {"H": 0.56, "L": 0.22, "N": 0.0},
+}
+_CVSS3_PR = {"U": {"N": 0.85, "L": 0.62, "H": 0.27}, "C": {"N": 0.85, "L": 0.68, "H": 0.5}}
+
+
+def cvss3_base_score(vector: str) -> Optional[float]:
+    """Base score of a ``CVSS:3.x/...`` vector (None if it is not one)."""
+    if not vector.startswith("CVSS:3"):
+        return None
+    metrics = dict(part.split(":", 1) for part in vector.split("/")[1:] if ":" in part)
+    try:
+        scope = metrics["S"]
+        w = {k: table[metrics[k]] for k, table in _CVSS3_WEIGHTS.items()}
+        privileges = _CVSS3_PR[scope][metrics["PR"]]
+    except KeyError:
+        return None
+    iss = 1 - (1 - w["C"]) * (1 - w["I"]) * (1 - w["A"])
+    if scope == "U":
+        impact = 6.42 * iss
+    else:
+        impact = 7.52 * (iss - 0.029) - 3.25 * (iss - 0.02) ** 15
+    if impact <= 0:
+        return 0.0
+    exploitability = 8.22 * w["AV"] * w["AC"] * privileges * w["UI"]
+    total = impact + exploitability if scope == "U" else 1.08 * (impact + exploitability)
+    return math.ceil(min(total, 10) * 10 - 1e-9) / 10
+
+
+def _severity(osv: dict) -> str:
+    """CRITICAL/HIGH/MODERATE/LOW from the database or the CVSS vector ("" if unknown)."""
+    rating = str((osv.get("database_specific") or {}).get("severity", "")).upper()
+    rating = "MODERATE" if rating == "MEDIUM" else rating
+    if rating in ("CRITICAL", "HIGH", "MODERATE", "LOW"):
+        return rating
+    scores = [s for s in (cvss3_base_score(str(v.get("score", ""))) for v in osv.get("severity") or []) if s is not None]
+    if not scores:
+        return ""
+    score = max(scores)
+    return "CRITICAL" if score >= 9 else "HIGH" if score >= 7 else "MODERATE" if score >= 4 else "LOW"
+
+
+# Known vulnerabilities are critical by the dependency reviewer's rubric;
+# advisories rated moderate or low are toned down.
+REVIEW_SEVERITY = {"CRITICAL": "critical", "HIGH": "critical", "MODERATE": "major", "LOW": "minor", "": "critical"}
+
+
+# ── Index ────────────────────────────────────────────────────────────
+
+
+@dataclass
+class Advisory:
+    """One advisory as it affects one package."""
+
+    id: str
+    summary: str = ""
+    aliases: List[str] = field(default_factory=list)
+    severity: str = ""  # CRITICAL | HIGH | MODERATE | LOW | ""
+    ranges: List[List] = field(default_factory=list)  # [type, [[event, version], ...]]
+    versions: List[str] = field(default_factory=list)  # explicitly listed affected versions
+
+    def affects(self, version: str, key: Callable[[str], Optional[Tuple]]) -> bool:
+        if version in self.versions:
+            return True
+        v = key(version)
+        if v is None:
+            return False
+        for kind, events in self.ranges:
+            if kind not in ("SEMVER", "ECOSYSTEM"):
+                continue  # GIT ranges name commits, not versions
+            if _in_range(v, events, key):
+                return True
+        return False
+
+    def fixed_after(self, version: str, key: Callable[[str], Optional[Tuple]]) -> str:
+        """The lowest fixed version above ``version`` ("" if none is known)."""
+        v = key(version)
+        fixes = [
+            (k, fixed) for _, events in self.ranges for event, fixed in events
+            if event == "fixed" and (k := key(fixed)) is not None and (v is None or k > v)
+        ]
+        return min(fixes)[1] if fixes else ""
+
+
+def _in_range(v: Tuple, events: List[List[str]], key: Callable[[str], Optional[Tuple]]) -> bool:
+    affected = False
+    ordered = sorted(
+        ((() if value == "0" else key(value)), event, value) for event, value in events
+        if value == "0" or key(value) is not None
+    )
+    for bound, event, _ in ordered:
+        if event == "introduced" and v >= bound:
+            affected = True
+        elif event == "fixed" and v >= bound:
+            affected = False
+        elif event == "last_affected" and v > bound:
+            affected = False
+    return affected
+
+
+def _osv_records(path: str) -> Iterator[dict]:
+    """OSV advisories in a zip dump, a directory of JSON files or one JSON file."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                if name.endswith(".json"):
+                    yield json.loads(zf.read(name))
+    elif os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith(".json"):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        yield json.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        yield from (data if isinstance(data, list) else [data])
+
+
+def build_index(paths: Iterable[str]) -> Dict[str, Dict[str, List[dict]]]:
+    """``{ecosystem: {package: [advisory, ...]}}`` from OSV dumps (withdrawn ones skipped)."""
+    index: Dict[str, Dict[str, List[dict]]] = {}
+    for path in paths:
+        for osv in _osv_records(path):
+            if osv.get("withdrawn") or not osv.get("id"):
+                continue
+            severity = _severity(osv)
+            for affected in osv.get("affected") or []:
+                package = affected.get("package") or {}
+                ecosystem = package.get("ecosystem", "")
+                if ecosystem not in VERSION_KEYS or not package.get("name"):
+                    continue
+                index.setdefault(ecosystem, {}).setdefault(normalize_name(ecosystem, package["name"]), []).append({
+                    "id": osv["id"],
+                    "summary": osv.get("summary") or (osv.get("details") or "").split("\n")[0][:200],
+                    "aliases": osv.get("aliases") or [],
+                    "severity": severity,
+                    "ranges": [
+                        [r.get("type", ""), [[k, v] for e in r.get("events") or [] for k, v in e.items()]]
+                        for r in affected.get("ranges") or []
+                    ],
+                    "versions": affected.get("versions") or [],
+                })
+    return index
+
+
+def save_index(index: Dict[str, Dict[str, List[dict]]], path: str = ADVISORY_INDEX_FILE) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"format": INDEX_FORMAT, "ecosystems": index}, f)
+    os.replace(tmp, path)
+
+
+class AdvisoryIndex:
+    """Advisories by ecosystem and normalised package name."""
+
+    def __init__(self, ecosystems: Dict[str, Dict[str, List[dict]]]) -> None:
+        self.ecosystems = ecosystems
+
+    def lookup(self, ecosystem: str, name: str, version: str) -> List[Advisory]:
+        key = VERSION_KEYS[ecosystem]
+        entries = self.ecosystems.get(ecosystem, {}).get(normalize_name(ecosystem, name), [])
+        return [a for a in (Advisory(**e) for e in entries) if a.affects(version, key)]
+
+
+@functools.lru_cache(maxsize=4)
+def _load(path: str, mtime: float) -> Optional[AdvisoryIndex]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != INDEX_FORMAT:
+        return None
+    return AdvisoryIndex(data.get("ecosystems") or {})
+
+
+def get_advisory_index(path: str = ADVISORY_INDEX_FILE) -> Optional[AdvisoryIndex]:
+    """The imported index (None if there is none); reloaded when the file changes."""
+    if not path or not os.path.exists(path):
+        return None
+    return _load(path, os.path.getmtime(path))
+
+
+# ── Review ───────────────────────────────────────────────────────────
+
+
+def _comment(path: str, line: int, name: str, version: str, found: List[Advisory], key) -> ReviewComment:
+    severity = min((REVIEW_SEVERITY.get(a.severity, "critical") for a in found), key=SEVERITY_CODES.index)
+    ids = []
+    for a in found[:MAX_ADVISORIES_PER_VERSION]:
+        cve = next((x for x in a.aliases if x.startswith("CVE-")), "")
+        ids.append(f"{a.id}{f' ({cve})' if cve else ''}: {a.summary}".rstrip(": "))
+    more = f" and {len(found) - MAX_ADVISORIES_PER_VERSION} more" if len(found) > MAX_ADVISORIES_PER_VERSION else ""
+    fixes = [f for f in (a.fixed_after(version, key) for a in found) if f]
+    fix = max(fixes, key=key) if fixes and len(fixes) == len(found) else ""
+    return ReviewComment(
+        file_path=path,
+        line_number=line or None,
+        severity=severity,
+        category="dependency",
+        comment=f"{name} {version} has known vulnerabilities: " + "; ".join(ids) + more,
+        suggestion=f"Upgrade {name} to {fix} or later." if fix else "No fixed version is known; replace or isolate this dependency.",
+        confidence=0.95,
+    )
+
+
+def scan_advisories(file_changes: List[dict], index: Optional[AdvisoryIndex] = None) -> Optional[ReviewResult]:
+    """Findings for dependency versions the PR introduces (None without an index or dependency files)."""
+    files = [fc for fc in file_changes if os.path.basename(fc["path"]) in ECOSYSTEMS]
+    index = index or get_advisory_index()
+    if index is None or not files:
+        return None
+    comments, checked = [], 0
+    for fc in files:
+        ecosystem = ECOSYSTEMS[os.path.basename(fc["path"])]
+        key = VERSION_KEYS[ecosystem]
+        for name, versions in sorted(new_versions(fc).items()):
+            for version, line in sorted(versions.items()):
+                checked += 1
+                found = index.lookup(ecosystem, name, version)
+                if found:
+                    comments.append(_comment(fc["path"], line, name, version, found, key))
+    summary = (
+        f"{len(comments)} of {checked} new dependency version(s) have known vulnerabilities."
+        if comments else f"No known vulnerabilities in {checked} new dependency version(s)."
+    )
+    return ReviewResult(agent_name="advisories", comments=comments, summary=summary)
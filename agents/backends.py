@@ -0,0 +1,169 @@
+"""Pool of LLM backends (API keys, base URLs, Azure OpenAI deployments).
+
+Each backend has its own TPM/RPM admission controller. Calls are routed to
+the healthy backend with the fewest outstanding tokens relative to its
+quota. A backend that answers 429 or 5xx is taken out of rotation for a
+cooldown, and the call fails over to the next one.
+"""
+
+from __future__ import annotations
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+
+import openai
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import AzureChatOpenAI, ChatOpenAI
+
+from agents.admission import AdmissionController
+from config import (
+    LLM_BACKENDS,
+    LLM_QUOTA_HEADROOM,
+    LLM_RPM_LIMIT,
+    LLM_TPM_LIMIT,
+    OPENAI_API_KEY,
+)
+
+MAX_COOLDOWN = 60.0
+
+
+@dataclass
+class Backend:
+    """One endpoint + key (+ Azure deployment) with its own quota."""
+
+    name: str
+    api_key: str
+    base_url: Optional[str] = None
+    model: Optional[str] = None  # overrides the model requested by the caller
+    azure_deployment: Optional[str] = None
+    api_version: Optional[str] = None
+    tpm: int = LLM_TPM_LIMIT
+    rpm: int = LLM_RPM_LIMIT
+    controller: AdmissionController = field(init=False, repr=False)
+    outstanding: int = field(default=0, init=False)
+    failures: int = field(default=0, init=False)
+    unhealthy_until: float = field(default=0.0, init=False)
+
+    def __post_init__(self) -> None:
+        self.controller = AdmissionController(
+            tpm=int(self.tpm * LLM_QUOTA_HEADROOM),
+            rpm=int(self.rpm * LLM_QUOTA_HEADROOM),
+        )
+
+    def chat_model(self, model: str, **kwargs) -> BaseChatModel:
+        """Chat model bound to this backend's endpoint and credentials."""
+        if self.azure_deployment:
+            return AzureChatOpenAI(
+                azure_endpoint=self.base_url,
+                azure_deployment=self.azure_deployment,
+                api_version=self.api_version,
+                api_key=self.api_key,
+                model=self.model or model,
+                **kwargs,
+            )
+        return ChatOpenAI(
+            model=self.model or model,
+            api_key=self.api_key,
+            base_url=self.base_url,
+            **kwargs,
+        )
+
+
+def load_backends(spec: str) -> List[Backend]:
+    """Parse ``LLM_BACKENDS``; an empty spec yields the single default backend."""
+    if not spec.strip():
+        return [Backend(name="default", api_key=OPENAI_API_KEY)]
+    try:
+        entries = json.loads(spec)
+    except ValueError as e:
+        raise ValueError(f"LLM_BACKENDS is not valid JSON: {e}") from e
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("LLM_BACKENDS must be a non-empty JSON list")
+
+    backends = []
+    for i, entry in enumerate(entries):
+        entry = dict(entry)
+        key_env = entry.pop("api_key_env", None)
+        if key_env:
+            entry["api_key"] = os.getenv(key_env, "")
+        entry.setdefault("name", f"backend-{i}")
+        entry.setdefault("api_key", OPENAI_API_KEY)
+        if entry.get("azure_deployment") and not entry.get("base_url"):
+            raise ValueError(f"LLM backend {entry['name']!r}: azure_deployment needs base_url")
+        try:
+            backends.append(Backend(**entry))
+        except TypeError as e:
+            raise ValueError(f"LLM backend {entry['name']!r}: {e}") from e
+    return backends
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    try:
+        return float(err.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class BackendPool:
+    """Least-outstanding-tokens routing with per-backend health tracking."""
+
+    def __init__(
+        self, backends: Iterable[Backend], clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.backends = list(backends)
+        if not self.backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self._clock = clock
+
+    def healthy(self, backend: Backend) -> bool:
+        return self._clock() >= backend.unhealthy_until
+
+    def has_healthy(self, exclude: Iterable[str] = ()) -> bool:
+        skip = set(exclude)
+        return any(self.healthy(b) for b in self.backends if b.name not in skip)
+
+    def pick(self, exclude: Iterable[str] = ()) -> Backend:
+        """Healthy backend with the lowest load; the soonest to recover if none is."""
+        skip = set(exclude)
+        candidates = [b for b in self.backends if b.name not in skip] or self.backends
+        healthy = [b for b in candidates if self.healthy(b)]
+        if not healthy:
+            return min(candidates, key=lambda b: b.unhealthy_until)
+        return min(healthy, key=lambda b: b.outstanding / max(1, b.tpm))
+
+    def begin(self, backend: Backend, tokens: int) -> None:
+        backend.outstanding += tokens
+
+    def end(self, backend: Backend, tokens: int) -> None:
+        backend.outstanding = max(0, backend.outstanding - tokens)
+
+    def mark_success(self, backend: Backend) -> None:
+        backend.failures = 0
+
+    def mark_failure(self, backend: Backend, err: Exception) -> None:
+        """Take a backend out of rotation after a 429/5xx/connection error.
+
+        A 429 honours Retry-After (and pauses the backend's admission queue);
+        other errors back off exponentially with consecutive failures.
+        """
+        backend.failures += 1
+        cooldown = _retry_after(err)
+        if isinstance(err, openai.RateLimitError):
+            cooldown = cooldown if cooldown is not None else 1.0
+            backend.controller.pause(cooldown)
+        elif cooldown is None:
+            cooldown = min(MAX_COOLDOWN, 2.0 ** (backend.failures - 1))
+        backend.unhealthy_until = max(backend.unhealthy_until, self._clock() + cooldown)
+
+
+_pool: Optional[BackendPool] = None
+
+
+def get_backend_pool() -> BackendPool:
+    """Process-wide pool shared by every review running in this process."""
+    global _pool
+    if _pool is None:
+        _pool = BackendPool(load_backends(LLM_BACKENDS))
+    return _pool
@@ -0,0 +1,267 @@
+"""Offline OpenAI Batch API mode for bulk (e.g. nightly) reviews.
+
+A batch review runs the normal review pipeline twice:
+
+1. **collect** — reviewers run as usual, but ``invoke_llm`` records each
+   request body instead of calling the model and answers with an empty,
+   schema-valid placeholder. The requests become a Batch API JSONL file.
+2. **resume** — once the batch has completed, the pipeline runs again and
+   ``invoke_llm`` answers each call from the batch output, matched by a hash
+   of the request body. Requests missing from the output fall back to a
+   live call.
+
+Both runs pin the token calibration to the scales saved with the job, so
+the prompts rebuilt on resume match the ones collected byte for byte.
+
+Jobs live in a directory (``LLM_BATCH_DIR/<job>``) holding the fetched PRs,
+the request file, the batch state and the downloaded results, so every step
+can run in a separate process.
+"""
+
+from __future__ import annotations
+import contextvars
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import openai
+from langchain_core.messages import AIMessage, BaseMessage
+
+from agents.tokens import get_token_estimator
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+def request_body(messages: List[BaseMessage], model: str, llm_kwargs: dict) -> dict:
+    """Chat completions request body equivalent to a live ``invoke_llm`` call."""
+    body = {
+        "model": model,
+        "messages": [{"role": _ROLES.get(m.type, m.type), "content": m.content} for m in messages],
+        "temperature": llm_kwargs.get("temperature"),
+    }
+    body.update(llm_kwargs.get("extra_body") or {})
+    return body
+
+
+def custom_id(body: dict) -> str:
+    """Content-addressed id, so resume finds a response from the request alone."""
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _empty_instance(schema: dict):
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {k: _empty_instance(v) for k, v in schema.get("properties", {}).items()}
+    return {"array": [], "string": "", "integer": 0, "number": 0, "boolean": False}.get(kind)
+
+
+def placeholder_response(body: dict) -> str:
+    """Empty response valid against the request's response_format schema."""
+    fmt = body.get("response_format") or {}
+    schema = (fmt.get("json_schema") or {}).get("schema")
+    return json.dumps(_empty_instance(schema) if schema else {})
+
+
+class BatchCollector:
+    """Records request bodies in place of live LLM calls."""
+
+    def __init__(self) -> None:
+        self.requests: Dict[str, dict] = {}
+
+    def handle(self, body: dict) -> AIMessage:
+        self.requests.setdefault(custom_id(body), body)
+        return AIMessage(content=placeholder_response(body))
+
+
+class BatchReplay:
+    """Answers LLM calls from downloaded batch results."""
+
+    def __init__(self, responses: Dict[str, dict]) -> None:
+        self.responses = responses
+        self.hits = 0
+        self.misses = 0
+
+    def handle(self, body: dict) -> Optional[AIMessage]:
+        """Return the batch response for a request, or None if it has none."""
+        completion = self.responses.get(custom_id(body))
+        if completion is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        usage = completion.get("usage") or {}
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        return AIMessage(
+            content=completion["choices"][0]["message"].get("content") or "",
+            usage_metadata={
+                "input_tokens": usage.get("prompt_tokens", 0),
+                "output_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+                "input_token_details": {"cache_read": cached or 0},
+            },
+        )
+
+
+_mode: contextvars.ContextVar[Optional[object]] = contextvars.ContextVar(
+    "batch_mode", default=None
+)
+
+
+def collect_requests() -> BatchCollector:
+    """Record LLM calls made from the current context instead of sending them."""
+    collector = BatchCollector()
+    _mode.set(collector)
+    return collector
+
+
+def replay_responses(responses: Dict[str, dict]) -> BatchReplay:
+    """Answer LLM calls made from the current context from batch results."""
+    replay = BatchReplay(responses)
+    _mode.set(replay)
+    return replay
+
+
+def current_batch_mode():
+    return _mode.get()
+
+
+def is_collecting() -> bool:
+    return isinstance(_mode.get(), BatchCollector)
+
+
+def parse_output(text: str) -> Dict[str, dict]:
+    """Map custom_id to chat completion for every successful line of an output file."""
+    responses: Dict[str, dict] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        response = entry.get("response") or {}
+        if response.get("status_code") == 200 and response.get("body"):
+            responses[entry["custom_id"]] = response["body"]
+    return responses
+
+
+class BatchJob:
+    """On-disk state of one batch review job."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.name = os.path.basename(os.path.normpath(root))
+
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.root, "state.json")
+
+    @property
+    def requests_path(self) -> str:
+        return os.path.join(self.root, "requests.jsonl")
+
+    @property
+    def results_path(self) -> str:
+        return os.path.join(self.root, "results.jsonl")
+
+    def _pr_path(self, pr_id: int) -> str:
+        return os.path.join(self.root, "prs", f"{pr_id}.json")
+
+    def load_state(self) -> dict:
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except OSError:
+            return {}
+
+    def save_state(self, **updates) -> dict:
+        state = {**self.load_state(), **updates}
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self._state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self._state_path)
+        return state
+
+    def pin_calibration(self) -> None:
+        """Pin the token estimator to the scales the job's prompts were built with.
+
+        Budgets, trimming and routing all depend on the calibration, and so
+        does every request body; live calls made between collect and resume
+        would otherwise move it and no body would match its batch result.
+        The first call saves the current scales in the job state.
+        """
+        estimator = get_token_estimator()
+        scales = self.load_state().get("token_scales")
+        if scales is None:
+            scales = self.save_state(token_scales=estimator.scales)["token_scales"]
+        estimator.pin(scales)
+
+    def save_pr(self, pr_id: int, file_changes: list, pr_metadata: dict) -> None:
+        """Keep the fetched PR so resume reviews exactly what was collected."""
+        os.makedirs(os.path.dirname(self._pr_path(pr_id)), exist_ok=True)
+        with open(self._pr_path(pr_id), "w", encoding="utf-8") as f:
+            json.dump({"file_changes": file_changes, "pr_metadata": pr_metadata}, f, default=str)
+        prs = self.load_state().get("prs", [])
+        if pr_id not in prs:
+            self.save_state(prs=prs + [pr_id])
+
+    def load_pr(self, pr_id: int) -> dict:
+        with open(self._pr_path(pr_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def write_requests(self, requests: Dict[str, dict]) -> int:
+        """Write (or extend) the Batch API input file; return the request count."""
+        existing = set()
+        if os.path.exists(self.requests_path):
+            with open(self.requests_path, encoding="utf-8") as f:
+                existing = {json.loads(line)["custom_id"] for line in f if line.strip()}
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.requests_path, "a", encoding="utf-8") as f:
+            for cid, body in requests.items():
+                if cid in existing:
+                    continue
+                f.write(json.dumps({
+                    "custom_id": cid, "method": "POST", "url": BATCH_ENDPOINT, "body": body,
+                }) + "\n")
+                existing.add(cid)
+        self.save_state(requests=len(existing))
+        return len(existing)
+
+    def load_results(self) -> Dict[str, dict]:
+        with open(self.results_path, encoding="utf-8") as f:
+            return parse_output(f.read())
+
+
+async def submit(job: BatchJob, client: openai.AsyncOpenAI, completion_window: str = "24h") -> str:
+    """Upload the job's request file and create the batch; return the batch id."""
+    with open(job.requests_path, "rb") as f:
+        uploaded = await client.files.create(file=f, purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=completion_window,
+        metadata={"job": job.name},
+    )
+    job.save_state(input_file_id=uploaded.id, batch_id=batch.id, status=batch.status)
+    return batch.id
+
+
+async def poll(job: BatchJob, client: openai.AsyncOpenAI) -> str:
+    """Refresh the batch status; download the results once it has completed."""
+    state = job.load_state()
+    if not state.get("batch_id"):
+        raise ValueError(f"Batch job {job.name!r} has not been submitted")
+    batch = await client.batches.retrieve(state["batch_id"])
+    counts = batch.request_counts.model_dump() if batch.request_counts else {}
+    job.save_state(status=batch.status, request_counts=counts)
+    if batch.status == "completed" and batch.output_file_id:
+        content = await client.files.content(batch.output_file_id)
+        with open(job.results_path, "w", encoding="utf-8") as f:
+            f.write(content.text)
+        job.save_state(output_file_id=batch.output_file_id)
+    return batch.status
@@ -0,0 +1,127 @@
+"""Per-file finding cache — reuses reviewer output for files that did not change."""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from agents.types import ReviewComment, ReviewResult
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def prompt_version(system_prompt: str, model: str = "") -> str:
+    """Hash of the agent's system prompt (and model) used to version cache entries."""
+    return _sha256(f"{model}\0{system_prompt}")
+
+
+def _normalise_path(path: str) -> str:
+    return (path or "").strip().lstrip("/")
+
+
+class FindingCache:
+    """File-level store of review findings.
+
+    Entries are keyed by agent name, prompt version and a hash of the file's
+    path, before and after content (and platform patch, if any), so editing one file in a chunk only
+    invalidates that file. Copies carrying a filtered ``"diff"`` (triage) are
+    keyed on that diff too, so their findings are never served as the
+    review of the whole file. An empty ``root`` disables the cache; a
+    ``read_only`` cache serves hits but never writes.
+    """
+
+    def __init__(self, root: Optional[str], model: str = "", read_only: bool = False) -> None:
+        self.root = root or ""
+        self.model = model
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    def key(self, agent: str, system_prompt: str, fc: dict) -> str:
+        content = _sha256(f"{fc.get('before', '')}\0{fc.get('after', '')}")
+        if fc.get("patch") is not None:
+            content = _sha256(f"{content}\0{fc['patch']}")
+        if fc.get("diff") is not None:  # a filtered copy was reviewed on only part of its diff
+            content = _sha256(f"{content}\0diff\0{fc['diff']}")
+        version = prompt_version(system_prompt, self.model)
+        return _sha256(f"{agent}\0{version}\0{fc['path']}\0{content}")
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, agent: str, system_prompt: str, fc: dict) -> Optional[List[ReviewComment]]:
+        """Return cached findings for a file, or None on a miss."""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._entry_path(self.key(agent, system_prompt, fc)), encoding="utf-8") as f:
+                data = json.load(f)
+            return [ReviewComment.model_validate(c) for c in data.get("comments", [])]
+        except (OSError, ValueError):
+            return None
+
+    def put(
+        self, agent: str, system_prompt: str, fc: dict, comments: List[ReviewComment]
+    ) -> None:
+        """Store the findings for a single file (an empty list is a valid entry)."""
+        if not self.enabled or self.read_only:
+            return
+        path = self._entry_path(self.key(agent, system_prompt, fc))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"comments": [c.model_dump() for c in comments]}, f)
+        os.replace(tmp, path)
+
+    def split(
+        self, agent: str, system_prompt: str, file_changes: List[dict]
+    ) -> Tuple[List[dict], List[ReviewComment]]:
+        """Partition files into (files to review, cached findings of the rest)."""
+        missing: List[dict] = []
+        cached: List[ReviewComment] = []
+        for fc in file_changes:
+            hit = self.get(agent, system_prompt, fc)
+            if hit is None:
+                missing.append(fc)
+                self.misses += 1
+            else:
+                cached.extend(hit)
+                self.hits += 1
+        return missing, cached
+
+    def store(
+        self,
+        agent: str,
+        system_prompt: str,
+        file_changes: List[dict],
+        result: ReviewResult,
+        exclude: Optional[List[ReviewComment]] = None,
+    ) -> None:
+        """Attribute a reviewer's findings to their files and cache each file.
+
+        Failed results are never cached, nor are parts of split files (each
+        part only holds some of the file's findings). Comments in ``exclude``
+        (e.g. static findings that depend on the whole PR) are left out of the
+        entries.
+        """
+        if not self.enabled or result.error:
+            return
+        by_file: Dict[str, List[ReviewComment]] = {
+            _normalise_path(fc["path"]): [] for fc in file_changes
+        }
+        for c in result.comments:
+            if exclude and c in exclude:
+                continue
+            bucket = by_file.get(_normalise_path(c.file_path))
+            if bucket is not None:
+                bucket.append(c)
+        for fc in file_changes:
+            if not fc.get("part"):
+                self.put(agent, system_prompt, fc, by_file[_normalise_path(fc["path"])])
@@ -1,41 +1,363 @@
-"""Token-aware chunking for large PRs."""
+"""Token-aware chunking for large PRs.
+
+Each file is sized by what it adds to the rendered prompt (its section
+header plus its diff, or the whole content for new files), and files are
+packed into chunks under the agent's budget, per ``CHUNKING_MODE``:
+
+- ``packed`` — first-fit-decreasing into as few chunks as the budget allows
+- ``stable`` — path order, cut at content-defined anchors: past a minimum
+  fill, a file ends its chunk when a hash of its path falls below its share
+  of a target chunk size. Boundaries do not depend on the other files, so after a follow-up
+  push only the chunks around changed files differ, and the rest render
+  byte-identical prompts (and hit provider prompt caches) again.
+- ``locality`` — clusters of related files (``agents.locality``: imports,
+  source/test pairs) are kept in one call where they fit, and placed next to
+  files from the nearest directories, so each call has its own context and
+  cross-file issues are reported once.
+
+A file larger than the budget is split into parts: windows over its diff
+lines, overlapping by ``SPLIT_OVERLAP_LINES`` and re-rendered as hunks with
+their own headers. ``remap_part_findings`` maps findings on parts back onto
+the whole file.
+"""
 
 from __future__ import annotations
-from typing import List
+import hashlib
+import math
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from agents.compiler import section_tokens
+from agents.diff_index import DiffRow, hunk_rows, render_rows, split_hunks
+from agents.locality import file_clusters, shared_directory_depth
+from agents.prompts import REVIEW_PREAMBLE, file_header, render_pr_context
+from agents.tokens import get_token_estimator, language_for
+from agents.types import ReviewResult
+from config import CHUNKING_MODE, SPLIT_OVERLAP_LINES
+from utils import file_diff
 
 MAX_CHUNK_TOKENS = 80_000  # conservative limit per LLM call
+MIN_CHUNK_BUDGET = 4_000  # floor when an agent's fixed prompt is very large
+SPLIT_MAX_PASSES = 3  # re-measurements when splitting an oversized file
+STABLE_MIN_FILL = 0.25  # stable mode: no anchor cuts below this share of the budget...
+STABLE_TARGET_FILL = 0.35  # ...then chunks end after about this much more, on average
+
+
+def estimate_tokens(text: str, path: str = "") -> int:
+    """Calibrated token estimate (see ``agents.tokens``); ``path`` picks the language."""
+    return get_token_estimator().estimate(text, language_for(path))
+
+
+def rendered_tokens(fc: dict, diff_index=None, agent: str = "") -> int:
+    """Tokens a file contributes to ``agent``'s prompt, as ``agents.compiler`` renders it."""
+    return section_tokens(fc, agent, diff_index)
+
+
+def prompt_budget(system_prompt: str, pr_metadata: dict) -> int:
+    """Tokens left for diffs once an agent's fixed prompt is accounted for."""
+    fixed = estimate_tokens(REVIEW_PREAMBLE + render_pr_context(pr_metadata) + system_prompt)
+    return max(MIN_CHUNK_BUDGET, MAX_CHUNK_TOKENS - fixed)
+
+
+# ── Splitting oversized files ────────────────────────────────────────
+
+
+def split_file(
+    fc: dict, budget: int, diff_index=None, overlap: int = SPLIT_OVERLAP_LINES, agent: str = ""
+) -> List[dict]:
+    """Split one oversized file into parts that each fit ``budget`` in ``agent``'s prompt.
+
+    Parts are windows over the file's diff rows; each window after the first
+    starts ``overlap`` rows before the previous one ended, for context, and
+    only "owns" findings from the previous window's end onwards. A new file's
+    part also carries its window of ``after`` and the ``line_offset`` of that
+    window, for reviewers that show new files whole.
+    """
+    diff = file_diff(fc, diff_index)
+    header, hunks = split_hunks(diff)
+    runs = [hunk_rows(h) for h in hunks]
+    rows = [(i, row) for i, run in enumerate(runs) for row in run]
+    if len(rows) < 2:
+        return [fc]
 
+    ratio = estimate_tokens(diff, fc["path"]) / max(1, sum(len(r[1]) + 2 for _, r in rows))
+    cost = [max(1, math.ceil((len(r[1]) + 2) * ratio)) for _, r in rows]
+    room = max(1, budget - estimate_tokens(f"{file_header(0, fc['path'], 'part 00/00')}\n{header}\n"))
 
-def estimate_tokens(text: str) -> int:
-    """Rough token estimate (~4 chars per token)."""
-    return len(text) // 4
+    # Row costs are an estimate: re-measure the rendered parts and tighten if needed
+    for _ in range(SPLIT_MAX_PASSES):
+        parts = _render_parts(fc, header, rows, _windows(cost, room, overlap))
+        worst = max(rendered_tokens(p, diff_index, agent) for p in parts)
+        if worst <= budget or room == 1:
+            break
+        room = max(1, int(room * budget / worst) - 1)
+    return parts
 
 
-def chunk_file_changes(file_changes: List[dict]) -> List[List[dict]]:
-    """Split file changes into token-bounded chunks.
+def _windows(cost: List[int], room: int, overlap: int) -> List[Tuple[int, int]]:
+    """[start, end) row windows of at most ``room`` cost, each overlapping the last."""
+    windows: List[Tuple[int, int]] = []
+    start = 0
+    while True:
+        end, used = start, 0
+        while end < len(cost) and (end == start or used + cost[end] <= room):
+            used += cost[end]
+            end += 1
+        windows.append((start, end))
+        if end >= len(cost):
+            return windows
+        start = max(end - overlap, start + 1)
 
-    Files are sorted by path for deterministic ordering.
-    Each chunk stays under MAX_CHUNK_TOKENS.
+
+def _render_parts(
+    fc: dict, header: str, rows: List[Tuple[int, DiffRow]], windows: List[Tuple[int, int]]
+) -> List[dict]:
+    parts = []
+    owned_from = 0
+    for k, (start, end) in enumerate(windows, 1):
+        window = rows[start:end]
+        hunk_text = "".join(
+            render_rows([r for i, r in window if i == h])
+            for h in sorted({i for i, _ in window})
+        )
+        part = {**fc, "diff": header + hunk_text, "part": (k, len(windows)), "owned_from": owned_from}
+        if fc.get("change_type") == "add":
+            part["after"] = "".join(f"{r[1]}\n" for _, r in window if r[0] != "-")
+            part["line_offset"] = window[0][1][3] - 1
+        parts.append(part)
+        owned_from = rows[end - 1][1][3] + 1
+    return parts
+
+
+def remap_part_findings(result: ReviewResult, file_changes: List[dict], content_offsets: bool = False) -> ReviewResult:
+    """Map findings on split-file parts back onto the whole file.
+
+    With ``content_offsets`` (the reviewer showed new files' ``after``
+    windows, numbered from 1) line numbers are shifted by the window's
+    offset. Findings inside a part's leading overlap belong to the previous
+    part and are dropped.
     """
+    parts = {fc["path"]: fc for fc in file_changes if fc.get("part")}
+    if not parts:
+        return result
+    kept = []
+    for c in result.comments:
+        fc = parts.get(c.file_path)
+        if fc is not None and c.line_number is not None:
+            if content_offsets:
+                c.line_number += fc.get("line_offset", 0)
+            if c.line_number < fc.get("owned_from", 0):
+                continue
+        kept.append(c)
+    result.comments = kept
+    return result
+
+
+# ── Packing ──────────────────────────────────────────────────────────
+
+
+@dataclass
+class ChunkPlan:
+    """Packed chunks with their estimated sizes."""
+
+    budget: int
+    chunks: List[List[dict]] = field(default_factory=list)
+    sizes: List[int] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return sum(self.sizes)
+
+    @property
+    def filled(self) -> int:
+        return sum(min(size, self.budget) for size in self.sizes)
+
+    @property
+    def lower_bound(self) -> int:
+        """Fewest chunks any packing could use (oversized files always go alone)."""
+        oversized = [s for s in self.sizes if s > self.budget]
+        rest = self.total - sum(oversized)
+        return len(oversized) + math.ceil(rest / self.budget)
+
+    @property
+    def efficiency(self) -> float:
+        """Share of the planned calls' budget actually filled."""
+        return self.filled / (len(self.chunks) * self.budget) if self.chunks else 1.0
+
+
+def _sized_items(
+    file_changes: List[dict], budget: int, diff_index=None, agent: str = ""
+) -> List[Tuple[int, dict]]:
+    """(tokens, file) per section to pack, oversized files split into parts."""
+    items: List[Tuple[int, dict]] = []
+    for fc in file_changes:
+        tokens = rendered_tokens(fc, diff_index, agent)
+        if tokens <= budget:
+            items.append((tokens, fc))
+        else:
+            parts = split_file(fc, budget, diff_index, agent=agent)
+            items.extend((rendered_tokens(p, diff_index, agent), p) for p in parts)
+    return items
+
+
+def _order(fc: dict) -> Tuple[str, int]:
+    return fc["path"], fc.get("part", (0, 0))[0]
+
+
+Bin = Tuple[int, List[dict]]
+
+
+def _pack_first_fit(items: List[Tuple[int, dict]], budget: int) -> List[Bin]:
+    bins: List[Bin] = []
+    for tokens, fc in sorted(items, key=lambda item: (-item[0], _order(item[1]))):
+        for i, (used, members) in enumerate(bins):
+            if used + tokens <= budget and all(m["path"] != fc["path"] for m in members):
+                members.append(fc)
+                bins[i] = (used + tokens, members)
+                break
+        else:
+            bins.append((tokens, [fc]))
+    return bins
+
+
+def _anchor(path: str) -> float:
+    """Stable uniform [0, 1) value for a path (independent of PYTHONHASHSEED)."""
+    digest = hashlib.blake2b(path.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def _pack_stable(items: List[Tuple[int, dict]], budget: int) -> List[Bin]:
+    """Path-order chunks cut after files whose anchor falls below their share of the target.
+
+    Once a chunk holds ``STABLE_MIN_FILL`` of the budget, a file of ``t``
+    tokens ends it with probability ``t / target``, so chunk sizes do not
+    depend on the rest of the PR, and a shifted boundary resynchronises at
+    the next anchor. A chunk is also cut before a file that would overflow
+    the budget, and between parts of one split file.
+    """
+    minimum = budget * STABLE_MIN_FILL
+    target = max(1.0, budget * STABLE_TARGET_FILL)
+    bins: List[Bin] = []
+    used, members = 0, []
+    for tokens, fc in sorted(items, key=lambda item: _order(item[1])):
+        if members and (used + tokens > budget or members[-1]["path"] == fc["path"]):
+            bins.append((used, members))
+            used, members = 0, []
+        used += tokens
+        members.append(fc)
+        if used >= minimum and _anchor(fc["path"]) < tokens / target:
+            bins.append((used, members))
+            used, members = 0, []
+    if members:
+        bins.append((used, members))
+    return bins
+
+
+def _pack_locality(items: List[Tuple[int, dict]], budget: int) -> List[Bin]:
+    """Clusters of related files as units, each placed in the nearest chunk with room.
+
+    A cluster over the budget is cut into path-order units. Units go largest
+    first into the chunk sharing the most leading directories with them
+    (fullest on ties), else into a new chunk.
+    """
+    clusters = file_clusters([fc for _, fc in items])
+    by_cluster: dict = {}
+    for tokens, fc in sorted(items, key=lambda item: _order(item[1])):
+        by_cluster.setdefault(clusters[fc["path"]], []).append((tokens, fc))
+
+    units: List[Bin] = []
+    for members in by_cluster.values():
+        used, unit = 0, []
+        for tokens, fc in members:
+            if unit and (used + tokens > budget or any(m["path"] == fc["path"] for m in unit)):
+                units.append((used, unit))
+                used, unit = 0, []
+            used += tokens
+            unit.append(fc)
+        units.append((used, unit))
+
+    bins: List[Bin] = []
+    for tokens, unit in sorted(units, key=lambda u: (-u[0], _order(u[1][0]))):
+        unit_paths = {fc["path"] for fc in unit}
+        best, best_key = None, None
+        for i, (used, members) in enumerate(bins):
+            if used + tokens > budget or any(m["path"] in unit_paths for m in members):
+                continue
+            depth = max(shared_directory_depth(a["path"], b["path"]) for a in unit for b in members)
+            if best_key is None or (depth, used) > best_key:
+                best, best_key = i, (depth, used)
+        if best is None:
+            bins.append((tokens, list(unit)))
+        else:
+            used, members = bins[best]
+            bins[best] = (used + tokens, members + unit)
+    return bins
+
+
+_PACKERS = {"packed": _pack_first_fit, "stable": _pack_stable, "locality": _pack_locality}
+
+
+def plan_chunks(
+    file_changes: List[dict],
+    budget: int = MAX_CHUNK_TOKENS,
+    diff_index=None,
+    mode: str = "",
+    agent: str = "",
+) -> ChunkPlan:
+    """Pack files into chunks with the ``mode`` strategy (default ``CHUNKING_MODE``).
+
+    Files are sized as ``agent``'s prompt renders them (``agents.compiler``).
+
+    A file larger than the budget is split into parts (``split_file``); two
+    parts of one file never share a chunk. Files keep path order within a
+    chunk, and chunks are ordered by their first path.
+    """
+    mode = mode or CHUNKING_MODE
+    pack = _PACKERS.get(mode)
+    if pack is None:
+        raise ValueError(f"Unknown CHUNKING_MODE {mode!r} (expected {', '.join(_PACKERS)})")
+    plan = ChunkPlan(budget=budget)
     if not file_changes:
-        return []
+        return plan
+
+    bins = pack(_sized_items(file_changes, budget, diff_index, agent), budget)
+    for used, members in sorted(
+        ((used, sorted(members, key=_order)) for used, members in bins),
+        key=lambda b: _order(b[1][0]),
+    ):
+        plan.chunks.append(members)
+        plan.sizes.append(used)
+    return plan
+
+
+def chunk_file_changes(
+    file_changes: List[dict], budget: int = MAX_CHUNK_TOKENS, diff_index=None
+) -> List[List[dict]]:
+    """Split file changes into token-bounded chunks (see ``plan_chunks``)."""
+    return plan_chunks(file_changes, budget, diff_index).chunks
+
+
+class PackingReport:
+    """Chunk plans of one review, for the packing-efficiency log line."""
+
+    def __init__(self) -> None:
+        self.plans: List[Tuple[str, ChunkPlan]] = []
 
-    sorted_files = sorted(file_changes, key=lambda f: f["path"])
-    chunks: List[List[dict]] = []
-    current_chunk: List[dict] = []
-    current_tokens = 0
+    def add(self, agent: str, plan: ChunkPlan) -> ChunkPlan:
+        self.plans.append((agent, plan))
+        return plan
 
-    for fc in sorted_files:
-        fc_tokens = estimate_tokens(
-            fc.get("before", "") + fc.get("after", "")
+    def render(self) -> str:
+        """One log line of packing statistics ("" unless some agent needed several chunks)."""
+        plans = [p for _, p in self.plans if p.chunks]
+        if not any(len(p.chunks) > 1 for p in plans):
+            return ""
+        calls = sum(len(p.chunks) for p in plans)
+        minimum = sum(p.lower_bound for p in plans)
+        capacity = sum(len(p.chunks) * p.budget for p in plans)
+        fill = sum(p.filled for p in plans) / capacity
+        files = sum(len(c) for p in plans for c in p.chunks)
+        return (
+            f"Chunk packing: {calls} call(s) for {files} file section(s), "
+            f"{fill:.0%} of budget used (lower bound {minimum} call(s))"
         )
-        if current_tokens + fc_tokens > MAX_CHUNK_TOKENS and current_chunk:
-            chunks.append(current_chunk)
-            current_chunk = []
-            current_tokens = 0
-        current_chunk.append(fc)
-        current_tokens += fc_tokens
-
-    if current_chunk:
-        chunks.append(current_chunk)
-    return chunks
@@ -0,0 +1,273 @@
+"""Prompt compiler shared by every reviewer.
+
+Renders a chunk of file changes into the file sections of one agent's user
+prompt, formatting each file by change type:
+
+- edit / rename — the scoped diff (``agents.context``); whitespace-only
+  changes collapse to a one-line note (not re-indents in Python, YAML and
+  other indentation-sensitive files), pure renames are omitted
+- delete — header plus the definitions the file had
+- lockfiles — a table of added, removed and changed packages
+  (``agents.lockfiles``) when both versions parse and some package version
+  changed; the security review always gets the diff, where ``resolved``
+  and ``integrity`` rewrites show
+- add — the body, cut to the agent's ``new_body_lines`` with an outline of
+  the definitions below the cut
+
+Sections are then fitted into the agent's token budget: the largest section
+is degraded first (new files to their outline, scoped diffs to plain diffs),
+then cut line by line. Everything omitted, collapsed or cut is counted in
+the review's ``TrimReport``.
+"""
+
+from __future__ import annotations
+import contextvars
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agents.context import file_scopes, new_file_outline, render_outline, scoped_diff
+from agents.diff_index import hunk_rows, split_hunks
+from agents.lockfiles import delta_table, is_lockfile
+from agents.prompts import file_header, section_label
+from agents.router import classify_file
+from agents.syntax import whitespace_only
+from agents.tokens import get_token_estimator, language_for
+from config import NEW_FILE_BODY_LINES
+from utils import file_diff
+
+
+@dataclass(frozen=True)
+class AgentPolicy:
+    """How one agent's prompt renders files."""
+
+    new_body_lines: Optional[int] = None  # None = whole new files, 0 = outline only
+    change_type_label: bool = False  # "change_type: edit" in every header
+    category_label: bool = False  # file classification in every header
+    whole_tests: bool = False  # new test files are always shown whole
+    lockfile_tables: bool = True  # lockfiles as dependency delta tables instead of their diff
+
+
+POLICIES: Dict[str, AgentPolicy] = {
+    "security": AgentPolicy(change_type_label=True, lockfile_tables=False),
+    "best_practices": AgentPolicy(new_body_lines=NEW_FILE_BODY_LINES),
+    "test_coverage": AgentPolicy(new_body_lines=0, whole_tests=True),
+    "dependency": AgentPolicy(new_body_lines=NEW_FILE_BODY_LINES),
+    "fused": AgentPolicy(change_type_label=True, category_label=True),
+}
+DEFAULT_POLICY = AgentPolicy()
+
+
+# ── Trim report ──────────────────────────────────────────────────────
+
+
+@dataclass
+class TrimReport:
+    """What the compiler left out of a review's prompts."""
+
+    policy: Counter = field(default_factory=Counter)  # (agent, what) -> files
+    budget: List[str] = field(default_factory=list)
+
+    def note(self, agent: str, what: str) -> None:
+        self.policy[(agent, what)] += 1
+
+    def note_budget(self, agent: str, path: str, what: str) -> None:
+        self.budget.append(f"{agent} {path} ({what})")
+
+    def render(self) -> str:
+        """One log line ("" if nothing was trimmed)."""
+        if not self.policy and not self.budget:
+            return ""
+        by_agent: Dict[str, List[str]] = {}
+        for (agent, what), n in sorted(self.policy.items()):
+            by_agent.setdefault(agent, []).append(f"{n} {what}")
+        parts = [f"{agent}: {', '.join(items)}" for agent, items in by_agent.items()]
+        if self.budget:
+            parts.append("over budget: " + ", ".join(self.budget))
+        return "Prompt compiler: " + "; ".join(parts)
+
+
+_trims: contextvars.ContextVar[Optional[TrimReport]] = contextvars.ContextVar(
+    "prompt_trims", default=None
+)
+
+
+def track_trims() -> TrimReport:
+    """Start collecting trims for prompts compiled from the current context."""
+    report = TrimReport()
+    _trims.set(report)
+    return report
+
+
+def _note(agent: str, what: str) -> None:
+    report = _trims.get()
+    if report is not None:
+        report.note(agent, what)
+
+
+# ── Sections ─────────────────────────────────────────────────────────
+
+
+def _tokens(text: str, path: str) -> int:
+    return get_token_estimator().estimate(text, language_for(path))
+
+
+def _whitespace_only(diff: str, path: str = "") -> bool:
+    """Only whitespace changed (``agents.syntax``: strings and meaningful indentation count)."""
+    removed, added = [], []
+    for hunk in split_hunks(diff)[1]:
+        for kind, text, _, _ in hunk_rows(hunk):
+            if kind == "-":
+                removed.append(text)
+            elif kind == "+":
+                added.append(text)
+    return bool(removed or added) and whitespace_only(removed, added, path)
+
+
+@dataclass
+class Section:
+    """One file's part of a prompt, with cheaper renderings to fall back on."""
+
+    fc: dict
+    label: str
+    body: str
+    fallbacks: List[Tuple[str, str, str]] = field(default_factory=list)  # (label, body, what)
+    tokens: int = 0
+
+    def measure(self) -> int:
+        self.tokens = _tokens(f"{file_header(0, self.fc['path'], self.label)}\n{self.body}\n\n", self.fc["path"])
+        return self.tokens
+
+
+def _label(fc: dict, policy: AgentPolicy, base: str) -> str:
+    parts = []
+    if policy.change_type_label:
+        parts.append(f"change_type: {fc.get('change_type', 'edit')}")
+    if policy.category_label:
+        parts.append(classify_file(fc["path"]))
+    if base:
+        parts.append(base)
+    return section_label(fc, ", ".join(parts))
+
+
+def _new_file(fc: dict, policy: AgentPolicy, notes: List[str]) -> Section:
+    after = fc.get("after", "")
+    limit = policy.new_body_lines
+    if fc.get("part") or (policy.whole_tests and classify_file(fc["path"]) == "test"):
+        limit = None
+    lines = after.split("\n")
+    outline = new_file_outline(fc)
+    if limit == 0 and outline:
+        notes.append("new file(s) as outline")
+        return Section(fc, _label(fc, policy, "NEW FILE, outline"), outline)
+    section = Section(fc, _label(fc, policy, "NEW FILE"), after)
+    if limit and len(lines) > limit:
+        notes.append("new file body(ies) cut")
+        later = [s for s in file_scopes(fc["path"], after) if s.start > limit]
+        rest = render_outline(later, set(), "Definitions further down (line ranges):")
+        section.label = _label(fc, policy, f"NEW FILE, first {limit} of {len(lines)} lines")
+        section.body = "\n".join(lines[:limit]) + f"\n... ({len(lines) - limit} more lines)\n" + rest
+    if outline and section.body != outline:
+        section.fallbacks.append((_label(fc, policy, "NEW FILE, outline"), outline, "reduced to outline"))
+    return section
+
+
+def render_section(fc: dict, agent: str = "", diff_index=None, notes: Optional[List[str]] = None) -> Optional[Section]:
+    """One file's section under ``agent``'s policy (None if the file is left out)."""
+    policy = POLICIES.get(agent, DEFAULT_POLICY)
+    notes = notes if notes is not None else []
+    change_type = fc.get("change_type", "edit")
+    if policy.lockfile_tables and is_lockfile(fc["path"]) and not fc.get("part"):
+        table = delta_table(fc)
+        if table is not None:
+            notes.append("lockfile(s) as dependency delta")
+            return Section(fc, _label(fc, policy, "LOCKFILE, line = line in the new file"), table)
+    if change_type == "add":
+        return _new_file(fc, policy, notes)
+
+    diff = file_diff(fc, diff_index)
+    if not diff.strip():
+        if change_type == "rename":
+            notes.append("pure rename(s) omitted")
+        return None
+    if change_type == "delete" and not fc.get("part"):
+        before = fc.get("before", "")
+        outline = render_outline(file_scopes(fc["path"], before), set(), "Removed definitions (old line ranges):")
+        notes.append("deleted file(s) as symbol list")
+        removed = sum(row[0] == "-" for hunk in split_hunks(diff)[1] for row in hunk_rows(hunk))
+        return Section(fc, _label(fc, policy, "DELETED"), outline or f"({removed} lines removed)")
+    if _whitespace_only(diff, fc["path"]):
+        notes.append("whitespace-only file(s) collapsed")
+        return Section(fc, _label(fc, policy, "whitespace-only"), "(only whitespace/indentation changed)")
+
+    base = f"renamed from {fc['old_path']}" if change_type == "rename" and fc.get("old_path") else ""
+    scoped = scoped_diff(fc, diff_index)
+    section = Section(fc, _label(fc, policy, base), scoped)
+    if scoped != diff:
+        section.fallbacks.append((section.label, diff, "scope context dropped"))
+    return section
+
+
+def section_tokens(fc: dict, agent: str = "", diff_index=None) -> int:
+    """Tokens ``fc``'s section adds to ``agent``'s prompt (0 if it is left out)."""
+    section = render_section(fc, agent, diff_index)
+    return section.measure() if section is not None else 0
+
+
+# ── Budget ───────────────────────────────────────────────────────────
+
+
+def _cut(section: Section, target: int) -> str:
+    """Keep the leading lines of the body so the section costs about ``target`` tokens."""
+    lines = section.body.split("\n")
+    keep = max(1, math.floor(len(lines) * max(0, target) / max(1, section.tokens)))
+    section.body = "\n".join(lines[:keep]) + f"\n... ({len(lines) - keep} more lines trimmed to fit the prompt budget)"
+    return f"cut to {keep}/{len(lines)} lines"
+
+
+def fit_budget(sections: List[Section], budget: int, agent: str = "") -> None:
+    """Degrade then cut the largest sections until the total fits ``budget``."""
+    total = sum(s.measure() for s in sections)
+    report = _trims.get()
+    done = set()
+    while total > budget:
+        candidates = [s for s in sections if id(s) not in done]
+        if not candidates:
+            break
+        section = max(candidates, key=lambda s: s.tokens)
+        before = section.tokens
+        if section.fallbacks:
+            section.label, section.body, what = section.fallbacks.pop(0)
+        else:
+            what = _cut(section, section.tokens - (total - budget))
+            done.add(id(section))
+        total += section.measure() - before
+        if report is not None:
+            report.note_budget(agent, section.fc["path"], what)
+
+
+@dataclass
+class CompiledPrompt:
+    """File sections of a user prompt and the paths their [n] markers refer to."""
+
+    text: str = ""
+    paths: List[str] = field(default_factory=list)
+
+
+def compile_prompt(
+    agent: str, file_changes: List[dict], diff_index=None, budget: Optional[int] = None
+) -> CompiledPrompt:
+    """Render ``file_changes`` for ``agent`` and fit them into ``budget`` tokens."""
+    notes: List[str] = []
+    sections = [s for s in (render_section(fc, agent, diff_index, notes) for fc in file_changes) if s]
+    for what in notes:
+        _note(agent, what)
+    if budget is not None:
+        fit_budget(sections, budget, agent)
+    return CompiledPrompt(
+        text="\n\n".join(
+            f"{file_header(i, s.fc['path'], s.label)}\n{s.body}" for i, s in enumerate(sections)
+        ),
+        paths=[s.fc["path"] for s in sections],
+    )
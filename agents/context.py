@@ -0,0 +1,242 @@
+"""Enclosing-scope context for diff hunks.
+
+A 3-line-context hunk often starts mid-function, so a reviewer cannot see
+the signature, the guard clauses or the rest of the logic it changes. With
+``CONTEXT_MODE=scope`` each hunk of an edited file is widened to the
+function or class that encloses it (scopes longer than
+``CONTEXT_MAX_SCOPE_LINES`` contribute only their signature line), the
+signatures of enclosing classes are kept, and an outline of the file's other
+definitions follows the hunks. Python is parsed with ``ast``; brace languages
+(JS/TS, Java, Kotlin, Go, Rust, C-family, PHP, Swift, Scala) with a
+lightweight outline parser. Anything else, or a file without its new
+content, keeps the plain diff.
+"""
+
+from __future__ import annotations
+import ast
+import functools
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from agents.diff_index import DiffRow, hunk_rows, render_rows, split_hunks
+from config import CONTEXT_MAX_SCOPE_LINES, CONTEXT_MODE
+from utils import file_diff
+
+PY_EXTS = {".py", ".pyi"}
+BRACE_EXTS = {
+    ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".java", ".kt", ".kts", ".go", ".rs",
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".php", ".swift", ".scala",
+}
+HUNK_CONTEXT = 3  # lines around each change, as in the plain diff
+OUTLINE_MAX_ITEMS = 60
+OUTLINE_MAX_DEPTH = 1  # top-level definitions and their members
+
+_NOT_A_DECLARATION = r"(?!(?:if|for|while|switch|catch|with|return|else|do|try|match|foreach|using|lock)\b)"
+_BRACE_DECLARATION = re.compile(
+    r"""^[ \t]*(?:
+        (?:export[ \t]+)?(?:default[ \t]+)?(?:declare[ \t]+)?(?:abstract[ \t]+)?(?:async[ \t]+)?
+            (?:function\*?|class|interface|enum|namespace|module|object|trait)\b
+      | (?:export[ \t]+)?(?:const|let|var)[ \t]+[\w$]+[ \t]*(?::[^=]+)?=[ \t]*(?:async[ \t]+)?
+            (?:function\b|\([^)]*\)[ \t]*(?::[^=]+)?=>|[\w$]+[ \t]*=>)
+      | func\b
+      | (?:pub(?:\([\w:]+\))?[ \t]+)?(?:async[ \t]+)?(?:unsafe[ \t]+)?(?:fn|impl|struct|enum|trait|mod)\b
+      | (?:(?:public|private|protected|internal|static|final|abstract|override|virtual|async
+            |synchronized|sealed|open|suspend|fun|def)[ \t]+)+[\w<>\[\],.?& \t*]*?[\w$]+[ \t]*\(
+      | """ + _NOT_A_DECLARATION + r"""(?:async[ \t]+|get[ \t]+|set[ \t]+|static[ \t]+)*[\w$]+[ \t]*
+            \([^;]*\)[ \t]*(?::[ \t]*[^{;]+)?\{[ \t]*$
+    )""",
+    re.X,
+)
+_STRINGS_AND_COMMENTS = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`[^`]*`|//.*$")
+BRACE_OPEN_WITHIN = 5  # a declaration whose body does not open this soon has none
+
+
+@dataclass(frozen=True)
+class Scope:
+    """A function, class or similar definition (1-based inclusive lines)."""
+
+    start: int
+    end: int
+    signature: str
+    depth: int = 0
+
+    def __contains__(self, line: int) -> bool:
+        return self.start <= line <= self.end
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+
+def _with_depths(scopes: List[Scope]) -> List[Scope]:
+    ordered = sorted(scopes, key=lambda s: (s.start, -s.end))
+    result: List[Scope] = []
+    open_scopes: List[Scope] = []
+    for s in ordered:
+        while open_scopes and s.start > open_scopes[-1].end:
+            open_scopes.pop()
+        scope = Scope(s.start, s.end, s.signature, len(open_scopes))
+        result.append(scope)
+        open_scopes.append(scope)
+    return result
+
+
+def python_scopes(text: str) -> List[Scope]:
+    """Functions and classes of a Python module ([] if it does not parse)."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    lines = text.split("\n")
+    scopes = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            scopes.append(Scope(start, node.end_lineno or node.lineno, lines[node.lineno - 1].strip()))
+    return _with_depths(scopes)
+
+
+def brace_scopes(text: str) -> List[Scope]:
+    """Declarations with a ``{ ... }`` body, found line by line with brace matching."""
+    lines = text.split("\n")
+    deltas = []
+    for line in lines:
+        code = _STRINGS_AND_COMMENTS.sub("", line)
+        deltas.append((code.count("{"), code.count("}"), ";" in code))
+
+    scopes = []
+    for i, line in enumerate(lines):
+        if not _BRACE_DECLARATION.match(line):
+            continue
+        depth, opened = 0, False
+        for j in range(i, len(lines)):
+            opens, closes, statement_end = deltas[j]
+            depth += opens - closes
+            opened = opened or opens > 0
+            if opened and depth <= 0:
+                if j > i:
+                    scopes.append(Scope(i + 1, j + 1, line.strip()))
+                break
+            if not opened and (statement_end or j - i >= BRACE_OPEN_WITHIN):
+                break
+    return _with_depths(scopes)
+
+
+def has_outline_parser(path: str) -> bool:
+    ext = os.path.splitext(path)[1].lower()
+    return ext in PY_EXTS or ext in BRACE_EXTS
+
+
+def file_scopes(path: str, text: str) -> List[Scope]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PY_EXTS:
+        return python_scopes(text)
+    if ext in BRACE_EXTS:
+        return brace_scopes(text)
+    return []
+
+
+def enclosing(scopes: List[Scope], line: int) -> List[Scope]:
+    """Scopes containing ``line``, outermost first."""
+    return [s for s in scopes if line in s]
+
+
+def render_outline(scopes: List[Scope], shown: Set[int], title: str) -> str:
+    """Indented ``start-end: signature`` lines for definitions not already shown."""
+    items = [
+        f"{'  ' * s.depth}{s.start}-{s.end}: {s.signature}"
+        for s in scopes
+        if s.depth <= OUTLINE_MAX_DEPTH and s.start not in shown
+    ]
+    if not items:
+        return ""
+    if len(items) > OUTLINE_MAX_ITEMS:
+        items = items[:OUTLINE_MAX_ITEMS] + [f"... ({len(items) - OUTLINE_MAX_ITEMS} more)"]
+    return f"{title}\n" + "\n".join(items) + "\n"
+
+
+def _full_stream(hunks: List[str], lines: List[str]) -> Optional[List[DiffRow]]:
+    """The diff with every unchanged line of the new file as context (None if they disagree)."""
+    stream: List[DiffRow] = []
+    new_next, offset = 1, 0  # next new line to emit; old - new for unchanged lines
+    for hunk in hunks:
+        rows = hunk_rows(hunk)
+        if not rows:
+            continue
+        kind, _, old, new = rows[0]
+        new_before = new - (0 if kind == "-" else 1)
+        old_before = old - (0 if kind == "+" else 1)
+        if old_before - new_before != offset or new_before > len(lines):
+            return None
+        stream.extend((" ", lines[n - 1], n + offset, n) for n in range(new_next, new_before + 1))
+        for k, text, _, n in rows:
+            if k == " " and (n > len(lines) or lines[n - 1] != text):
+                return None
+        stream.extend(rows)
+        new_next, offset = rows[-1][3] + 1, rows[-1][2] - rows[-1][3]
+    stream.extend((" ", lines[n - 1], n + offset, n) for n in range(new_next, len(lines) + 1))
+    return stream
+
+
+@functools.lru_cache(maxsize=1024)
+def _scoped(path: str, after: str, diff: str) -> str:
+    scopes = file_scopes(path, after)
+    header, hunks = split_hunks(diff)
+    lines = after.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    stream = _full_stream(hunks, lines) if scopes else None
+    if not stream:
+        return diff
+
+    shown: Set[int] = set()  # new line numbers of unchanged lines to show
+    for kind, _, _, new in stream:
+        if kind == " ":
+            continue
+        line = new if kind == "+" else new + 1  # a deletion sits before new line ``new + 1``
+        shown.update(range(new - HUNK_CONTEXT + (kind == "-"), new + HUNK_CONTEXT + 1))
+        chain = enclosing(scopes, line) or enclosing(scopes, new)
+        shown.update(scope.start for scope in chain)
+        if chain and chain[-1].size <= CONTEXT_MAX_SCOPE_LINES:
+            shown.update(range(chain[-1].start, chain[-1].end + 1))
+
+    out = [header]
+    run: List[DiffRow] = []
+    for row in stream:
+        if row[0] != " " or row[3] in shown:
+            run.append(row)
+        elif run:
+            out.append(render_rows(run))
+            run = []
+    if run:
+        out.append(render_rows(run))
+    outline = render_outline(scopes, shown, "Outline of the rest of the file (new line ranges):")
+    return "".join(out) + (f"\n{outline}" if outline else "")
+
+
+def scoped_diff(fc: dict, diff_index=None) -> str:
+    """The file's diff with enclosing-scope context (see module docstring).
+
+    Falls back to ``file_diff`` for new and deleted files, split-file parts,
+    languages without a parser, and files whose new content is unknown.
+    """
+    diff = file_diff(fc, diff_index)
+    if (
+        CONTEXT_MODE != "scope"
+        or fc.get("part")
+        or fc.get("change_type") in ("add", "delete")
+        or not diff
+        or not fc.get("after")
+        or not has_outline_parser(fc["path"])
+    ):
+        return diff
+    return _scoped(fc["path"], fc["after"], diff)
+
+
+def new_file_outline(fc: dict) -> str:
+    """Outline of a new file's definitions ("" if there is nothing to outline)."""
+    if CONTEXT_MODE != "scope" or fc.get("part"):
+        return ""
+    return render_outline(file_scopes(fc["path"], fc.get("after", "")), set(), "Definitions (line ranges):")
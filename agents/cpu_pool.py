@@ -0,0 +1,109 @@
+"""CPU-bound work off the event loop, and a monitor for how long the loop stalls.
+
+Diffing a large file or rendering a big prompt inside a reviewer coroutine
+blocks every in-flight HTTP response and LLM stream until it finishes.
+``run_cpu`` sends pure, picklable functions (e.g. ``compute_file_diff``) to a
+process pool sized to the machine; ``run_blocking`` runs closures over
+review state (prompt rendering) on a thread pool. ``CPU_POOL=inline`` keeps
+everything on the loop, as before.
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+
+from config import CPU_POOL, CPU_WORKERS
+
+T = TypeVar("T")
+
+_process_pool: Optional[Executor] = None
+_thread_pool: Optional[Executor] = None
+
+
+def pool_size() -> int:
+    return CPU_WORKERS or os.cpu_count() or 1
+
+
+def _get_process_pool() -> Executor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=pool_size())
+    return _process_pool
+
+
+def _get_thread_pool() -> Executor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=pool_size(), thread_name_prefix="cpu")
+    return _thread_pool
+
+
+async def run_cpu(fn: Callable[..., T], *args) -> T:
+    """Run a pure function in the process pool (thread pool if ``CPU_POOL=thread``)."""
+    if CPU_POOL == "inline":
+        return fn(*args)
+    pool = _get_process_pool() if CPU_POOL == "process" else _get_thread_pool()
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+async def run_blocking(fn: Callable[..., T], *args) -> T:
+    """Run a closure over unpicklable state (e.g. prompt rendering) in the thread pool.
+
+    The work still holds the GIL, but the loop gets it back every switch
+    interval instead of only when the work finishes. Like ``asyncio.to_thread``
+    it runs in a copy of the caller's context, so context-tracked reports
+    (e.g. prompt trims) still see it.
+    """
+    if CPU_POOL == "inline":
+        return fn(*args)
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_get_thread_pool(), ctx.run, fn, *args)
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up from a short sleep."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self) -> "LoopLagMonitor":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.samples, default=0.0)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def render(self) -> str:
+        return (
+            f"Event-loop lag: p95 {self.percentile(0.95) * 1000:.0f} ms, "
+            f"max {self.max_lag * 1000:.0f} ms ({len(self.samples)} samples)"
+        )
@@ -20,6 +20,7 @@ async def fetch_changes(state: dict) -> dict:
             "before": fc.before,
             "after": fc.after,
             "old_path": fc.old_path,
+            "patch": fc.patch,
         }
         for fc in file_changes
     ]
@@ -0,0 +1,275 @@
+"""Pluggable line diff engine behind ``make_diff``/``count_changed_lines``/``DiffIndex``.
+
+``difflib.SequenceMatcher`` is quadratic on long files with many repeated
+lines (lockfiles, JSON fixtures, generated code). This module adds a
+histogram diff over hashed line IDs, with a linear-space Myers fallback for
+regions that have no low-occurrence lines, and picks an engine per file:
+
+- ``difflib``   — ``SequenceMatcher`` (the historical output)
+- ``histogram`` — histogram diff + Myers fallback
+- ``auto``      — ``difflib`` up to ``DIFF_ENGINE_AUTO_LINES`` lines, so normal
+  inputs diff exactly as before, ``histogram`` above that
+"""
+
+from __future__ import annotations
+import difflib
+from typing import Iterator, List, Sequence, Tuple
+
+from config import DIFF_ENGINE, DIFF_ENGINE_AUTO_LINES
+
+Opcode = Tuple[str, int, int, int, int]
+Block = Tuple[int, int, int]  # (a index, b index, length) of a run of equal lines
+
+HISTOGRAM_MAX_CHAIN = 64  # lines occurring more often than this never anchor a match
+MYERS_MAX_COST = 4_000  # edit-distance budget per fallback region before giving up on it
+MYERS_TRIAL_COST = 128  # budget for trying Myers where the best histogram anchor is ambiguous
+
+
+def _intern(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    ids: dict = {}
+    return [ids.setdefault(x, len(ids)) for x in a], [ids.setdefault(x, len(ids)) for x in b]
+
+
+# ── Myers (linear space) ─────────────────────────────────────────────
+
+
+def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_cost):
+    """Myers' middle snake of a[a_lo:a_hi] vs b[b_lo:b_hi] (first and last lines differ).
+
+    Returns (x, y, u, v) in absolute coordinates, or None if the edit
+    distance exceeds ``max_cost``.
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    delta = n - m
+    odd = delta & 1
+    limit = min((n + m + 1) // 2, max_cost)
+    offset = limit + 1
+    vf = [0] * (2 * offset + 1)
+    vb = [0] * (2 * offset + 1)
+    for d in range(limit + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vf[offset + k - 1] < vf[offset + k + 1]):
+                x = vf[offset + k + 1]
+            else:
+                x = vf[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            vf[offset + k] = x
+            c = delta - k
+            if odd and -(d - 1) <= c <= d - 1 and x + vb[offset + c] >= n:
+                return a_lo + x0, b_lo + y0, a_lo + x, b_lo + y
+        for c in range(-d, d + 1, 2):
+            if c == -d or (c != d and vb[offset + c - 1] < vb[offset + c + 1]):
+                x = vb[offset + c + 1]
+            else:
+                x = vb[offset + c - 1] + 1
+            y = x - c
+            x0, y0 = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            vb[offset + c] = x
+            k = delta - c
+            if not odd and -d <= k <= d and x + vf[offset + k] >= n:
+                return a_hi - x, b_hi - y, a_hi - x0, b_hi - y0
+    return None
+
+
+def myers_blocks(a: Sequence[int], b: Sequence[int], a_lo: int, a_hi: int, b_lo: int, b_hi: int,
+                 out: List[Block], max_cost: int = MYERS_MAX_COST) -> bool:
+    """Append the equal runs of a minimal diff of the two ranges to ``out``.
+
+    Sub-regions whose edit distance exceeds ``max_cost`` are reported as
+    replaced; returns False if that happened.
+    """
+    complete = True
+    stack = [(a_lo, a_hi, b_lo, b_hi)]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            out.append((a_lo, b_lo, 1))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            out.append((a_hi, b_hi, 1))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        snake = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_cost)
+        if snake is None:
+            complete = False  # too costly: report the region as replaced
+            continue
+        x, y, u, v = snake
+        if u > x:
+            out.append((x, y, u - x))
+        stack.append((a_lo, x, b_lo, y))
+        stack.append((u, a_hi, v, b_hi))
+    return complete
+
+
+# ── Histogram ────────────────────────────────────────────────────────
+
+
+def histogram_blocks(a: Sequence[int], b: Sequence[int], out: List[Block]) -> None:
+    """Append the equal runs of a histogram diff of ``a`` and ``b`` to ``out``.
+
+    Each region is anchored on the common run whose rarest line occurs the
+    fewest times in ``a`` (longest run on ties), then both sides of it are
+    diffed the same way. Regions with no line rarer than
+    ``HISTOGRAM_MAX_CHAIN`` fall back to Myers. When the best anchor is not
+    unique (periodic data such as fixtures, where a shifted run can match as
+    long as the right one), a budgeted Myers pass is tried first.
+    """
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            out.append((a_lo, b_lo, 1))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            out.append((a_hi, b_hi, 1))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        occurrences: dict = {}
+        for i in range(a_lo, a_hi):
+            occurrences.setdefault(a[i], []).append(i)
+
+        best = None  # (count, -length, a start, b start, length)
+        bi = b_lo
+        while bi < b_hi:
+            positions = occurrences.get(b[bi])
+            if positions is None or len(positions) > HISTOGRAM_MAX_CHAIN:
+                bi += 1
+                continue
+            b_next = bi + 1
+            for ai in positions:
+                sa, sb = ai, bi
+                count = len(positions)
+                while sa > a_lo and sb > b_lo and a[sa - 1] == b[sb - 1]:
+                    sa -= 1
+                    sb -= 1
+                    count = min(count, len(occurrences[a[sa]]))
+                ea, eb = ai + 1, bi + 1
+                while ea < a_hi and eb < b_hi and a[ea] == b[eb]:
+                    count = min(count, len(occurrences[a[ea]]))
+                    ea += 1
+                    eb += 1
+                candidate = (count, -(ea - sa), sa, sb, ea - sa)
+                if best is None or candidate[:2] < best[:2]:
+                    best = candidate
+                b_next = max(b_next, eb)
+            bi = b_next
+
+        if best is None:
+            myers_blocks(a, b, a_lo, a_hi, b_lo, b_hi, out)
+            continue
+        if best[0] > 1:
+            trial: List[Block] = []
+            if myers_blocks(a, b, a_lo, a_hi, b_lo, b_hi, trial, MYERS_TRIAL_COST):
+                out.extend(trial)
+                continue
+        _, _, sa, sb, length = best
+        out.append((sa, sb, length))
+        stack.append((a_lo, sa, b_lo, sb))
+        stack.append((sa + length, a_hi, sb + length, b_hi))
+
+
+# ── Opcodes ──────────────────────────────────────────────────────────
+
+
+def blocks_to_opcodes(blocks: List[Block], len_a: int, len_b: int) -> List[Opcode]:
+    """``SequenceMatcher.get_opcodes``-style edits from equal runs."""
+    merged: List[Block] = []
+    for i, j, size in sorted(blocks):
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    merged.append((len_a, len_b, 0))
+
+    codes: List[Opcode] = []
+    i = j = 0
+    for ai, bj, size in merged:
+        if i < ai and j < bj:
+            codes.append(("replace", i, ai, j, bj))
+        elif i < ai:
+            codes.append(("delete", i, ai, j, bj))
+        elif j < bj:
+            codes.append(("insert", i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            codes.append(("equal", ai, i, bj, j))
+    return codes
+
+
+def get_opcodes(a: Sequence[str], b: Sequence[str], engine: str = "") -> List[Opcode]:
+    """Edit script turning line list ``a`` into ``b`` with the configured engine."""
+    engine = engine or DIFF_ENGINE
+    if engine == "auto":
+        engine = "difflib" if max(len(a), len(b)) <= DIFF_ENGINE_AUTO_LINES else "histogram"
+    if engine == "difflib":
+        return difflib.SequenceMatcher(None, a, b).get_opcodes()
+    if engine != "histogram":
+        raise ValueError(f"Unknown DIFF_ENGINE {engine!r} (expected auto, difflib or histogram)")
+    a_ids, b_ids = _intern(a, b)
+    blocks: List[Block] = []
+    histogram_blocks(a_ids, b_ids, blocks)
+    return blocks_to_opcodes(blocks, len(a), len(b))
+
+
+def group_opcodes(codes: List[Opcode], n: int = 3) -> Iterator[List[Opcode]]:
+    """Hunks with ``n`` lines of context (``SequenceMatcher.get_grouped_opcodes``)."""
+    codes = list(codes) or [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Unified-diff range, as ``difflib`` formats it."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def unified_hunks(a: Sequence[str], b: Sequence[str], codes: List[Opcode], n: int = 3) -> List[str]:
+    """Render ``@@`` hunks exactly as ``difflib.unified_diff(..., lineterm="")`` does."""
+    hunks: List[str] = []
+    for group in group_opcodes(codes, n):
+        first, last = group[0], group[-1]
+        parts = [f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@"]
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                parts.extend(" " + line for line in a[i1:i2])
+                continue
+            if tag in ("replace", "delete"):
+                parts.extend("-" + line for line in a[i1:i2])
+            if tag in ("replace", "insert"):
+                parts.extend("+" + line for line in b[j1:j2])
+        hunks.append("".join(parts))
+    return hunks
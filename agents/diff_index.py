@@ -0,0 +1,229 @@
+"""Per-review index of file diffs, computed once per file on first access.
+
+Every reviewer, triage and the synthesizer's comment budget need the same
+per-file diff data. ``DiffIndex`` runs the diff engine once per file and
+derives everything from its opcodes: the unified diff text (identical to
+``utils.make_diff``), its hunks, add/delete counts and the new→old line map.
+``warm`` computes a review's diffs up front, large files in the CPU pool.
+Files that carry a platform ``patch`` are parsed from it instead of diffed.
+"""
+
+from __future__ import annotations
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agents.cpu_pool import run_cpu
+from agents.diff_engine import get_opcodes, unified_hunks
+from config import CPU_OFFLOAD_MIN_LINES
+
+CONTEXT_LINES = 3
+
+_HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def split_hunks(diff: str) -> Tuple[str, List[str]]:
+    """Split a unified diff into its file header and its ``@@`` hunks."""
+    starts = [m.start() for m in _HUNK_HEADER.finditer(diff)]
+    if not starts:
+        return diff, []
+    bounds = starts + [len(diff)]
+    return diff[:starts[0]], [diff[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+# (kind, text, old line, new line); for "+" rows old is the line before, for "-" rows new is
+DiffRow = Tuple[str, str, int, int]
+
+
+def hunk_rows(hunk: str) -> List[DiffRow]:
+    """Rows of one hunk, in either diff layout this repo produces.
+
+    ``make_diff`` puts the first line straight after the ``@@`` header;
+    platform patches end the header line (optionally with a section heading).
+    The header's line counts tell the two apart.
+    """
+    m = _HUNK_HEADER.match(hunk)
+    old_count = int(m.group(2)) if m.group(2) is not None else 1
+    new_count = int(m.group(4)) if m.group(4) is not None else 1
+    lines = hunk[m.end():].split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    lines = [l for l in lines if not l.startswith("\\")]
+
+    def counts(body: List[str]) -> Tuple[int, int]:
+        return sum(l[:1] in (" ", "-") for l in body), sum(l[:1] in (" ", "+") for l in body)
+
+    if counts(lines) != (old_count, new_count):
+        lines = lines[1:]  # header line carried a section heading
+    old = int(m.group(1)) - (1 if old_count else 0)
+    new = int(m.group(3)) - (1 if new_count else 0)
+    rows: List[DiffRow] = []
+    for line in lines:
+        kind, text = line[:1] or " ", line[1:]
+        if kind == "+":
+            new += 1
+        elif kind == "-":
+            old += 1
+        else:
+            old += 1
+            new += 1
+        rows.append((kind, text, old, new))
+    return rows
+
+
+def _range(before: int, count: int) -> str:
+    start = before + 1 if count else before
+    return f"{start}" if count == 1 else f"{start},{count}"
+
+
+def render_rows(rows: List[DiffRow]) -> str:
+    """One hunk with a header recomputed for exactly these rows."""
+    kind, _, old, new = rows[0]
+    old_before = old - (0 if kind == "+" else 1)
+    new_before = new - (0 if kind == "-" else 1)
+    old_count = sum(r[0] != "+" for r in rows)
+    new_count = sum(r[0] != "-" for r in rows)
+    body = "\n".join(f"{r[0]}{r[1]}" for r in rows)
+    return f"@@ -{_range(old_before, old_count)} +{_range(new_before, new_count)} @@\n{body}\n"
+
+
+@dataclass
+class FileDiff:
+    """Diff data for one file."""
+
+    path: str
+    header: str = ""
+    hunks: List[str] = field(default_factory=list)
+    added: int = 0
+    removed: int = 0
+    # new_to_old[n - 1] is the old line number of new line n, or None if added
+    new_to_old: List[Optional[int]] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return self.header + "".join(self.hunks) if self.hunks else ""
+
+    @property
+    def changed(self) -> int:
+        return self.added + self.removed
+
+    def old_line(self, new_line: int) -> Optional[int]:
+        """Line in the old version that ``new_line`` corresponds to (None if added)."""
+        if 1 <= new_line <= len(self.new_to_old):
+            return self.new_to_old[new_line - 1]
+        return None
+
+    def is_added(self, new_line: int) -> bool:
+        return 1 <= new_line <= len(self.new_to_old) and self.new_to_old[new_line - 1] is None
+
+
+def compute_file_diff(before: str, after: str, path: str) -> FileDiff:
+    """Diff once and derive the unified diff, counts and line map."""
+    a = before.splitlines(keepends=True)
+    b = after.splitlines(keepends=True)
+    opcodes = get_opcodes(a, b)
+
+    fd = FileDiff(path=path)
+    fd.new_to_old = [None] * len(b)
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            for k in range(j2 - j1):
+                fd.new_to_old[j1 + k] = i1 + k + 1
+        else:
+            fd.removed += i2 - i1
+            fd.added += j2 - j1
+
+    hunks = unified_hunks(a, b, opcodes, CONTEXT_LINES)
+    if hunks:
+        fd.header = f"--- a/{path}+++ b/{path}"
+        fd.hunks = hunks
+    return fd
+
+
+def parse_patch(patch: str, path: str) -> FileDiff:
+    """Diff data from platform-provided hunks (GitHub's per-file ``patch``).
+
+    Hunk headers end at the first newline (they may carry a section heading).
+    The line map only reaches the end of the last hunk.
+    """
+    fd = FileDiff(path=path)
+    _, hunks = split_hunks(patch)
+    if not hunks:
+        return fd
+    fd.header = f"--- a/{path}+++ b/{path}"
+    fd.hunks = hunks
+    old = new = 0  # last line number consumed on each side
+    for hunk in hunks:
+        m = _HUNK_HEADER.match(hunk)
+        old_start, new_start = int(m.group(1)), int(m.group(3))
+        new_before = new_start - 1 if m.group(4) != "0" else new_start
+        old_before = old_start - 1 if m.group(2) != "0" else old_start
+        for _ in range(new_before - new):  # unchanged lines between hunks
+            old += 1
+            fd.new_to_old.append(old)
+        old, new = old_before, new_before
+        for line in hunk.split("\n")[1:]:
+            if line.startswith("+"):
+                new += 1
+                fd.added += 1
+                fd.new_to_old.append(None)
+            elif line.startswith("-"):
+                old += 1
+                fd.removed += 1
+            elif line.startswith(" "):
+                old += 1
+                new += 1
+                fd.new_to_old.append(old)
+    return fd
+
+
+class DiffIndex:
+    """Lazily computed ``FileDiff`` per path, shared by one review."""
+
+    def __init__(self) -> None:
+        self._files: Dict[Tuple[str, int, int, int], FileDiff] = {}
+        self.computed = 0
+
+    @staticmethod
+    def _key(fc: dict) -> Tuple[str, int, int, int]:
+        before, after = fc.get("before", "") or "", fc.get("after", "") or ""
+        return fc["path"], hash(before), hash(after), hash(fc.get("patch"))
+
+    def _store(self, key: Tuple[str, int, int, int], fd: FileDiff) -> FileDiff:
+        self._files[key] = fd
+        self.computed += 1
+        return fd
+
+    def get(self, fc: dict) -> FileDiff:
+        key = self._key(fc)
+        fd = self._files.get(key)
+        if fd is None:
+            if fc.get("patch") is not None:
+                fd = self._store(key, parse_patch(fc["patch"], fc["path"]))
+            else:
+                before, after = fc.get("before", "") or "", fc.get("after", "") or ""
+                fd = self._store(key, compute_file_diff(before, after, fc["path"]))
+        return fd
+
+    async def warm(self, file_changes: List[dict], min_lines: int = CPU_OFFLOAD_MIN_LINES) -> None:
+        """Compute every file's diff now; files of ``min_lines`` or more run concurrently in the CPU pool."""
+        pending: Dict[Tuple[str, int, int, int], "asyncio.Future[FileDiff]"] = {}
+        for fc in file_changes:
+            key = self._key(fc)
+            if key in self._files or key in pending:
+                continue
+            before, after = fc.get("before", "") or "", fc.get("after", "") or ""
+            if fc.get("patch") is not None or before.count("\n") + after.count("\n") < min_lines:
+                self.get(fc)
+            else:
+                pending[key] = asyncio.ensure_future(run_cpu(compute_file_diff, before, after, fc["path"]))
+        for key, fd in zip(pending, await asyncio.gather(*pending.values())):
+            self._store(key, fd)
+
+    def diff(self, fc: dict) -> str:
+        return self.get(fc).text
+
+    def changed_lines(self, file_changes: List[dict]) -> int:
+        """Added + removed lines across the PR (the synthesizer's comment budget)."""
+        return sum(self.get(fc).changed for fc in file_changes)
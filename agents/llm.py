@@ -0,0 +1,432 @@
+"""Shared LLM call layer — routing, admission control, retries and response parsing.
+
+Every reviewer goes through ``invoke_llm`` so that all LLM traffic in the
+process (including several PRs reviewed concurrently) shares the TPM/RPM
+budget of the configured backends (``agents.backends``). Calls wait in a
+priority queue until a backend's quota has room, so a large PR degrades into
+a steady stream just under the limit instead of a burst of 429s. With
+``LLM_HEDGING`` on, calls that outlive their agent's learned tail latency
+are raced against a duplicate sent from spare quota.
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import functools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+
+from agents.admission import DEFAULT_PRIORITY, AdmissionController
+from agents.backends import Backend, get_backend_pool
+from agents.batch import BatchReplay, current_batch_mode, request_body
+from agents.chunker import estimate_tokens
+from agents.cpu_pool import run_blocking
+from agents.tokens import get_token_estimator, language_for, raw_count
+from agents.model_routing import needs_escalation, select_model
+from agents.streaming import (
+    IncrementalFindingsParser,
+    current_finding_stream,
+    expand_finding,
+    salvage_comments,
+)
+from agents.types import CompactReviewResult, ReviewResult, review_response_format
+from config import (
+    GPT_MODEL,
+    LLM_STREAMING,
+    LLM_EXPECTED_OUTPUT_TOKENS,
+    LLM_HEDGING,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MAX_RATE,
+    LLM_HEDGE_MIN_SAMPLES,
+)
+from retry import LLM_TRANSIENT_ERRORS, with_llm_retry
+
+# Lower value = admitted first. Security and dependency findings are the
+# ones worth waiting for; style/nit-heavy reviews go last.
+AGENT_PRIORITY = {
+    "security": 0,
+    "dependency": 0,
+    "fused": 0,  # small PRs: one call that includes security
+    "test_coverage": 1,
+    "best_practices": 2,
+    "pr_description": 2,
+}
+
+
+class Hedger:
+    """Learns per-agent call latency and decides when a duplicate call is worth it.
+
+    A call still running after the agent's ``percentile`` latency gets one
+    duplicate, as long as hedges stay under ``max_rate`` of all calls.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_rate: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200,
+    ) -> None:
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._window = window
+        self.calls = 0
+        self.hedges = 0
+
+    def observe(self, agent_name: str, latency: float) -> None:
+        self._latencies.setdefault(agent_name, deque(maxlen=self._window)).append(latency)
+
+    def threshold(self, agent_name: str) -> Optional[float]:
+        """Latency after which a call is hedged; None until enough samples exist."""
+        samples = self._latencies.get(agent_name)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def allow(self) -> bool:
+        return self.hedges + 1 <= self.max_rate * self.calls
+
+
+_hedger = Hedger(LLM_HEDGE_PERCENTILE, LLM_HEDGE_MAX_RATE, LLM_HEDGE_MIN_SAMPLES)
+
+
+def get_hedger() -> Hedger:
+    return _hedger
+
+
+@dataclass
+class UsageStats:
+    """Token usage and latency of the LLM calls made during one review."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    latency: float = 0.0
+    hedges: int = 0
+    hedge_tokens: int = 0
+    escalations: int = 0
+    by_agent: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    by_model: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, agent_name: str, resp: AIMessage, latency: float, model: str = "") -> None:
+        usage = getattr(resp, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens", 0) or 0
+        output_tokens = usage.get("output_tokens", 0) or 0
+        cached = (usage.get("input_token_details") or {}).get("cache_read")
+        if cached is None:
+            token_usage = (getattr(resp, "response_metadata", None) or {}).get("token_usage") or {}
+            cached = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        cached = cached or 0
+
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached
+        self.output_tokens += output_tokens
+        self.latency += latency
+        agent = self.by_agent.setdefault(
+            agent_name,
+            {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "latency": 0.0},
+        )
+        agent["calls"] += 1
+        agent["input_tokens"] += input_tokens
+        agent["cached_tokens"] += cached
+        agent["output_tokens"] += output_tokens
+        agent["latency"] += latency
+        if model:
+            self.by_model[model] = self.by_model.get(model, 0) + 1
+
+    def record_hedge(self, estimated_tokens: int) -> None:
+        """Count a duplicate call; its cost is the admitted estimate."""
+        self.hedges += 1
+        self.hedge_tokens += estimated_tokens
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def render(self) -> str:
+        avg = self.latency / self.calls if self.calls else 0.0
+        line = (
+            f"LLM usage: {self.calls} call(s), {self.input_tokens} input tokens "
+            f"({self.cached_tokens} cached, {self.cache_hit_rate:.0%}), "
+            f"{self.output_tokens} output tokens, avg latency {avg:.1f}s"
+        )
+        if self.hedges:
+            line += f", {self.hedges} hedged (~{self.hedge_tokens} extra tokens)"
+        if len(self.by_model) > 1:
+            line += "; models: " + ", ".join(f"{m} x{n}" for m, n in sorted(self.by_model.items()))
+        if self.escalations:
+            line += f", {self.escalations} escalated"
+        return line
+
+
+_usage: contextvars.ContextVar[Optional[UsageStats]] = contextvars.ContextVar(
+    "llm_usage", default=None
+)
+
+
+def track_usage() -> UsageStats:
+    """Start collecting usage for LLM calls made from the current context.
+
+    Tasks spawned afterwards (e.g. by ``asyncio.gather``) inherit the tracker,
+    so concurrent reviews each get their own numbers.
+    """
+    stats = UsageStats()
+    _usage.set(stats)
+    return stats
+
+
+def estimate_call_tokens(messages: List[BaseMessage]) -> int:
+    """Prompt estimate plus the expected completion size."""
+    prompt = sum(estimate_tokens(str(m.content)) for m in messages)
+    return prompt + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+@with_llm_retry
+async def _routed_call(
+    messages: List[BaseMessage],
+    tokens: int,
+    priority: int,
+    agent_name: str,
+    file_paths: List[str],
+    model: str,
+    llm_kwargs: dict,
+) -> AIMessage:
+    """Send a call to the least-loaded backend, failing over on 429/5xx."""
+    pool = get_backend_pool()
+    tried: List[str] = []
+    while True:
+        backend = pool.pick(exclude=tried)
+        tried.append(backend.name)
+        try:
+            return await _admitted_call(
+                backend, messages, tokens, priority, agent_name, file_paths, model, llm_kwargs
+            )
+        except LLM_TRANSIENT_ERRORS as e:
+            pool.mark_failure(backend, e)
+            if not pool.has_healthy(exclude=tried):
+                raise
+            print(f"  [warn] LLM backend {backend.name} failed ({type(e).__name__}); failing over")
+
+
+async def _admitted_call(
+    backend: Backend,
+    messages: List[BaseMessage],
+    tokens: int,
+    priority: int,
+    agent_name: str,
+    file_paths: List[str],
+    model: str,
+    llm_kwargs: dict,
+) -> AIMessage:
+    pool = get_backend_pool()
+    controller = backend.controller
+    pool.begin(backend, tokens)
+    try:
+        await controller.acquire(tokens, priority)
+        # The first client build loads TLS/httpx state (~0.5s); keep it off the loop.
+        llm = await run_blocking(functools.partial(backend.chat_model, model, **llm_kwargs))
+
+        async def send(publish: bool) -> AIMessage:
+            if LLM_STREAMING:
+                return await _stream_call(llm, messages, agent_name, file_paths, publish)
+            return await llm.ainvoke(messages)
+
+        start = time.monotonic()
+        if LLM_HEDGING:
+            resp = await hedged_send(send, agent_name, tokens, controller)
+        else:
+            resp = await send(True)
+        latency = time.monotonic() - start
+    finally:
+        pool.end(backend, tokens)
+    pool.mark_success(backend)
+    get_hedger().observe(agent_name, latency)
+    usage = getattr(resp, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        controller.reconcile(tokens, usage["total_tokens"])
+    if usage.get("input_tokens"):
+        get_token_estimator().observe(
+            sum(raw_count(str(m.content)) for m in messages),
+            usage["input_tokens"],
+            {language_for(p) for p in file_paths},
+        )
+    stats = _usage.get()
+    if stats is not None:
+        stats.record(agent_name, resp, latency, model)
+    return resp
+
+
+async def hedged_send(
+    send: Callable[[bool], Awaitable[AIMessage]],
+    agent_name: str,
+    tokens: int,
+    controller: AdmissionController,
+    hedger: Optional[Hedger] = None,
+) -> AIMessage:
+    """Run ``send``, racing a duplicate against it if it outlives the hedge threshold.
+
+    The duplicate only goes out when the hedge budget and the spare quota of
+    ``controller`` (the backend's) allow it, and does not publish streamed
+    findings. The first successful response wins and the other call is
+    cancelled; an error from one call is only raised if the other fails too.
+    """
+    hedger = hedger or get_hedger()
+    hedger.calls += 1
+    primary = asyncio.ensure_future(send(True))
+    pending = {primary}
+    try:
+        delay = hedger.threshold(agent_name)
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done or not hedger.allow() or not controller.try_acquire(tokens):
+            return await primary
+
+        hedger.hedges += 1
+        stats = _usage.get()
+        if stats is not None:
+            stats.record_hedge(tokens)
+        pending.add(asyncio.ensure_future(send(False)))
+        errors = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = None
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                elif winner is None:
+                    winner = task.result()
+            if winner is not None:
+                return winner
+        raise errors[0]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _stream_call(
+    llm: BaseChatModel,
+    messages: List[BaseMessage],
+    agent_name: str,
+    file_paths: List[str],
+    publish: bool = True,
+) -> AIMessage:
+    """Stream a completion, publishing each finding as soon as its JSON closes.
+
+    If the stream breaks after at least one complete finding arrived, the
+    partial message is returned (and salvaged by ``parse_review_result``)
+    instead of discarding what was already generated.
+    """
+    parser = IncrementalFindingsParser()
+    stream = current_finding_stream() if publish else None
+    full = None
+    try:
+        async for chunk in llm.astream(messages):
+            full = chunk if full is None else full + chunk
+            if not isinstance(chunk.content, str):
+                continue
+            for section, obj in parser.feed(chunk.content):
+                comment = expand_finding(obj, file_paths) if stream is not None else None
+                if comment is not None:
+                    stream.publish(section or agent_name, comment)
+    except LLM_TRANSIENT_ERRORS:
+        if full is None or not parser.findings:
+            raise
+        print(f"  [warn] {agent_name} stream interrupted; keeping {len(parser.findings)} finding(s)")
+    if full is None:
+        return AIMessage(content="")
+    return AIMessage(
+        content=full.content,
+        usage_metadata=full.usage_metadata,
+        response_metadata=full.response_metadata,
+    )
+
+
+async def invoke_llm(
+    messages: List[BaseMessage],
+    agent_name: str,
+    file_paths: List[str],
+    response_format: Optional[dict] = None,
+    model: Optional[str] = None,
+    category: Optional[str] = None,
+) -> AIMessage:
+    """Call the chat model on the least-loaded backend, within its quota.
+
+    The response is constrained to the compact findings schema (or the given
+    ``response_format``) with native structured output. ``file_paths`` is the
+    file list the prompt's ``[n]`` markers index into. Unless ``model`` is
+    given, the model is picked by ``agents.model_routing`` from the agent,
+    file ``category`` and prompt size, and a low-confidence critical finding
+    from the small model is re-checked on the large one. In batch mode
+    (``agents.batch``) the call is recorded or answered from batch results.
+    """
+    llm_kwargs = dict(
+        temperature=0.1,
+        max_retries=0,
+        stream_usage=True,
+        # Passed through untouched so langchain keeps the plain streaming path.
+        extra_body={"response_format": response_format or review_response_format()},
+    )
+    tokens = estimate_call_tokens(messages)
+    routed = model or select_model(agent_name, category, tokens)
+    resp = await _call_model(messages, agent_name, file_paths, routed, llm_kwargs, tokens)
+    if model is None and routed != GPT_MODEL and needs_escalation(resp.content):
+        print(f"  [route] {agent_name}: low-confidence critical finding on {routed}; "
+              f"re-checking with {GPT_MODEL}")
+        stats = _usage.get()
+        if stats is not None:
+            stats.escalations += 1
+        resp = await _call_model(messages, agent_name, file_paths, GPT_MODEL, llm_kwargs, tokens)
+    return resp
+
+
+async def _call_model(
+    messages: List[BaseMessage],
+    agent_name: str,
+    file_paths: List[str],
+    model: str,
+    llm_kwargs: dict,
+    tokens: int,
+) -> AIMessage:
+    batch = current_batch_mode()
+    if batch is not None:
+        resp = batch.handle(request_body(messages, model, llm_kwargs))
+        if resp is not None:
+            stats = _usage.get()
+            if stats is not None and isinstance(batch, BatchReplay):
+                stats.record(agent_name, resp, 0.0, model)
+            return resp
+        print(f"  [warn] {agent_name}: no batch result for this request; calling live")
+    priority = AGENT_PRIORITY.get(agent_name, DEFAULT_PRIORITY)
+    return await _routed_call(
+        messages, tokens, priority, agent_name, file_paths, model, llm_kwargs
+    )
+
+
+def parse_review_result(content: str, agent_name: str, file_paths: List[str]) -> ReviewResult:
+    """Expand a compact structured-output response into a ReviewResult.
+
+    Structured output guarantees well-formed JSON for complete responses; a
+    truncated one keeps every finding that was complete, but is flagged with
+    ``error`` so it is not cached.
+    """
+    try:
+        return CompactReviewResult.model_validate_json(content).expand(agent_name, file_paths)
+    except ValueError:
+        salvaged = salvage_comments(content or "", file_paths)
+        return ReviewResult(
+            agent_name=agent_name,
+            comments=salvaged,
+            summary=f"Response incomplete; kept {len(salvaged)} complete finding(s).",
+            error="Truncated response",
+        )
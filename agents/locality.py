@@ -0,0 +1,166 @@
+"""Relationships between changed files, for locality-aware chunking.
+
+Two changed files are related when one references the other (Python
+``import``/``from ... import``, JS/TS ``import``/``require``/``import()``
+with a relative or ``@/``-style specifier) or when one is the other's test
+by naming convention. Related files form clusters (connected components),
+which ``CHUNKING_MODE=locality`` keeps in one LLM call where the budget
+allows.
+"""
+
+from __future__ import annotations
+import os
+import posixpath
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+_PY_FROM = re.compile(r"^[ \t]*from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+\(?([\w \t,]+)", re.M)
+_PY_IMPORT = re.compile(r"^[ \t]*import[ \t]+([\w., \t]+)", re.M)
+_JS_SPECIFIER = re.compile(
+    r"""(?:\bfrom[ \t]*|\brequire[ \t]*\([ \t]*|\bimport[ \t]*\([ \t]*|^[ \t]*import[ \t]+)["']([^"'\n]+)["']""",
+    re.M,
+)
+_TEST_AFFIXES = re.compile(r"^test_|_test$|\.test$|\.spec$|_spec$")
+
+PY_EXTS = {".py", ".pyi"}
+JS_EXTS = [".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs", ".vue", ".svelte"]
+JS_ALIAS_PREFIXES = ("@/", "~/")
+
+
+def _content(fc: dict) -> str:
+    return fc.get("before", "") if fc.get("change_type") == "delete" else fc.get("after", "")
+
+
+class _PathIndex:
+    """Changed paths, looked up by exact path or by trailing path components."""
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self.paths: Set[str] = set(paths)
+        self.by_suffix: Dict[str, List[str]] = {}
+        for path in sorted(self.paths):
+            parts = path.split("/")
+            for i in range(len(parts)):
+                self.by_suffix.setdefault("/".join(parts[i:]), []).append(path)
+
+    def exact(self, candidates: Iterable[str]) -> Optional[str]:
+        return next((c for c in candidates if c in self.paths), None)
+
+    def suffix(self, candidates: Iterable[str]) -> Optional[str]:
+        for c in candidates:
+            matches = self.by_suffix.get(c)
+            if matches and len(matches) == 1:
+                return matches[0]
+        return None
+
+
+def _python_references(path: str, text: str, index: _PathIndex) -> Set[str]:
+    modules = []
+    for m in _PY_FROM.finditer(text):
+        base, names = m.group(1), [n.split()[0] for n in m.group(2).split(",") if n.strip()]
+        modules.append((base, names))
+    for m in _PY_IMPORT.finditer(text):
+        modules.extend((name.split()[0], []) for name in m.group(1).split(",") if name.strip())
+
+    found = set()
+    for module, names in modules:
+        dots = len(module) - len(module.lstrip("."))
+        dotted = module[dots:].replace(".", "/")
+        stems = [f"{dotted}/{n}" if dotted else n for n in names] + ([dotted] if dotted else [])
+        candidates = [s + suffix for s in stems for suffix in (".py", "/__init__.py")]
+        if dots:
+            base = posixpath.dirname(path)
+            for _ in range(dots - 1):
+                base = posixpath.dirname(base)
+            target = index.exact(posixpath.join(base, c) if base else c for c in candidates)
+        else:
+            target = index.suffix(candidates)
+        if target:
+            found.add(target)
+    return found
+
+
+def _js_references(path: str, text: str, index: _PathIndex) -> Set[str]:
+    found = set()
+    for m in _JS_SPECIFIER.finditer(text):
+        spec = m.group(1)
+        if spec.startswith("."):
+            stem = posixpath.normpath(posixpath.join(posixpath.dirname(path), spec))
+            lookup = index.exact
+        elif spec.startswith(JS_ALIAS_PREFIXES):
+            stem, lookup = spec[2:], index.suffix
+        else:
+            continue  # a package, not a file in this PR
+        candidates = [stem] + [stem + ext for ext in JS_EXTS] + [f"{stem}/index{ext}" for ext in JS_EXTS]
+        target = lookup(candidates)
+        if target:
+            found.add(target)
+    return found
+
+
+def references(fc: dict, index: _PathIndex) -> Set[str]:
+    """Changed paths that ``fc``'s content imports or requires."""
+    path = fc["path"]
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PY_EXTS:
+        return _python_references(path, _content(fc), index) - {path}
+    if ext in JS_EXTS:
+        return _js_references(path, _content(fc), index) - {path}
+    return set()
+
+
+def _test_subject(path: str) -> Optional[str]:
+    """Stem of the file a test file covers ("button" for "Button.test.tsx"), else None."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    stem = _TEST_AFFIXES.sub("", name)
+    return stem.lower() if stem != name and stem else None
+
+
+def file_clusters(file_changes: List[dict]) -> Dict[str, int]:
+    """Cluster number per changed path; related files share one.
+
+    Clusters are numbered in order of their first path, so the numbering is
+    stable for a given PR.
+    """
+    paths = sorted({fc["path"] for fc in file_changes})
+    parent = {p: p for p in paths}
+
+    def find(p: str) -> str:
+        while parent[p] != p:
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    def union(a: str, b: str) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    index = _PathIndex(paths)
+    for fc in file_changes:
+        for target in references(fc, index):
+            union(fc["path"], target)
+
+    sources: Dict[str, List[str]] = {}
+    for p in paths:
+        if _test_subject(p) is None:
+            sources.setdefault(os.path.splitext(os.path.basename(p))[0].lower(), []).append(p)
+    for p in paths:
+        candidates = sources.get(_test_subject(p) or "", [])
+        nearest = max((shared_directory_depth(p, s) for s in candidates), default=0)
+        for source in candidates:
+            if shared_directory_depth(p, source) == nearest:
+                union(p, source)
+
+    numbers: Dict[str, int] = {}
+    return {p: numbers.setdefault(find(p), len(numbers)) for p in paths}
+
+
+def shared_directory_depth(a: str, b: str) -> int:
+    """Number of leading directories two paths have in common."""
+    da, db = posixpath.dirname(a).split("/"), posixpath.dirname(b).split("/")
+    depth = 0
+    for x, y in zip(da, db):
+        if x != y or not x:
+            break
+        depth += 1
+    return depth
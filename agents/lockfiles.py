@@ -0,0 +1,395 @@
+"""Lockfile diffs as dependency delta tables.
+
+A lockfile change can be tens of thousands of diff lines, yet all a
+reviewer needs is which packages were added, removed or moved to another
+version. Both versions of a lockfile are parsed locally into
+``{package: {version: line}}`` and compared; the prompt compiler shows the
+resulting table instead of the diff (except to the security review).
+A package whose version stayed put but whose entry changed (a ``resolved``
+URL moved to another host, a new ``integrity`` hash) gets a "source
+changed" row. Manifests (``package.json``, ``requirements.txt``, ...) keep
+their diff: they are small and their ranges and pins are what the
+dependency reviewer checks line by line.
+
+Supported: ``package-lock.json`` (v1-v3), ``yarn.lock`` (classic and berry),
+``pnpm-lock.yaml``, ``Pipfile.lock``, ``poetry.lock``, ``Cargo.lock``,
+``go.sum`` and ``Gemfile.lock``. A file that does not parse keeps its diff.
+
+The same parsers, plus exact pins in ``requirements.txt``, ``pom.xml`` and
+Gradle build files, give the dependency versions a PR introduces, which
+``agents.advisories`` checks against known vulnerabilities.
+"""
+
+from __future__ import annotations
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import ADVISORY_INDEX_FILE, LOCKFILE_DELTAS, LOCKFILE_MAX_ROWS
+
+MAX_DETAIL_CHARS = 160  # changed entry lines quoted in a "source changed" row
+
+Versions = Dict[str, Dict[str, int]]  # package -> version -> 1-based line (0 = unknown)
+
+_TOML_PACKAGE = re.compile(
+    r'^\[\[package\]\]\s*\nname\s*=\s*"([^"]+)"\s*\nversion\s*=\s*"([^"]+)"', re.M
+)
+_YARN_VERSION = re.compile(r'^\s+version:?\s+"?([^"\s]+)"?\s*$')
+_PNPM_KEY = re.compile(r"^  ['\"]?/?([^'\"\s]+?)['\"]?:\s*$")
+_GEM_SPEC = re.compile(r"^    ([\w.\-]+) \(([^)]+)\)\s*$")
+_REQUIREMENT_PIN = re.compile(r"^[ \t]*([A-Za-z0-9][\w.\-]*)(?:\[[^\]]*\])?[ \t]*===?[ \t]*([^\s;#,]+)", re.M)
+_POM_DEPENDENCY = re.compile(r"<dependency>(.*?)</dependency>", re.S)
+_POM_FIELD = re.compile(r"<(groupId|artifactId|version)>\s*([^<\s]+)\s*</\1>")
+_SOURCE_FIELD = re.compile(
+    r"resolved|resolution|integrity|tarball|checksum|source|hash|registry|remote|url|\bh1:", re.I
+)
+_GRADLE_COORDINATE = re.compile(r"""["']([\w.\-]+):([\w.\-]+):([\w.\-]+)["']""")
+
+
+def _add(versions: Versions, name: str, version: str, line: int = 0) -> None:
+    if name and version:
+        versions.setdefault(name, {}).setdefault(version, line)
+
+
+def _line_of(text: str, needle: str) -> int:
+    at = text.find(needle)
+    return text.count("\n", 0, at) + 1 if at >= 0 else 0
+
+
+def parse_package_lock(text: str) -> Versions:
+    data = json.loads(text)
+    versions: Versions = {}
+    packages = data.get("packages")
+    if isinstance(packages, dict):  # lockfileVersion 2 and 3
+        for key, meta in packages.items():
+            if "node_modules/" not in key or not isinstance(meta, dict) or meta.get("link"):
+                continue
+            name = meta.get("name") or key.rsplit("node_modules/", 1)[1]
+            _add(versions, name, str(meta.get("version", "")), _line_of(text, f'"{key}"'))
+        return versions
+
+    def walk(deps: dict) -> None:  # lockfileVersion 1: nested "dependencies"
+        for name, meta in deps.items():
+            if isinstance(meta, dict):
+                _add(versions, name, str(meta.get("version", "")), _line_of(text, f'"{name}": {{'))
+                walk(meta.get("dependencies") or {})
+
+    walk(data.get("dependencies") or {})
+    return versions
+
+
+def _spec_name(spec: str) -> str:
+    """``@scope/name`` from ``"@scope/name@^1.0.0"`` or ``name@npm:1.0.0``."""
+    spec = spec.strip().strip('"')
+    at = spec.find("@", 1)
+    return spec[:at] if at > 0 else spec
+
+
+def parse_yarn_lock(text: str) -> Versions:
+    versions: Versions = {}
+    name, header = "", 0
+    for number, line in enumerate(text.split("\n"), 1):
+        if line and not line[0].isspace() and not line.startswith("#") and line.rstrip().endswith(":"):
+            name, header = _spec_name(line.rstrip()[:-1].split(",")[0]), number
+            if name == "__metadata":
+                name = ""
+            continue
+        m = _YARN_VERSION.match(line)
+        if m and name:
+            _add(versions, name, m.group(1), header)
+            name = ""
+    return versions
+
+
+def _pnpm_split(key: str) -> Tuple[str, str]:
+    key = re.sub(r"\(.*$", "", key)  # v6+/v9 peer suffix: name@1.0.0(react@18.0.0)
+    at = key.find("@", 1)
+    if at > 0:  # v6+: name@version
+        return key[:at], key[at + 1:]
+    name, _, version = key.rpartition("/")  # v5: /name/version_peer
+    return name, version.split("_")[0]
+
+
+def parse_pnpm_lock(text: str) -> Versions:
+    versions: Versions = {}
+    in_packages = False
+    for number, line in enumerate(text.split("\n"), 1):
+        if line and not line[0].isspace():
+            in_packages = line.rstrip() == "packages:"
+            continue
+        m = _PNPM_KEY.match(line) if in_packages else None
+        if m:
+            name, version = _pnpm_split(m.group(1))
+            _add(versions, name, version, number)
+    if not versions and "packages:" not in text:
+        raise ValueError("no packages section")
+    return versions
+
+
+def parse_pipfile_lock(text: str) -> Versions:
+    data = json.loads(text)
+    versions: Versions = {}
+    for group in ("default", "develop"):
+        for name, meta in (data.get(group) or {}).items():
+            if isinstance(meta, dict):
+                version = str(meta.get("version", "")).lstrip("=") or str(meta.get("ref", ""))
+                _add(versions, name.lower(), version, _line_of(text, f'"{name}": {{'))
+    return versions
+
+
+def parse_toml_lock(text: str) -> Versions:
+    """``[[package]]`` tables with ``name`` then ``version`` (poetry.lock, Cargo.lock)."""
+    versions: Versions = {}
+    for m in _TOML_PACKAGE.finditer(text):
+        _add(versions, m.group(1), m.group(2), text.count("\n", 0, m.start()) + 2)
+    if not versions and "[[package]]" in text:
+        raise ValueError("unrecognised [[package]] layout")
+    return versions
+
+
+def parse_go_sum(text: str) -> Versions:
+    versions: Versions = {}
+    for number, line in enumerate(text.split("\n"), 1):
+        fields = line.split()
+        if len(fields) == 3 and not fields[1].endswith("/go.mod"):
+            _add(versions, fields[0], fields[1], number)
+    return versions
+
+
+def parse_gemfile_lock(text: str) -> Versions:
+    versions: Versions = {}
+    for number, line in enumerate(text.split("\n"), 1):
+        m = _GEM_SPEC.match(line)
+        if m:
+            _add(versions, m.group(1), m.group(2), number)
+    return versions
+
+
+PARSERS: Dict[str, Callable[[str], Versions]] = {
+    "package-lock.json": parse_package_lock,
+    "yarn.lock": parse_yarn_lock,
+    "pnpm-lock.yaml": parse_pnpm_lock,
+    "Pipfile.lock": parse_pipfile_lock,
+    "poetry.lock": parse_toml_lock,
+    "Cargo.lock": parse_toml_lock,
+    "go.sum": parse_go_sum,
+    "Gemfile.lock": parse_gemfile_lock,
+}
+
+
+# ── Manifest pins (exact versions only; ranges are left to the reviewer) ──
+
+
+def _line_at(text: str, offset: int) -> int:
+    return text.count("\n", 0, offset) + 1
+
+
+def parse_requirements(text: str) -> Versions:
+    versions: Versions = {}
+    for m in _REQUIREMENT_PIN.finditer(text):
+        _add(versions, m.group(1).lower(), m.group(2), _line_at(text, m.start()))
+    return versions
+
+
+def parse_pom(text: str) -> Versions:
+    versions: Versions = {}
+    for block in _POM_DEPENDENCY.finditer(text):
+        fields = {m.group(1): m for m in _POM_FIELD.finditer(block.group(1))}
+        if {"groupId", "artifactId", "version"} <= set(fields) and "${" not in fields["version"].group(2):
+            name = f"{fields['groupId'].group(2)}:{fields['artifactId'].group(2)}"
+            _add(versions, name, fields["version"].group(2), _line_at(text, block.start(1) + fields["version"].start()))
+    return versions
+
+
+def parse_gradle(text: str) -> Versions:
+    versions: Versions = {}
+    for m in _GRADLE_COORDINATE.finditer(text):
+        _add(versions, f"{m.group(1)}:{m.group(2)}", m.group(3), _line_at(text, m.start()))
+    return versions
+
+
+PIN_PARSERS: Dict[str, Callable[[str], Versions]] = {
+    "requirements.txt": parse_requirements,
+    "pom.xml": parse_pom,
+    "build.gradle": parse_gradle,
+    "build.gradle.kts": parse_gradle,
+}
+
+# OSV ecosystem of each file's packages
+ECOSYSTEMS: Dict[str, str] = {
+    "package-lock.json": "npm", "yarn.lock": "npm", "pnpm-lock.yaml": "npm",
+    "Pipfile.lock": "PyPI", "poetry.lock": "PyPI", "requirements.txt": "PyPI",
+    "Cargo.lock": "crates.io", "go.sum": "Go", "Gemfile.lock": "RubyGems",
+    "pom.xml": "Maven", "build.gradle": "Maven", "build.gradle.kts": "Maven",
+}
+
+
+def is_lockfile(path: str) -> bool:
+    return LOCKFILE_DELTAS and os.path.basename(path) in PARSERS
+
+
+def needs_both_versions(path: str) -> bool:
+    """Whether reviewing ``path`` uses its old and new content (delta table or advisory lookup)."""
+    name = os.path.basename(path)
+    advisories = bool(ADVISORY_INDEX_FILE) and os.path.exists(ADVISORY_INDEX_FILE)
+    return is_lockfile(path) or (advisories and name in ECOSYSTEMS)
+
+
+def parse_lockfile(path: str, text: str) -> Optional[Versions]:
+    """Packages in a lockfile or pinned in a manifest ({} for an empty file, None if it does not parse)."""
+    if not text.strip():
+        return {}
+    name = os.path.basename(path)
+    try:
+        return (PARSERS.get(name) or PIN_PARSERS[name])(text)
+    except (KeyError, ValueError, TypeError, AttributeError):
+        return None
+
+
+def _texts(fc: dict) -> Optional[Tuple[str, str]]:
+    """Old and new content ("" for the missing side of an add or delete; None if unavailable)."""
+    change_type = fc.get("change_type", "edit")
+    before_text = "" if change_type == "add" else fc.get("before", "")
+    after_text = "" if change_type == "delete" else fc.get("after", "")
+    if (change_type != "add" and not before_text) or (change_type != "delete" and not after_text):
+        return None
+    return before_text, after_text
+
+
+def _both_versions(fc: dict) -> Optional[Tuple[Versions, Versions]]:
+    """Packages before and after the change (None unless both versions parse).
+
+    A new or deleted file is compared against an empty one.
+    """
+    texts = _texts(fc)
+    if texts is None:
+        return None
+    path = fc["path"]
+    before, after = parse_lockfile(fc.get("old_path") or path, texts[0]), parse_lockfile(path, texts[1])
+    if before is None or after is None:
+        return None
+    return before, after
+
+
+def new_versions(fc: dict) -> Versions:
+    """Package versions the change introduces, with their line in the new file."""
+    pair = _both_versions(fc)
+    if pair is None:
+        return {}
+    before, after = pair
+    versions: Versions = {}
+    for name, found in after.items():
+        for version, line in found.items():
+            if version not in before.get(name, {}):
+                _add(versions, name, version, line)
+    return versions
+
+
+# ── Delta ────────────────────────────────────────────────────────────
+
+
+def _version_key(version: str) -> Tuple:
+    return tuple(int(p) if p.isdigit() else p for p in re.split(r"[.\-+_]", version.lstrip("v=^~")) if p)
+
+
+def _direction(old: str, new: str) -> str:
+    try:
+        return "upgraded" if _version_key(new) > _version_key(old) else "downgraded"
+    except TypeError:  # e.g. "1.0.rc1" vs "1.0.0"
+        return "changed"
+
+
+@dataclass(frozen=True)
+class DependencyChange:
+    package: str
+    change: str  # added | removed | upgraded | downgraded | changed | source changed | entry changed
+    old: str = ""
+    new: str = ""
+    line: int = 0  # in the new lockfile (0 for removals or when unknown)
+
+
+def dependency_delta(before: Versions, after: Versions) -> List[DependencyChange]:
+    """Packages whose set of locked versions differs, sorted by name."""
+    changes = []
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name, {}), after.get(name, {})
+        if set(old) == set(new):
+            continue
+        line = min((n for v, n in new.items() if v not in old and n), default=0)
+        old_text, new_text = ", ".join(sorted(old, key=str)), ", ".join(sorted(new, key=str))
+        if not old:
+            change = "added"
+        elif not new:
+            change = "removed"
+        elif len(old) == 1 and len(new) == 1:
+            change = _direction(old_text, new_text)
+        else:
+            change = "changed"
+        changes.append(DependencyChange(name, change, old_text, new_text, line))
+    return changes
+
+
+def _entry_blocks(text: str, versions: Versions) -> Dict[Tuple[str, str], List[str]]:
+    """Each locked (package, version)'s lines: from its line up to the next entry's."""
+    lines = text.split("\n")
+    starts = sorted({line for found in versions.values() for line in found.values() if line})
+    blocks = {}
+    for name, found in versions.items():
+        for version, line in found.items():
+            if not line:
+                continue
+            end = next((s for s in starts if s > line), len(lines) + 1)
+            blocks[(name, version)] = [l.strip() for l in lines[line - 1:end - 1] if l.strip()]
+    return blocks
+
+
+def changed_entries(
+    before_text: str, after_text: str, before: Versions, after: Versions
+) -> List[DependencyChange]:
+    """Packages locked at the same version whose entry changed (a new ``resolved`` URL, hash, ...)."""
+    old_blocks, new_blocks = _entry_blocks(before_text, before), _entry_blocks(after_text, after)
+    changes = []
+    for (name, version), new in sorted(new_blocks.items()):
+        old = old_blocks.get((name, version))
+        if old is None or old == new:
+            continue
+        added = [l for l in new if l not in old]
+        sources = [l for l in added if _SOURCE_FIELD.search(l)]
+        dropped = any(_SOURCE_FIELD.search(l) for l in old if l not in new)
+        change = "source changed" if sources or dropped else "entry changed"
+        detail = " ".join(sources or added).replace("|", "\\|")
+        if len(detail) > MAX_DETAIL_CHARS:
+            detail = detail[:MAX_DETAIL_CHARS] + "..."
+        new_text = f"{version}: {detail}" if detail else version
+        changes.append(DependencyChange(name, change, version, new_text, after[name][version]))
+    return changes
+
+
+def delta_table(fc: dict) -> Optional[str]:
+    """The file's dependency delta as a table (None to keep the diff).
+
+    A change that moves no package version (a rewritten ``resolved`` URL or
+    ``integrity`` hash, say) keeps its diff: the table would hide it.
+    """
+    pair = _both_versions(fc)
+    if pair is None:
+        return None
+
+    changes = dependency_delta(*pair) + changed_entries(*_texts(fc), *pair)
+    changes.sort(key=lambda c: c.package)
+    if not changes and fc.get("before", "") != fc.get("after", ""):
+        return None
+    counts: Dict[str, int] = {}
+    for c in changes:
+        counts[c.change] = counts.get(c.change, 0) + 1
+    summary = ", ".join(f"{n} {what}" for what, n in sorted(counts.items())) or "no package versions changed"
+    rows = [
+        f"| {c.package} | {c.change} | {c.old or '-'} | {c.new or '-'} | {c.line or ''} |"
+        for c in changes[:LOCKFILE_MAX_ROWS]
+    ]
+    if len(changes) > LOCKFILE_MAX_ROWS:
+        rows.append(f"... ({len(changes) - LOCKFILE_MAX_ROWS} more changed packages)")
+    table = ["| package | change | old | new | line |", "|---|---|---|---|---|"] + rows if rows else []
+    return "\n".join([f"Dependency delta ({summary}):"] + table) + "\n"
@@ -0,0 +1,47 @@
+"""Model routing — which model each reviewer call runs on.
+
+Light, low-risk reviews (PR description, test coverage, dependency files and
+style review of non-backend code) run on ``SMALL_MODEL`` while their prompt
+is small. Security, the fused small-PR call and backend best-practice review
+stay on ``GPT_MODEL``. A small-model response that reports a critical finding
+with low confidence is re-run on the large model.
+"""
+
+from __future__ import annotations
+from typing import Optional
+
+from agents.streaming import IncrementalFindingsParser
+from config import ESCALATION_CONFIDENCE, GPT_MODEL, SMALL_MODEL, SMALL_MODEL_MAX_TOKENS
+
+SMALL_MODEL_AGENTS = {"pr_description", "test_coverage", "dependency"}
+# best_practices runs per file category; backend diffs keep the large model.
+SMALL_MODEL_CATEGORIES = {"best_practices": {"frontend", "infra", "test", "other"}}
+
+
+def select_model(agent_name: str, category: Optional[str] = None, prompt_tokens: int = 0) -> str:
+    """Model for one call of ``agent_name`` over a prompt of ``prompt_tokens``."""
+    if not SMALL_MODEL or prompt_tokens > SMALL_MODEL_MAX_TOKENS:
+        return GPT_MODEL
+    if agent_name in SMALL_MODEL_AGENTS:
+        return SMALL_MODEL
+    if category in SMALL_MODEL_CATEGORIES.get(agent_name, ()):
+        return SMALL_MODEL
+    return GPT_MODEL
+
+
+def needs_escalation(content: str, threshold: float = ESCALATION_CONFIDENCE) -> bool:
+    """True if a response holds a critical finding (s=0) below ``threshold`` confidence."""
+    for _, obj in IncrementalFindingsParser().feed(content or ""):
+        try:
+            if obj.get("s") == 0 and float(obj.get("p", 1.0)) < threshold:
+                return True
+        except (TypeError, ValueError):
+            continue
+    return False
+
+
+def routing_signature() -> str:
+    """Identifies the routing setup, for versioning cached findings."""
+    if not SMALL_MODEL:
+        return GPT_MODEL
+    return f"{GPT_MODEL}|{SMALL_MODEL}<={SMALL_MODEL_MAX_TOKENS}"
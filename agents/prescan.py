@@ -0,0 +1,347 @@
+"""Security pre-scan — secrets, injection sinks and dangerous APIs, found locally.
+
+Every changed line is matched against one compiled pattern set per
+language: an alternation of named rules (secret formats, the language's
+injection sinks and dangerous APIs, generic security keywords), so each
+line is scanned in a single pass. Credential-looking assignments are kept
+only when the value's Shannon entropy is high enough to be a real secret.
+
+Secrets on added lines become ``ReviewComment``s directly (the value is
+masked). With ``SECURITY_PRESCAN=gate`` only files with a hit on an added
+or removed line, or under a security-sensitive path, go on to the LLM
+security review; ``report`` sends every file, ``off`` skips the scan.
+"""
+
+from __future__ import annotations
+import functools
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agents.diff_index import DiffIndex, hunk_rows, split_hunks
+from agents.router import classify_file
+from agents.tokens import language_for
+from agents.types import ReviewComment, ReviewResult
+from utils import file_diff
+
+MIN_SECRET_ENTROPY = 3.5  # bits per character; English words and placeholders stay below
+MAX_LINE_LENGTH = 2000  # minified or generated lines are not scanned
+
+# Generic keywords: a change touching any of these is worth a security look.
+SENSITIVE_KEYWORDS = (
+    r"passw|secret|token|api[_-]?key|credential|auth|login|session|cookie|jwt|crypt|hash|"
+    r"\beval\b|\bexec\b|subprocess|os\.system|shell\s*=|pickle|marshal|yaml\.load|"
+    r"deserial|innerhtml|dangerouslysetinnerhtml|\bsql\b|query|execute\(|cursor|"
+    r"verify\s*=\s*false|http://|cors|csrf|sanitiz|escape|permission|role|admin|"
+    r"open\(|path\.join|redirect|upload|tempfile|random"
+)
+SENSITIVE_PATTERNS = re.compile(f"({SENSITIVE_KEYWORDS})", re.IGNORECASE)
+SENSITIVE_PATH = re.compile(
+    r"(^|/)(auth\w*|security|crypto\w*|login|session\w*|permissions?|acl|oauth\w*|secrets?|"
+    r"middlewares?|\.env[\w.]*|\.github/workflows)(/|\.|$)",
+    re.IGNORECASE,
+)
+
+# (rule, pattern, description) — known credential formats, checked on every file
+SECRET_RULES: List[Tuple[str, str, str]] = [
+    ("private_key", r"-----BEGIN (?:[A-Z]+ )*PRIVATE KEY(?: BLOCK)?-----", "private key"),
+    ("aws_access_key", r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b", "AWS access key ID"),
+    ("github_token", r"\bgh[pousr]_[A-Za-z0-9]{36,}\b|\bgithub_pat_[A-Za-z0-9_]{60,}", "GitHub token"),
+    ("gitlab_token", r"\bglpat-[A-Za-z0-9_\-]{20,}", "GitLab token"),
+    ("slack_token", r"\bxox[abposr]-[A-Za-z0-9-]{10,}", "Slack token"),
+    ("stripe_key", r"\b[rs]k_live_[A-Za-z0-9]{20,}", "Stripe live key"),
+    ("google_api_key", r"\bAIza[0-9A-Za-z_\-]{35}\b", "Google API key"),
+    ("openai_key", r"\bsk-(?:proj-|svcacct-)?[A-Za-z0-9_\-]{32,}", "OpenAI API key"),
+    ("azure_storage_key", r"AccountKey=[A-Za-z0-9+/]{60,}={0,2}", "Azure storage account key"),
+    ("jwt", r"\beyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}", "JSON web token"),
+    ("url_credentials", r"\b[a-z][a-z0-9+.\-]*://[^\s/:@'\"]+:(?P<url_password>[^\s/:@'\"$%{<]{4,})@[\w.\-]+",
+     "credentials in a URL"),
+    (
+        "hardcoded_credential",
+        r"(?i:[\w.\-]*(?:secret|token|passw(?:or)?d|pwd|api[_-]?key|access[_-]?key|private[_-]?key|"
+        r"client[_-]?secret|credential)[\w.\-]*)[\"']?\s*(?::=|=>|[:=])\s*[\"'](?P<value>[^\"'\s]{12,})[\"']",
+        "hardcoded credential",
+    ),
+]
+
+# Injection sinks and dangerous APIs per rule set
+SINK_RULES: Dict[str, List[Tuple[str, str]]] = {
+    "python": [
+        ("code_eval", r"\b(?:eval|exec|compile|__import__)\s*\("),
+        ("shell_command", r"\bos\.(?:system|popen|exec\w*)\s*\(|subprocess\.\w+\(.*shell\s*=\s*True"),
+        ("deserialization", r"\b(?:pickle|cPickle|marshal|dill|shelve)\.(?:loads?|open)\s*\(|yaml\.(?:unsafe_)?load\s*\("),
+        ("sql_string", r"\.execute(?:many)?\(\s*(?:f[\"']|[\"'][^\"']*[\"']\s*(?:%|\+|\.format\())"),
+        ("tls_disabled", r"verify\s*=\s*False|ssl\._create_unverified_context|CERT_NONE"),
+        ("weak_crypto", r"hashlib\.(?:md5|sha1)\s*\(|\bDES\b|\bARC4\b|mode\s*=\s*AES\.MODE_ECB"),
+        ("template_injection", r"render_template_string\s*\(|mark_safe\s*\(|Markup\s*\(|\|\s*safe\b|autoescape\s*=\s*False"),
+        ("insecure_temp", r"tempfile\.mktemp\s*\("),
+    ],
+    "javascript": [
+        ("code_eval", r"\beval\s*\(|\bnew\s+Function\s*\(|set(?:Timeout|Interval)\s*\(\s*[\"'`]"),
+        ("dom_xss", r"\.(?:inner|outer)HTML\s*[+]?=|dangerouslySetInnerHTML|document\.write(?:ln)?\s*\(|"
+                    r"insertAdjacentHTML\s*\(|\bv-html\b|bypassSecurityTrust\w*\s*\("),
+        ("shell_command", r"child_process|\bexec(?:Sync)?\s*\(|spawn(?:Sync)?\s*\([^)]*shell\s*:\s*true"),
+        ("sql_string", r"\.(?:query|raw|execute)\s*\(\s*(?:`[^`]*\$\{|[\"'][^\"']*[\"']\s*\+)"),
+        ("tls_disabled", r"rejectUnauthorized\s*:\s*false|NODE_TLS_REJECT_UNAUTHORIZED"),
+        ("weak_crypto", r"createHash\s*\(\s*[\"'](?:md5|sha1)[\"']|createCipher\s*\("),
+        ("open_redirect", r"(?:window\.)?location(?:\.href)?\s*=\s*[^=;]*(?:req\.|params|query|search)"),
+        ("prototype_pollution", r"__proto__|constructor\s*\[\s*[\"']prototype"),
+    ],
+    "java": [
+        ("shell_command", r"Runtime\.getRuntime\(\)\.exec|\bProcessBuilder\s*\("),
+        ("sql_string", r"\.(?:executeQuery|executeUpdate|execute|addBatch|createQuery|createNativeQuery|prepareStatement)"
+                       r"\s*\([^)]*\+"),
+        ("deserialization", r"\bObjectInputStream\b|\bXMLDecoder\b|\.readObject\s*\(|enableDefaultTyping"),
+        ("xxe", r"\b(?:DocumentBuilderFactory|SAXParserFactory|XMLInputFactory|TransformerFactory)\b"),
+        ("tls_disabled", r"X509TrustManager|setHostnameVerifier|ALLOW_ALL_HOSTNAME_VERIFIER|TrustAll"),
+        ("weak_crypto", r"getInstance\s*\(\s*\"(?:MD5|SHA-?1|DES|RC4|AES/ECB[^\"]*)\""),
+        ("code_eval", r"ScriptEngine\w*\.eval\s*\(|\bClass\.forName\s*\("),
+    ],
+    "go": [
+        ("shell_command", r"\bexec\.Command(?:Context)?\s*\("),
+        ("sql_string", r"\.(?:Query|QueryRow|Exec)(?:Context)?\s*\([^)]*(?:fmt\.Sprintf|\+)"),
+        ("tls_disabled", r"InsecureSkipVerify\s*:\s*true"),
+        ("unsafe_code", r"\"unsafe\"|\bunsafe\.Pointer\b"),
+        ("template_injection", r"template\.(?:HTML|JS|URL)\s*\("),
+        ("weak_crypto", r"\"crypto/(?:md5|sha1|des|rc4)\"|\"math/rand\""),
+    ],
+    "ruby": [
+        ("code_eval", r"\b(?:eval|instance_eval|class_eval|module_eval)\b|\.constantize\b|\.send\s*\(\s*params"),
+        ("shell_command", r"\b(?:system|exec|spawn)\s*\(|`[^`]*#\{|%x[({\[]|\bIO\.popen\b|\bOpen3\."),
+        ("deserialization", r"\bMarshal\.load\b|\bYAML\.(?:unsafe_)?load\b"),
+        ("sql_string", r"\b(?:find_by_sql|where|order|group|having|execute)\s*\(?\s*[\"'][^\"']*#\{"),
+        ("template_injection", r"\.html_safe\b|\braw\s*\(|render\s+inline:"),
+    ],
+    "php": [
+        ("code_eval", r"\b(?:eval|assert|create_function)\s*\(|preg_replace\s*\(\s*[\"'][^\"']*/e[\"']"),
+        ("shell_command", r"\b(?:system|exec|shell_exec|passthru|popen|proc_open)\s*\(|`[^`]*\$"),
+        ("deserialization", r"\bunserialize\s*\("),
+        ("sql_string", r"\b(?:mysql_query|mysqli_query|->query)\s*\([^)]*\$"),
+        ("file_inclusion", r"\b(?:include|require)(?:_once)?\s*\(?\s*\$"),
+        ("user_input", r"\$_(?:GET|POST|REQUEST|COOKIE|FILES|SERVER)\b"),
+    ],
+    "c": [
+        ("memory_unsafe", r"\b(?:strcpy|strcat|sprintf|vsprintf|gets|scanf|sscanf|strncpy|memcpy|alloca)\s*\("),
+        ("shell_command", r"\b(?:system|popen|exec[lv]p?e?)\s*\("),
+        ("format_string", r"\bprintf\s*\(\s*[a-z_]\w*\s*\)"),
+    ],
+    "csharp": [
+        ("shell_command", r"\bProcess\.Start\s*\("),
+        ("deserialization", r"\b(?:BinaryFormatter|NetDataContractSerializer|LosFormatter|SoapFormatter)\b|TypeNameHandling\.(?:All|Auto|Objects)"),
+        ("sql_string", r"\b(?:SqlCommand|ExecuteSqlRaw|FromSqlRaw|ExecuteSqlCommand)\s*\([^)]*(?:\+|\$\")"),
+        ("template_injection", r"\bHtml\.Raw\s*\("),
+        ("tls_disabled", r"ServerCertificateValidationCallback|ServerCertificateCustomValidationCallback"),
+    ],
+    "rust": [
+        ("unsafe_code", r"\bunsafe\s*(?:\{|fn\b|impl\b)|\bmem::transmute\b|\bfrom_raw(?:_parts)?\s*\("),
+        ("shell_command", r"\bCommand::new\s*\("),
+    ],
+    "shell": [
+        ("remote_script", r"\b(?:curl|wget)\b[^|#]*\|\s*(?:sudo\s+)?(?:ba|z)?sh\b"),
+        ("permissions", r"\bchmod\s+(?:-R\s+)?(?:0?777|a\+w)\b"),
+        ("code_eval", r"\beval\s"),
+        ("tls_disabled", r"\bcurl\b[^#]*\s(?:-k|--insecure)\b|--no-check-certificate"),
+    ],
+    "infra": [
+        ("privileged", r"privileged\s*:\s*true|allowPrivilegeEscalation\s*:\s*true|host(?:Network|PID|IPC)\s*:\s*true|"
+                       r"runAsUser\s*:\s*0\b|^\s*USER\s+root\b|--privileged"),
+        ("open_network", r"0\.0\.0\.0/0|::/0|publicly_accessible\s*=\s*true|acl\s*=\s*\"public-read"),
+        ("wildcard_policy", r"\"(?:Action|Principal|Resource)\"\s*:\s*\"\*\"|actions\s*=\s*\[\s*\"\*\""),
+        ("encryption_disabled", r"encrypt(?:ed|ion)\s*[:=]\s*false|ssl_enforcement_enabled\s*=\s*false"),
+        ("ci_injection", r"pull_request_target|\$\{\{\s*github\.event\.|permissions\s*:\s*write-all"),
+        ("remote_script", r"^\s*ADD\s+https?://|\b(?:curl|wget)\b[^|#]*\|\s*(?:ba)?sh\b"),
+    ],
+    "dependency": [
+        ("install_script", r"\"(?:pre|post)?install\"\s*:|\"prepare\"\s*:"),
+        ("untrusted_source", r"git\+(?:ssh|https?)://|\"(?:file|link):|--extra-index-url|--trusted-host|http://"),
+        # A changed download location or hash in a lockfile (resolved URL, integrity, checksum, go.sum h1:)
+        ("package_source", r"\b(?:resolved|resolution|integrity|tarball|checksum|registry|source|remote)\b\"?\s*[:= ]|\bh1:[\w+/=]+"),
+    ],
+}
+
+RULE_SETS = {
+    "python": "python", "javascript": "javascript", "typescript": "javascript", "java": "java",
+    "kotlin": "java", "scala": "java", "go": "go", "ruby": "ruby", "php": "php", "c": "c", "cpp": "c",
+    "csharp": "csharp", "rust": "rust", "shell": "shell", "yaml": "infra", "toml": "infra",
+}
+_DESCRIPTIONS = {rule: description for rule, _, description in SECRET_RULES}
+# Rules whose captured value must look random to count as a secret
+ENTROPY_RULES = {"hardcoded_credential": "value", "url_credentials": "url_password"}
+_KNOWN_FORMATS = re.compile(
+    "|".join(f"(?P<{rule}>{pattern})" for rule, pattern, _ in SECRET_RULES if rule not in ENTROPY_RULES)
+)
+_PLACEHOLDER = re.compile(
+    r"example|sample|dummy|placeholder|changeme|change_me|your[_-]|xxxx|\*\*\*|<[^>]*>|\$\{|\{\{|%\(|^\$|"
+    r"redacted|fake|test|secret[_-]?key[_-]?here|\.\.\.",
+    re.IGNORECASE,
+)
+
+
+def rule_set(path: str) -> str:
+    """Which language's sink rules apply to ``path`` ("" for generic only)."""
+    category = classify_file(path)
+    if category in ("infra", "dependency"):
+        return category
+    return RULE_SETS.get(language_for(path), "")
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_rules(ruleset: str) -> re.Pattern:
+    """Secrets, the rule set's sinks and the generic keywords as one alternation."""
+    parts = [f"(?P<{rule}>{pattern})" for rule, pattern, _ in SECRET_RULES]
+    parts += [f"(?P<{rule}__{i}>{pattern})" for i, (rule, pattern) in enumerate(SINK_RULES.get(ruleset, []))]
+    parts.append(f"(?P<keyword>(?i:{SENSITIVE_KEYWORDS}))")
+    return re.compile("|".join(parts))
+
+
+def shannon_entropy(text: str) -> float:
+    if not text:
+        return 0.0
+    n = len(text)
+    return -sum(c / n * math.log2(c / n) for c in Counter(text).values())
+
+
+def _mask(secret: str) -> str:
+    return f"{secret[:4]}…{secret[-2:]}" if len(secret) > 12 else "…"
+
+
+@dataclass
+class Hit:
+    rule: str
+    line: int  # new line number (old line number for removed lines)
+    added: bool
+    secret: str = ""  # matched credential, for secret rules
+
+
+def scan_line(text: str, ruleset: str) -> List[Tuple[str, str]]:
+    """(rule, matched secret or "") for each hit on one line."""
+    if len(text) > MAX_LINE_LENGTH:
+        return []
+    hits = []
+    for m in compiled_rules(ruleset).finditer(text):
+        rule = m.lastgroup.split("__")[0] if m.lastgroup else "keyword"
+        if rule in ENTROPY_RULES:
+            value = m.group(ENTROPY_RULES[rule])
+            known = _KNOWN_FORMATS.search(value)
+            if known:  # token = "ghp_..." is reported as what it is
+                hits.append((known.lastgroup, known.group(0)))
+                continue
+            if _PLACEHOLDER.search(value) or shannon_entropy(value) < MIN_SECRET_ENTROPY:
+                hits.append(("keyword", ""))  # still a credential-shaped change worth reviewing
+                continue
+            hits.append((rule, value))
+        elif rule in _DESCRIPTIONS:
+            if rule != "private_key" and _PLACEHOLDER.search(m.group(0)):
+                continue
+            hits.append((rule, m.group(0)))
+        else:
+            hits.append((rule, ""))
+    return hits
+
+
+@dataclass
+class FileScan:
+    path: str
+    hits: List[Hit] = field(default_factory=list)
+    sensitive_path: bool = False
+
+    @property
+    def suspicious(self) -> bool:
+        return self.sensitive_path or bool(self.hits)
+
+    @property
+    def secrets(self) -> List[Hit]:
+        return [h for h in self.hits if h.added and h.secret]
+
+
+def scan_file(fc: dict, diff_index: Optional[DiffIndex] = None) -> FileScan:
+    """Hits on the file's added and removed lines."""
+    path = fc["path"]
+    scan = FileScan(path, sensitive_path=bool(SENSITIVE_PATH.search(path)))
+    ruleset = rule_set(path)
+    for hunk in split_hunks(file_diff(fc, diff_index))[1]:
+        for kind, text, old, new in hunk_rows(hunk):
+            if kind == " ":
+                continue
+            for rule, secret in scan_line(text, ruleset):
+                # Secrets on a removed line are already in the history; only flag new ones
+                scan.hits.append(Hit(rule, new if kind == "+" else old, kind == "+", secret if kind == "+" else ""))
+    return scan
+
+
+def secret_comment(path: str, hit: Hit) -> ReviewComment:
+    known_format = hit.rule not in ENTROPY_RULES
+    return ReviewComment(
+        file_path=path,
+        line_number=hit.line,
+        severity="critical" if known_format else "major",
+        category="security",
+        comment=f"Possible {_DESCRIPTIONS[hit.rule]} committed ({_mask(hit.secret)}). "
+                "Anything pushed to the repository should be treated as leaked.",
+        suggestion="Remove it, rotate the credential and load it from the environment or a secret manager.",
+        confidence=0.9 if known_format else 0.75,
+    )
+
+
+class SecurityPrescan:
+    """Scans each file once, reports secrets and gates the LLM security review."""
+
+    def __init__(self, mode: str, diff_index: Optional[DiffIndex] = None) -> None:
+        self.mode = mode
+        self.diff_index = diff_index
+        self._scans: Dict[Tuple[str, str], FileScan] = {}
+        self.files = 0
+        self.gated = 0
+        self.rules: Counter = Counter()
+
+    def scan(self, fc: dict) -> FileScan:
+        key = (fc["path"], fc.get("diff") or "")  # triage copies carry their kept hunks
+        if key not in self._scans:
+            self._scans[key] = scan_file(fc, self.diff_index)
+        return self._scans[key]
+
+    def secret_findings(self, file_changes: List[dict]) -> Optional[ReviewResult]:
+        """Secrets on added lines (None if the scan is off or found none)."""
+        if self.mode == "off":
+            return None
+        comments = [
+            secret_comment(fc["path"], hit)
+            for fc in file_changes
+            if fc.get("change_type") != "delete"
+            for hit in self.scan(fc).secrets
+        ]
+        if not comments:
+            return None
+        return ReviewResult(
+            agent_name="secret_scan",
+            comments=comments,
+            summary=f"{len(comments)} possible secret(s) in {len({c.file_path for c in comments})} file(s).",
+        )
+
+    def gate(self, file_changes: List[dict]) -> List[dict]:
+        """The files the LLM security review should see."""
+        if self.mode != "gate":
+            return file_changes
+        kept = []
+        for fc in file_changes:
+            scan = self.scan(fc)
+            self.files += 1
+            if scan.suspicious:
+                kept.append(fc)
+                self.rules.update({h.rule for h in scan.hits} - {"keyword"})
+            else:
+                self.gated += 1
+        return kept
+
+    def render(self) -> str:
+        """One line for the review summary ("" if no file was held back)."""
+        if not self.gated:
+            return ""
+        found = ", ".join(f"{rule} {n}" for rule, n in self.rules.most_common(5))
+        return (
+            f"Security pre-scan: {self.gated}/{self.files} file(s) had no secrets, sinks or "
+            f"security-relevant changes and skipped the LLM security review"
+            + (f" (files with hits: {found})" if found else "")
+        )
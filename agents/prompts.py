@@ -0,0 +1,69 @@
+"""Prompt assembly shared by all reviewers.
+
+Messages are laid out from most to least stable so that provider-side prefix
+caching can reuse work across every call of a review:
+
+1. shared preamble + PR context — identical for every agent and chunk
+2. the agent's system prompt and few-shots — identical for every chunk
+3. the chunk's diffs — the only part that varies
+"""
+
+from __future__ import annotations
+from typing import List
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from agents.types import CATEGORY_CODES, SEVERITY_CODES
+
+
+def _codes(names: List[str]) -> str:
+    return ", ".join(f"{i} {name}" for i, name in enumerate(names))
+
+
+REVIEW_PREAMBLE = f"""\
+You are one of several specialised agents reviewing the same Pull Request. \
+Each agent has its own focus, given in the next instruction block; stay within it.
+
+Report every finding as one compact JSON object:
+- f: index of the file, from the [n] marker in its diff header (-1 if not file-specific)
+- l: line in the new version of the file, or null
+- s: severity code — {_codes(SEVERITY_CODES)}
+- c: category code — {_codes(CATEGORY_CODES)}
+- m: what is wrong and why it matters
+- x: a concrete fix, or null
+- p: confidence 0.0-1.0
+
+Respond with a single JSON object {{"findings": [...], "summary": "..."}} \
+unless the task asks for a different shape.
+"""
+
+
+def file_header(index: int, path: str, label: str = "") -> str:
+    """Diff section header carrying the [n] index findings refer to."""
+    return f"=== [{index}] {path}{f' ({label})' if label else ''} ==="
+
+
+def section_label(fc: dict, label: str = "") -> str:
+    """Header label for a file section, noting which part of a split file it is."""
+    if not fc.get("part"):
+        return label
+    part = "part {}/{}".format(*fc["part"])
+    return f"{label}, {part}" if label else part
+
+
+def render_pr_context(pr_metadata: dict) -> str:
+    """PR-level context shared by every agent call of a review."""
+    return (
+        "## Pull Request\n"
+        f"Title: {pr_metadata.get('title', '') or ''}\n"
+        f"Description:\n{pr_metadata.get('description', '') or ''}\n"
+    )
+
+
+def build_review_messages(
+    system_prompt: str, pr_metadata: dict, task: str
+) -> List[BaseMessage]:
+    """Assemble reviewer messages with the stable content as a shared prefix."""
+    return [
+        SystemMessage(content=f"{REVIEW_PREAMBLE}\n{render_pr_context(pr_metadata)}"),
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=task),
+    ]
@@ -5,64 +5,232 @@ import asyncio
 from langgraph.graph import StateGraph, START, END
 
 from agents.router import partition_files, classify_file
-from agents.chunker import chunk_file_changes
+from agents.advisories import scan_advisories
+from agents.chunker import PackingReport, plan_chunks, prompt_budget
+from agents.batch import is_collecting
+from agents.cache import FindingCache
+from agents.compiler import track_trims
+from agents.cpu_pool import LoopLagMonitor, run_blocking
+from agents.llm import track_usage
+from agents.model_routing import routing_signature
+from agents.prescan import SecurityPrescan
+from agents.streaming import FindingStream, open_finding_stream
+from agents.tokens import get_token_estimator
+from agents.triage import Triage
+from agents.diff_index import DiffIndex
+from agents.reviewers import security, dependency, test_coverage
 from agents.reviewers.security import run_security_review
-from agents.reviewers.best_practices import run_best_practices_review
-from agents.reviewers.test_coverage import run_test_coverage_review
+from agents.reviewers.best_practices import run_best_practices_review, build_system_prompt
+from agents.reviewers.test_coverage import run_test_coverage_review, build_static_comments
 from agents.reviewers.dependency import run_dependency_review
 from agents.reviewers.pr_description import run_pr_description_review
+from agents.reviewers.fused import should_fuse, run_fused_review
 from agents.reviewers.synthesizer import synthesize
 from agents.types import ReviewResult
-from utils import count_changed_lines
-
-
-async def run_all_reviewers(state: dict) -> dict:
-    """Fan-out to all specialised reviewers and collect results."""
-    file_changes = state["file_changes"]
-    pr_metadata = state["pr_metadata"]
-
+from config import FINDING_CACHE_DIR, SECURITY_PRESCAN, TRIAGE_MIN_CHANGED_LINES, TRIAGE_THRESHOLD
+
+
+async def _review_and_store(
+    cache: FindingCache,
+    agent_name: str,
+    system_prompt: str,
+    file_changes: list,
+    review,
+    exclude: list | None = None,
+) -> ReviewResult:
+    """Await a reviewer call and cache its findings per file."""
+    result = await review
+    cache.store(agent_name, system_prompt, file_changes, result, exclude=exclude)
+    return result
+
+
+def _cached_result(agent_name: str, comments: list, n_files: int) -> ReviewResult:
+    return ReviewResult(
+        agent_name=agent_name,
+        comments=comments,
+        summary=f"{n_files} unchanged file(s) served from cache.",
+    )
+
+
+async def _fan_out(
+    file_changes: list,
+    pr_metadata: dict,
+    cache: FindingCache,
+    diff_index: DiffIndex,
+    triage: Triage | None = None,
+    packing: PackingReport | None = None,
+    prescan: SecurityPrescan | None = None,
+) -> list[ReviewResult]:
+    """Run every specialised reviewer over its share of the PR.
+
+    Files whose findings are already cached for an agent (same content, same
+    prompt) are not sent to that agent again. Every agent reads its diffs
+    from the shared ``diff_index``. With ``triage``, the security
+    and best-practices reviews only see hunks that pass the triage pass; with
+    ``prescan``, the security review only sees files the pre-scan flags.
+    Chunks are packed against each agent's prompt budget and recorded in
+    ``packing``.
+    """
     groups = partition_files(file_changes)
-    chunks = chunk_file_changes(file_changes)
+    packing = packing if packing is not None else PackingReport()
+
+    def chunks(agent: str, system_prompt: str, files: list) -> list[list]:
+        budget = prompt_budget(system_prompt, pr_metadata)
+        return packing.add(agent, plan_chunks(files, budget, diff_index, agent=agent)).chunks
 
     tasks = []
+    cached_results: list[ReviewResult] = []
 
     # ── Security review (all files) ──────────────────────────────────
-    for chunk in chunks:
-        tasks.append(run_security_review(chunk, pr_metadata))
-
-    # ── Best-practices review (by file category per chunk) ───────────
-    for chunk in chunks:
-        chunk_groups = partition_files(chunk)
-        for category, cat_files in chunk_groups.items():
-            if category == "dependency":
-                continue  # handled separately
-            tasks.append(
-                run_best_practices_review(cat_files, pr_metadata, category)
+    # Triage and the pre-scan gate run first: the cache keys filtered copies on their kept hunks.
+    candidates = file_changes
+    if triage is not None:
+        candidates = triage.filter(candidates, "security")
+    if prescan is not None:
+        candidates = prescan.gate(candidates)
+    missing, cached = cache.split("security", security.SYSTEM_PROMPT, candidates)
+    if len(missing) < len(candidates):
+        cached_results.append(
+            _cached_result("security", cached, len(candidates) - len(missing))
+        )
+    for chunk in chunks("security", security.SYSTEM_PROMPT, missing):
+        tasks.append(_review_and_store(
+            cache, "security", security.SYSTEM_PROMPT, chunk,
+            run_security_review(chunk, pr_metadata, diff_index),
+        ))
+
+    # ── Best-practices review (by file category, chunked) ────────────
+    for category, cat_files in groups.items():
+        if category == "dependency":
+            continue  # handled separately
+        system_prompt = build_system_prompt(category)
+        if triage is not None:
+            cat_files = triage.filter(cat_files, "best_practices")
+        missing, cached = cache.split("best_practices", system_prompt, cat_files)
+        if len(missing) < len(cat_files):
+            cached_results.append(
+                _cached_result("best_practices", cached, len(cat_files) - len(missing))
             )
-
-    # ── Test-coverage review (all files) ─────────────────────────────
-    tasks.append(run_test_coverage_review(file_changes, pr_metadata))
+        for chunk in chunks("best_practices", system_prompt, missing):
+            tasks.append(_review_and_store(
+                cache, "best_practices", system_prompt, chunk,
+                run_best_practices_review(chunk, pr_metadata, category, diff_index),
+            ))
+
+    # ── Test-coverage review (all files; LLM only sees cache misses) ─
+    missing, cached = cache.split("test_coverage", test_coverage.SYSTEM_PROMPT, file_changes)
+    if len(missing) < len(file_changes):
+        cached_results.append(
+            _cached_result("test_coverage", cached, len(file_changes) - len(missing))
+        )
+    tasks.append(_review_and_store(
+        cache, "test_coverage", test_coverage.SYSTEM_PROMPT, missing,
+        run_test_coverage_review(file_changes, pr_metadata, llm_files=missing, diff_index=diff_index),
+        exclude=build_static_comments(file_changes),
+    ))
 
     # ── Dependency review (only if dependency files changed) ─────────
     dep_files = groups.get("dependency", [])
     if dep_files:
-        tasks.append(run_dependency_review(dep_files, pr_metadata))
+        missing, cached = cache.split("dependency", dependency.SYSTEM_PROMPT, dep_files)
+        if len(missing) < len(dep_files):
+            cached_results.append(
+                _cached_result("dependency", cached, len(dep_files) - len(missing))
+            )
+        if missing:
+            tasks.append(_review_and_store(
+                cache, "dependency", dependency.SYSTEM_PROMPT, missing,
+                run_dependency_review(missing, pr_metadata, diff_index),
+            ))
 
     # ── PR description review ────────────────────────────────────────
     changed_paths = [fc["path"] for fc in file_changes]
     tasks.append(run_pr_description_review(pr_metadata, changed_paths))
 
     # Run all in parallel
-    results: list[ReviewResult] = await asyncio.gather(*tasks)
+    results: list[ReviewResult] = list(await asyncio.gather(*tasks))
+    results.extend(cached_results)
+    return results
+
+
+async def _report_early_findings(stream: FindingStream) -> int:
+    """Log critical findings as soon as a reviewer streams them out."""
+    seen = 0
+    async for agent_name, comment in stream:
+        seen += 1
+        if comment.severity == "critical":
+            loc = comment.file_path + (f":{comment.line_number}" if comment.line_number else "")
+            print(f"  [early] {agent_name}: critical finding at {loc}")
+    return seen
+
+
+async def run_all_reviewers(state: dict) -> dict:
+    """Review the PR — one fused call for small PRs, else a fan-out — and synthesise."""
+    file_changes = state["file_changes"]
+    pr_metadata = state["pr_metadata"]
+    # Collecting a batch only yields placeholders, which must not be cached.
+    cache = FindingCache(FINDING_CACHE_DIR, model=routing_signature(), read_only=is_collecting())
+    usage = track_usage()
+    trims = track_trims()
+    lag = LoopLagMonitor().start()
+    findings = open_finding_stream()
+    watcher = asyncio.create_task(_report_early_findings(findings))
+    diff_index = DiffIndex()
+    await diff_index.warm(file_changes)  # large files diff in the CPU pool, off the loop
+    # Known vulnerabilities come from the local index, ahead of every LLM call
+    advisories = await run_blocking(scan_advisories, file_changes)
+    for comment in advisories.comments if advisories is not None else []:
+        findings.publish("advisories", comment)
+    prescan = SecurityPrescan(SECURITY_PRESCAN, diff_index)
+    secrets = await run_blocking(prescan.secret_findings, file_changes)
+    for comment in secrets.comments if secrets is not None else []:
+        findings.publish("secret_scan", comment)
+    total_lines = diff_index.changed_lines(file_changes)
+    triage = None
+    if total_lines >= TRIAGE_MIN_CHANGED_LINES and TRIAGE_THRESHOLD > 0:
+        triage = Triage(TRIAGE_THRESHOLD, diff_index)
+
+    results: list[ReviewResult] = []
+    try:
+        if should_fuse(file_changes, total_lines):
+            print(f"  Small PR ({len(file_changes)} files, {total_lines} lines): fused review")
+            results = await run_fused_review(file_changes, pr_metadata, diff_index)
+            if any(r.error for r in results):
+                print("  [warn] Fused review unparseable; falling back to specialised reviewers")
+                results = []
+        if not results:
+            packing = PackingReport()
+            results = await _fan_out(file_changes, pr_metadata, cache, diff_index, triage, packing, prescan)
+            if packing.render():
+                print(f"  {packing.render()}")
+    finally:
+        findings.close()
+        await watcher
+        await lag.stop()
+        await run_blocking(get_token_estimator().flush)
+    results.extend(r for r in (advisories, secrets) if r is not None)
+
+    if cache.hits or cache.misses:
+        print(f"  Finding cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    print(f"  {usage.render()}")
+    print(f"  {lag.render()}")
+    if trims.render():
+        print(f"  {trims.render()}")
+
+    notes = [triage.render()] if triage is not None and triage.render() else []
+    if prescan.render():
+        notes.append(prescan.render())
+    for note in notes:
+        print(f"  {note}")
 
     # ── Synthesise ───────────────────────────────────────────────────
-    total_lines = count_changed_lines(file_changes)
-    filtered_comments, summary_md = synthesize(results, total_lines)
+    filtered_comments, summary_md = synthesize(results, total_lines, notes)
 
     return {
         "summary": summary_md,
         "review_comments": [c.model_dump() for c in filtered_comments],
         "pr_metadata": pr_metadata,
+        "llm_usage": usage.by_agent,
     }
 
 
@@ -1,59 +1,37 @@
 """Best-practices and style reviewer agent — adapts prompt to file type."""
 
 from __future__ import annotations
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from config import GPT_MODEL
+from typing import Optional
+from agents.compiler import compile_prompt
+from agents.cpu_pool import run_blocking
+from agents.diff_index import DiffIndex
+from agents.llm import invoke_llm, parse_review_result
+from agents.chunker import prompt_budget, remap_part_findings
+from agents.prompts import build_review_messages
 from agents.types import ReviewResult
-from utils import make_diff
 
 SYSTEM_PROMPT_TEMPLATE = """\
 You are a senior {domain} engineer performing a code review focused on best practices, style, and performance.
 Do NOT review security — a separate agent handles that.
 
 For every finding you MUST provide:
-- severity: "critical" (will cause bugs/outages), "major" (significant quality issue), "minor" (improvement), "nit" (style/preference)
-- confidence: 0.0-1.0
-- A concrete suggestion showing the fix. If you can't suggest a fix, don't mention it.
+- s (severity): 0 critical (will cause bugs/outages), 1 major (significant quality issue), 2 minor (improvement), 3 nit (style/preference)
+- c (category): 1 best-practice, 2 style, 4 performance or 5 accessibility
+- p (confidence): 0.0-1.0
+- x: a concrete suggestion showing the fix. If you can't suggest a fix, don't mention it.
 
 {domain_guidance}
 
 ## Few-shot examples
 
-Example 1 - Performance (major):
-{{
-  "file_path": "src/Dashboard.tsx",
-  "line_number": 15,
-  "severity": "major",
-  "category": "performance",
-  "comment": "Creating a new object literal inside the render causes unnecessary re-renders of all children. This is inside a component rendered on every route change.",
-  "suggestion": "Extract `{{ padding: 16 }}` to a module-level constant or use useMemo.",
-  "confidence": 0.85
-}}
-
-Example 2 - Best practice (minor):
-{{
-  "file_path": "utils/format.py",
-  "line_number": 30,
-  "severity": "minor",
-  "category": "best-practice",
-  "comment": "Bare except catches SystemExit and KeyboardInterrupt, masking real errors.",
-  "suggestion": "Use `except Exception:` instead of bare `except:`",
-  "confidence": 0.92
-}}
-
-Example 3 - Nit:
-{{
-  "file_path": "src/api.ts",
-  "line_number": 8,
-  "severity": "nit",
-  "category": "style",
-  "comment": "Inconsistent naming: other API functions use camelCase but this one uses snake_case.",
-  "suggestion": "Rename `get_user_data` to `getUserData` to match the existing convention.",
-  "confidence": 0.80
-}}
-
-Respond with ONLY valid JSON matching the ReviewResult schema. No markdown outside JSON.
+Example 1 - Performance (major), in file [0] src/Dashboard.tsx:
+{{"f": 0, "l": 15, "s": 1, "c": 4, "m": "Creating a new object literal inside the render causes unnecessary re-renders of all children. This is inside a component rendered on every route change.", "x": "Extract `{{ padding: 16 }}` to a module-level constant or use useMemo.", "p": 0.85}}
+
+Example 2 - Best practice (minor), in file [1] utils/format.py:
+{{"f": 1, "l": 30, "s": 2, "c": 1, "m": "Bare except catches SystemExit and KeyboardInterrupt, masking real errors.", "x": "Use `except Exception:` instead of bare `except:`", "p": 0.92}}
+
+Example 3 - Nit, in file [2] src/api.ts:
+{{"f": 2, "l": 8, "s": 3, "c": 2, "m": "Inconsistent naming: other API functions use camelCase but this one uses snake_case.", "x": "Rename `get_user_data` to `getUserData` to match the existing convention.", "p": 0.80}}
 """
 
 FRONTEND_GUIDANCE = """\
@@ -92,50 +70,49 @@ def _get_domain_info(file_category: str) -> tuple[str, str]:
     return "software", GENERAL_GUIDANCE
 
 
-async def run_best_practices_review(
-    file_changes: list, pr_metadata: dict, file_category: str = "other"
-) -> ReviewResult:
-    """Review code for best practices, adapting to file type."""
-    llm = ChatOpenAI(model=GPT_MODEL, temperature=0.1)
+def build_system_prompt(file_category: str) -> str:
+    """Return the system prompt used for a given file category."""
     domain, guidance = _get_domain_info(file_category)
+    return SYSTEM_PROMPT_TEMPLATE.format(domain=domain, domain_guidance=guidance)
 
-    system = SYSTEM_PROMPT_TEMPLATE.format(domain=domain, domain_guidance=guidance)
 
-    diffs = []
-    for fc in file_changes:
-        d = make_diff(fc.get("before", ""), fc.get("after", ""), fc["path"])
-        # Include full after-content for new files
-        if fc.get("change_type") == "add":
-            diffs.append(
-                f"=== {fc['path']} (NEW FILE) ===\n{fc.get('after', '')}"
-            )
-        elif d.strip():
-            diffs.append(f"=== {fc['path']} ===\n{d}")
-
-    if not diffs:
-        return ReviewResult(agent_name="best_practices", comments=[], summary="No changes to review.")
+def _render_prompt(
+    file_changes: list, diff_index: Optional[DiffIndex], budget: Optional[int] = None
+) -> tuple[str, list]:
+    """User prompt and the paths its [n] markers refer to ("" if nothing changed)."""
+    compiled = compile_prompt("best_practices", file_changes, diff_index, budget)
+    if not compiled.paths:
+        return "", []
 
     user_prompt = (
-        f"PR Title: {pr_metadata.get('title', '')}\n"
-        f"PR Description: {pr_metadata.get('description', '')}\n\n"
         "Review these changes for best practices, style, and performance:\n\n"
-        + "\n\n".join(diffs)
-        + '\n\nRespond with JSON: {"agent_name": "best_practices", "comments": [...], "summary": "..."}'
+        + compiled.text
+        + '\n\nRespond with JSON: {"findings": [...], "summary": "..."}'
+    )
+    return user_prompt, compiled.paths
+
+
+async def run_best_practices_review(
+    file_changes: list,
+    pr_metadata: dict,
+    file_category: str = "other",
+    diff_index: Optional[DiffIndex] = None,
+) -> ReviewResult:
+    """Review code for best practices, adapting to file type."""
+    system = build_system_prompt(file_category)
+
+    user_prompt, paths = await run_blocking(
+        _render_prompt, file_changes, diff_index, prompt_budget(system, pr_metadata)
+    )
+    if not paths:
+        return ReviewResult(agent_name="best_practices", comments=[], summary="No changes to review.")
+
+    resp = await invoke_llm(
+        build_review_messages(system, pr_metadata, user_prompt),
+        agent_name="best_practices",
+        file_paths=paths,
+        category=file_category,
     )
 
-    resp = await llm.ainvoke([
-        SystemMessage(content=system),
-        HumanMessage(content=user_prompt),
-    ])
-
-    try:
-        raw = resp.content.strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0]
-        return ReviewResult.model_validate_json(raw)
-    except Exception:
-        return ReviewResult(
-            agent_name="best_practices",
-            comments=[],
-            summary=resp.content[:500] if resp.content else "Parse error",
-        )
+    result = parse_review_result(resp.content, "best_practices", paths)
+    return remap_part_findings(result, file_changes, content_offsets=True)
@@ -1,11 +1,14 @@
 """Dependency change reviewer — checks package.json, requirements.txt, etc."""
 
 from __future__ import annotations
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from config import GPT_MODEL
+from typing import Optional
+from agents.chunker import prompt_budget
+from agents.compiler import compile_prompt
+from agents.cpu_pool import run_blocking
+from agents.diff_index import DiffIndex
+from agents.llm import invoke_llm, parse_review_result
+from agents.prompts import build_review_messages
 from agents.types import ReviewResult
-from utils import make_diff
 
 SYSTEM_PROMPT = """\
 You are a supply-chain security and dependency management expert reviewing package/dependency file changes.
@@ -17,78 +20,56 @@ Focus on:
 4. Removed dependencies: could this break existing functionality?
 5. Version pinning: are versions properly pinned or using unsafe ranges?
 
+Lockfiles are given as a table of added, removed and changed packages; for a finding on a row, \
+use its line column as l (null when empty).
+
 For every finding:
-- severity: "critical" (known vulnerability or malicious package), "major" (risky version range or unnecessary dep), "minor" (improvement), "nit" (style)
-- category: always "dependency"
-- confidence: 0.0-1.0
-- suggestion: concrete action to take
+- s (severity): 0 critical (known vulnerability or malicious package), 1 major (risky version range or unnecessary dep), 2 minor (improvement), 3 nit (style)
+- c (category): always 6 (dependency)
+- p (confidence): 0.0-1.0
+- x: concrete action to take
 
 ## Few-shot examples
 
-Example 1 - Overly broad version range:
-{
-  "file_path": "package.json",
-  "line_number": 15,
-  "severity": "major",
-  "category": "dependency",
-  "comment": "Using '*' version for 'lodash' allows any version including ones with known prototype pollution vulnerabilities.",
-  "suggestion": "Pin to a specific version: \\"lodash\\": \\"^4.17.21\\"",
-  "confidence": 0.92
-}
-
-Example 2 - Unnecessary dependency:
-{
-  "file_path": "package.json",
-  "line_number": 22,
-  "severity": "minor",
-  "category": "dependency",
-  "comment": "Adding 'left-pad' (8 lines of code). This functionality exists natively via String.prototype.padStart().",
-  "suggestion": "Remove dependency and use native padStart() instead.",
-  "confidence": 0.88
-}
-
-Respond with ONLY valid JSON matching the ReviewResult schema.
+Example 1 - Overly broad version range, in file [0] package.json:
+{"f": 0, "l": 15, "s": 1, "c": 6, "m": "Using '*' version for 'lodash' allows any version including ones with known prototype pollution vulnerabilities.", "x": "Pin to a specific version: \\"lodash\\": \\"^4.17.21\\"", "p": 0.92}
+
+Example 2 - Unnecessary dependency, in file [0] package.json:
+{"f": 0, "l": 22, "s": 2, "c": 6, "m": "Adding 'left-pad' (8 lines of code). This functionality exists natively via String.prototype.padStart().", "x": "Remove dependency and use native padStart() instead.", "p": 0.88}
 """
 
 
+def _render_prompt(
+    file_changes: list, diff_index: Optional[DiffIndex], budget: Optional[int] = None
+) -> tuple[str, list]:
+    """User prompt and the paths its [n] markers refer to ("" if nothing changed)."""
+    compiled = compile_prompt("dependency", file_changes, diff_index, budget)
+    if not compiled.paths:
+        return "", []
+
+    user_prompt = (
+        "Review these dependency file changes:\n\n"
+        + compiled.text
+        + '\n\nRespond with JSON: {"findings": [...], "summary": "..."}'
+    )
+    return user_prompt, compiled.paths
+
+
 async def run_dependency_review(
-    file_changes: list, pr_metadata: dict
+    file_changes: list, pr_metadata: dict, diff_index: Optional[DiffIndex] = None
 ) -> ReviewResult:
     """Review dependency file changes."""
-    llm = ChatOpenAI(model=GPT_MODEL, temperature=0.1)
-
-    diffs = []
-    for fc in file_changes:
-        d = make_diff(fc.get("before", ""), fc.get("after", ""), fc["path"])
-        if fc.get("change_type") == "add":
-            diffs.append(f"=== {fc['path']} (NEW FILE) ===\n{fc.get('after', '')}")
-        elif d.strip():
-            diffs.append(f"=== {fc['path']} ===\n{d}")
 
-    if not diffs:
+    user_prompt, paths = await run_blocking(
+        _render_prompt, file_changes, diff_index, prompt_budget(SYSTEM_PROMPT, pr_metadata)
+    )
+    if not paths:
         return ReviewResult(agent_name="dependency", comments=[], summary="No dependency changes.")
 
-    user_prompt = (
-        f"PR Title: {pr_metadata.get('title', '')}\n"
-        f"PR Description: {pr_metadata.get('description', '')}\n\n"
-        "Review these dependency file changes:\n\n"
-        + "\n\n".join(diffs)
-        + '\n\nRespond with JSON: {"agent_name": "dependency", "comments": [...], "summary": "..."}'
+    resp = await invoke_llm(
+        build_review_messages(SYSTEM_PROMPT, pr_metadata, user_prompt),
+        agent_name="dependency",
+        file_paths=paths,
     )
 
-    resp = await llm.ainvoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=user_prompt),
-    ])
-
-    try:
-        raw = resp.content.strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0]
-        return ReviewResult.model_validate_json(raw)
-    except Exception:
-        return ReviewResult(
-            agent_name="dependency",
-            comments=[],
-            summary=resp.content[:500] if resp.content else "Parse error",
-        )
+    return parse_review_result(resp.content, "dependency", paths)
@@ -0,0 +1,109 @@
+"""Fused reviewer — one LLM call covering every agent, for small PRs."""
+
+from __future__ import annotations
+from typing import List, Optional
+from agents.chunker import prompt_budget
+from agents.compiler import compile_prompt
+from agents.cpu_pool import run_blocking
+from agents.diff_index import DiffIndex
+from agents.llm import invoke_llm
+from agents.prompts import build_review_messages
+from agents.types import FusedReviewResult, ReviewResult, fused_response_format
+from agents.reviewers.test_coverage import build_static_comments
+from agents.reviewers.pr_description import check_description_length
+from config import FUSED_REVIEW_MAX_FILES, FUSED_REVIEW_MAX_LINES
+
+SYSTEM_PROMPT = """\
+You are a review team in a single response. Review the changes once and report \
+findings in five independent sections:
+
+- security: vulnerabilities only (injection, XSS, secrets, authz, unsafe deserialisation). \
+s 0 = exploitable now, 1 = likely exploitable, 2 = defense-in-depth, 3 = hardening. c always 0.
+- best_practices: correctness, error handling, resource management, performance, \
+accessibility, readability and naming. Do NOT repeat security findings here. \
+c 1 best-practice, 2 style, 4 performance or 5 accessibility.
+- test_coverage: changed behaviour that lacks tests and weak assertions in changed tests; \
+describe the specific test case to add in x. c always 3.
+- dependency: only when package/dependency files changed — unnecessary, risky, unpinned \
+or vulnerable dependencies. c always 6.
+- pr_description: whether the description explains what changed, why, breaking \
+changes and testing. c always 7, f always -1. Empty if adequate.
+
+Every finding needs a concrete fix (x) and a confidence (p). If a section has \
+no issues, return an empty findings list for it. Do NOT invent findings.
+
+## Example response
+{
+  "security": {"findings": [
+    {"f": 0, "l": 18, "s": 0, "c": 0, "m": "String interpolation in SQL query allows injection.", "x": "Use a parameterized query: cursor.execute('... WHERE id = %s', (user_id,))", "p": 0.95}
+  ], "summary": "1 SQL injection."},
+  "best_practices": {"findings": [], "summary": "No issues."},
+  "test_coverage": {"findings": [], "summary": "Tests updated alongside the change."},
+  "dependency": {"findings": [], "summary": "No dependency changes."},
+  "pr_description": {"findings": [], "summary": "Description is adequate."}
+}
+"""
+
+
+def should_fuse(file_changes: list, total_changed_lines: int) -> bool:
+    """Small PRs are reviewed in one fused call instead of a fan-out."""
+    return (
+        0 < len(file_changes) <= FUSED_REVIEW_MAX_FILES
+        and total_changed_lines <= FUSED_REVIEW_MAX_LINES
+    )
+
+
+def _render_prompt(
+    file_changes: list, diff_index: Optional[DiffIndex], budget: Optional[int] = None
+) -> tuple[str, list]:
+    """User prompt and the paths its [n] markers refer to."""
+    compiled = compile_prompt("fused", file_changes, diff_index, budget)
+
+    user_prompt = (
+        "Review these changes:\n\n"
+        + compiled.text
+        + '\n\nRespond with JSON: {"security": {"findings": [...], "summary": "..."}, '
+        '"best_practices": {...}, "test_coverage": {...}, "dependency": {...}, '
+        '"pr_description": {...}}'
+    )
+    return user_prompt, compiled.paths
+
+
+async def run_fused_review(
+    file_changes: list, pr_metadata: dict, diff_index: Optional[DiffIndex] = None
+) -> List[ReviewResult]:
+    """Review a small PR in a single LLM call and split the result per agent.
+
+    Static checks (test-to-code mapping, empty description) are merged into
+    their agents' sections. If the response cannot be parsed, every returned
+    result carries ``error`` so the caller can fall back to the fan-out.
+    """
+    user_prompt, paths = await run_blocking(
+        _render_prompt, file_changes, diff_index, prompt_budget(SYSTEM_PROMPT, pr_metadata)
+    )
+
+    resp = await invoke_llm(
+        build_review_messages(SYSTEM_PROMPT, pr_metadata, user_prompt),
+        agent_name="fused",
+        file_paths=paths,
+        response_format=fused_response_format(),
+    )
+
+    try:
+        results = FusedReviewResult.model_validate_json(resp.content).split(paths)
+    except ValueError:
+        return [
+            ReviewResult(agent_name=name, summary="Parse error", error="Parse error")
+            for name in FusedReviewResult.model_fields
+        ]
+
+    static = {
+        "test_coverage": build_static_comments(file_changes),
+        "pr_description": check_description_length(pr_metadata),
+    }
+    for r in results:
+        if r.agent_name == "pr_description" and static["pr_description"]:
+            r.comments = static["pr_description"]  # supersedes the LLM's take
+        else:
+            r.comments = static.get(r.agent_name, []) + r.comments
+    return results
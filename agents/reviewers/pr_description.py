@@ -1,9 +1,8 @@
 """PR description validator — checks if the PR is well-documented."""
 
 from __future__ import annotations
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from config import GPT_MODEL
+from agents.llm import invoke_llm, parse_review_result
+from agents.prompts import build_review_messages
 from agents.types import ReviewResult, ReviewComment
 
 
@@ -18,65 +17,59 @@ A good PR description should:
 
 Evaluate the PR description against these criteria given the list of changed files.
 
-If the description is adequate, return empty comments.
+If the description is adequate, return empty findings.
 If it's missing key information, return findings with:
-- severity: "major" (empty or completely uninformative), "minor" (missing important details)
-- category: always "pr-description"
-- confidence: 0.0-1.0
-
-Respond with ONLY valid JSON matching the ReviewResult schema.
+- f: always -1 (not file-specific), l: null
+- s (severity): 1 major (empty or completely uninformative), 2 minor (missing important details)
+- c (category): always 7 (pr-description)
+- p (confidence): 0.0-1.0
 """
 
 
+def check_description_length(pr_metadata: dict) -> list[ReviewComment]:
+    """Static check: flag an empty or trivially short description."""
+    description = pr_metadata.get("description", "") or ""
+    if len(description.strip()) >= 10:
+        return []
+    return [
+        ReviewComment(
+            file_path="",
+            severity="major",
+            category="pr-description",
+            comment=(
+                f"PR description is empty or trivially short ({len(description.strip())} chars). "
+                "A good description should explain what changed, why, and how to test."
+            ),
+            suggestion="Add a description covering: what changed, why, any breaking changes, and testing steps.",
+            confidence=0.99,
+        )
+    ]
+
+
 async def run_pr_description_review(
     pr_metadata: dict, changed_file_paths: list[str]
 ) -> ReviewResult:
     """Validate PR description quality."""
-    description = pr_metadata.get("description", "") or ""
-    title = pr_metadata.get("title", "") or ""
-
     # Quick check: empty or trivially short description
-    if len(description.strip()) < 10:
+    static_comments = check_description_length(pr_metadata)
+    if static_comments:
         return ReviewResult(
             agent_name="pr_description",
-            comments=[
-                ReviewComment(
-                    file_path="",
-                    severity="major",
-                    category="pr-description",
-                    comment=(
-                        f"PR description is empty or trivially short ({len(description.strip())} chars). "
-                        "A good description should explain what changed, why, and how to test."
-                    ),
-                    suggestion="Add a description covering: what changed, why, any breaking changes, and testing steps.",
-                    confidence=0.99,
-                )
-            ],
+            comments=static_comments,
             summary="PR description is missing or inadequate.",
         )
 
-    llm = ChatOpenAI(model=GPT_MODEL, temperature=0.1)
     user_prompt = (
-        f"PR Title: {title}\n"
-        f"PR Description:\n{description}\n\n"
+        "Evaluate the PR description above.\n\n"
         f"Changed files ({len(changed_file_paths)}):\n"
         + "\n".join(f"  - {p}" for p in changed_file_paths[:50])
-        + '\n\nRespond with JSON: {"agent_name": "pr_description", "comments": [...], "summary": "..."}'
+        + '\n\nRespond with JSON: {"findings": [...], "summary": "..."}'
     )
 
-    resp = await llm.ainvoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=user_prompt),
-    ])
+    resp = await invoke_llm(
+        build_review_messages(SYSTEM_PROMPT, pr_metadata, user_prompt),
+        agent_name="pr_description",
+        file_paths=[],
+    )
 
-    try:
-        raw = resp.content.strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0]
-        return ReviewResult.model_validate_json(raw)
-    except Exception:
-        return ReviewResult(
-            agent_name="pr_description",
-            comments=[],
-            summary=resp.content[:500] if resp.content else "Parse error",
-        )
+    return parse_review_result(resp.content, "pr_description", [])
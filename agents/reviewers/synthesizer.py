@@ -1,7 +1,7 @@
 """Synthesizer — merges results from all specialized reviewers, deduplicates, and prioritises."""
 
 from __future__ import annotations
-from typing import List
+from typing import List, Optional
 from config import COMMENT_SCALE_FACTOR
 from agents.types import ReviewResult, ReviewComment
 
@@ -17,10 +17,12 @@ def compute_max_comments(total_changed_lines: int) -> int:
 def synthesize(
     results: List[ReviewResult],
     total_changed_lines: int,
+    notes: Optional[List[str]] = None,
 ) -> tuple[List[ReviewComment], str]:
     """Merge, deduplicate, filter, and prioritise review comments.
 
-    Returns (filtered_comments, markdown_summary).
+    ``notes`` are review-scope remarks (e.g. what triage skipped) listed
+    under the agent summaries. Returns (filtered_comments, markdown_summary).
     """
     all_comments: List[ReviewComment] = []
     summaries: List[str] = []
@@ -71,6 +73,12 @@ def synthesize(
             md_parts.append(f"- {s}")
         md_parts.append("")
 
+    if notes:
+        md_parts.append("### Review Scope\n")
+        for note in notes:
+            md_parts.append(f"- {note}")
+        md_parts.append("")
+
     # Detailed findings by severity
     for sev in ("critical", "major", "minor", "nit"):
         sev_comments = [c for c in filtered if c.severity == sev]
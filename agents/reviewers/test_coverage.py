@@ -1,12 +1,16 @@
 """Test-coverage reviewer — identifies missing tests and test-to-code mapping gaps."""
 
 from __future__ import annotations
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from config import GPT_MODEL
+import asyncio
+from typing import Optional
+from agents.chunker import plan_chunks, prompt_budget, remap_part_findings
+from agents.compiler import compile_prompt
+from agents.cpu_pool import run_blocking
+from agents.diff_index import DiffIndex
+from agents.llm import invoke_llm, parse_review_result
+from agents.prompts import build_review_messages
 from agents.types import ReviewResult, ReviewComment
 from agents.router import find_test_pairs
-from utils import make_diff
 
 SYSTEM_PROMPT = """\
 You are a senior QA/test engineer reviewing code changes for test coverage gaps.
@@ -17,49 +21,25 @@ Your job:
 3. Review test quality if test files are included in the changes.
 
 For every finding:
-- severity: "major" (untested critical path), "minor" (nice-to-have test), "nit" (test improvement)
-- category: always "test-coverage"
-- confidence: 0.0-1.0
-- suggestion: describe the specific test case to add
+- s (severity): 1 major (untested critical path), 2 minor (nice-to-have test), 3 nit (test improvement)
+- c (category): always 3 (test-coverage)
+- p (confidence): 0.0-1.0
+- x: describe the specific test case to add
 
 ## Few-shot examples
 
-Example 1 - Missing test for new function:
-{
-  "file_path": "src/utils/validator.ts",
-  "line_number": 12,
-  "severity": "major",
-  "category": "test-coverage",
-  "comment": "New `validateEmail()` function added but no test file updated. This validates user input and should have edge-case coverage.",
-  "suggestion": "Add tests in validator.test.ts: valid email, missing @, unicode chars, empty string, max-length boundary.",
-  "confidence": 0.90
-}
-
-Example 2 - Weak assertion:
-{
-  "file_path": "tests/test_api.py",
-  "line_number": 45,
-  "severity": "minor",
-  "category": "test-coverage",
-  "comment": "Test only asserts status code 200 but doesn't verify response body or side effects.",
-  "suggestion": "Add assertions for response JSON shape and verify database state changed.",
-  "confidence": 0.75
-}
-
-Respond with ONLY valid JSON matching the ReviewResult schema.
-"""
+Example 1 - Missing test for new function, in file [0] src/utils/validator.ts:
+{"f": 0, "l": 12, "s": 1, "c": 3, "m": "New `validateEmail()` function added but no test file updated. This validates user input and should have edge-case coverage.", "x": "Add tests in validator.test.ts: valid email, missing @, unicode chars, empty string, max-length boundary.", "p": 0.90}
 
+Example 2 - Weak assertion, in file [1] tests/test_api.py:
+{"f": 1, "l": 45, "s": 2, "c": 3, "m": "Test only asserts status code 200 but doesn't verify response body or side effects.", "x": "Add assertions for response JSON shape and verify database state changed.", "p": 0.75}
+"""
 
-async def run_test_coverage_review(
-    file_changes: list, pr_metadata: dict
-) -> ReviewResult:
-    """Check for test coverage gaps in the PR."""
-    llm = ChatOpenAI(model=GPT_MODEL, temperature=0.1)
 
-    # Static analysis: find source files without corresponding test changes
-    missing_pairs = find_test_pairs(file_changes)
+def build_static_comments(file_changes: list) -> list[ReviewComment]:
+    """Static analysis: source files without corresponding test changes."""
     static_comments = []
-    for pair in missing_pairs:
+    for pair in find_test_pairs(file_changes):
         static_comments.append(
             ReviewComment(
                 file_path=pair["source"],
@@ -73,50 +53,95 @@ async def run_test_coverage_review(
                 confidence=0.85,
             )
         )
+    return static_comments
 
-    # LLM analysis for deeper test quality issues
-    diffs = []
-    for fc in file_changes:
-        d = make_diff(fc.get("before", ""), fc.get("after", ""), fc["path"])
-        if fc.get("change_type") == "add":
-            diffs.append(f"=== {fc['path']} (NEW FILE) ===\n{fc.get('after', '')[:3000]}")
-        elif d.strip():
-            diffs.append(f"=== {fc['path']} ===\n{d[:3000]}")
-
-    if not diffs:
-        return ReviewResult(
-            agent_name="test_coverage",
-            comments=static_comments,
-            summary="Static test-to-code mapping analysis only.",
-        )
+
+def _render_prompt(
+    file_changes: list, diff_index: Optional[DiffIndex], budget: Optional[int] = None
+) -> tuple[str, list]:
+    """User prompt and the paths its [n] markers refer to ("" if nothing changed)."""
+    compiled = compile_prompt("test_coverage", file_changes, diff_index, budget)
+    if not compiled.paths:
+        return "", []
 
     user_prompt = (
-        f"PR Title: {pr_metadata.get('title', '')}\n\n"
         "Review these changes for test coverage:\n\n"
-        + "\n\n".join(diffs)
-        + '\n\nRespond with JSON: {"agent_name": "test_coverage", "comments": [...], "summary": "..."}'
+        + compiled.text
+        + '\n\nRespond with JSON: {"findings": [...], "summary": "..."}'
+    )
+    return user_prompt, compiled.paths
+
+
+async def _review_chunk(
+    file_changes: list, pr_metadata: dict, diff_index: Optional[DiffIndex]
+) -> Optional[ReviewResult]:
+    """LLM findings for one chunk (None if it has nothing to review)."""
+    user_prompt, paths = await run_blocking(
+        _render_prompt, file_changes, diff_index, prompt_budget(SYSTEM_PROMPT, pr_metadata)
     )
+    if not paths:
+        return None
 
-    resp = await llm.ainvoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=user_prompt),
-    ])
-
-    try:
-        raw = resp.content.strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[1].rsplit("```", 1)[0]
-        llm_result = ReviewResult.model_validate_json(raw)
-        # Merge static + LLM findings
-        all_comments = static_comments + llm_result.comments
+    resp = await invoke_llm(
+        build_review_messages(SYSTEM_PROMPT, pr_metadata, user_prompt),
+        agent_name="test_coverage",
+        file_paths=paths,
+    )
+    result = parse_review_result(resp.content, "test_coverage", paths)
+    return remap_part_findings(result, file_changes, content_offsets=True)
+
+
+async def run_test_coverage_review(
+    file_changes: list,
+    pr_metadata: dict,
+    llm_files: Optional[list] = None,
+    diff_index: Optional[DiffIndex] = None,
+) -> ReviewResult:
+    """Check for test coverage gaps in the PR.
+
+    The static test-to-code mapping always covers every file in the PR;
+    ``llm_files`` optionally narrows the files sent to the LLM. Those files
+    are packed against the prompt budget, so a large PR (or one oversized
+    file, split into parts) takes several LLM calls rather than being cut.
+    """
+    static_comments = build_static_comments(file_changes)
+
+    # LLM analysis for deeper test quality issues
+    plan = plan_chunks(
+        file_changes if llm_files is None else llm_files,
+        prompt_budget(SYSTEM_PROMPT, pr_metadata),
+        diff_index,
+        agent="test_coverage",
+    )
+    results = [
+        r for r in await asyncio.gather(
+            *(_review_chunk(chunk, pr_metadata, diff_index) for chunk in plan.chunks)
+        ) if r is not None
+    ]
+    if not results:
         return ReviewResult(
             agent_name="test_coverage",
-            comments=all_comments,
-            summary=llm_result.summary,
+            comments=static_comments,
+            summary="Static test-to-code mapping analysis only.",
         )
-    except Exception:
+
+    llm_comments = [c for r in results for c in r.comments]
+    summary = " ".join(r.summary for r in results if r.summary)
+    errors = [r.error for r in results if r.error]
+    if errors:
+        # Keep whatever complete findings survived a truncated response
         return ReviewResult(
             agent_name="test_coverage",
-            comments=static_comments,
-            summary="LLM analysis failed; showing static mapping results only.",
+            comments=static_comments + llm_comments,
+            summary=(
+                summary if llm_comments
+                else "LLM analysis failed; showing static mapping results only."
+            ),
+            error="; ".join(errors),
         )
+    # Merge static + LLM findings
+    return ReviewResult(
+        agent_name="test_coverage",
+        comments=static_comments + llm_comments,
+        summary=summary,
+    )
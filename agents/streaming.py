@@ -0,0 +1,154 @@
+"""Incremental parsing of streamed reviewer responses.
+
+Reviewer responses are compact JSON objects holding one or more
+``"findings"`` arrays (see ``agents.types.CompactReviewResult``).
+``IncrementalFindingsParser`` scans the text as it streams in and hands back
+each finding object the moment its closing brace arrives, so findings can be
+consumed while the model is still generating and complete findings survive a
+truncated response.
+"""
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from agents.types import CompactFinding, ReviewComment
+
+_OPEN = {"{": "}", "[": "]"}
+
+
+class IncrementalFindingsParser:
+    """Streaming scanner that yields each object of every ``findings`` array.
+
+    ``feed`` returns ``(section, finding)`` pairs, where ``section`` is the key
+    of the object that holds the array (``None`` for a top-level
+    result, e.g. ``"security"`` inside a fused response).
+    """
+
+    def __init__(self, array_key: str = "findings") -> None:
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        self._stack: List[Tuple[str, Optional[str]]] = []  # (bracket, key it was opened under)
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        self._finding_start: Optional[int] = None
+        self.findings: List[Tuple[Optional[str], dict]] = []
+
+    def feed(self, text: str) -> List[Tuple[Optional[str], dict]]:
+        """Consume more response text; return the findings completed by it."""
+        self._text += text
+        completed: List[Tuple[Optional[str], dict]] = []
+        text_, n = self._text, len(self._text)
+        i = self._pos
+        while i < n:
+            ch = text_[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    try:
+                        self._last_string = json.loads(text_[self._string_start:i + 1])
+                    except ValueError:
+                        self._last_string = None
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":":
+                self._pending_key = self._last_string
+            elif ch == ",":
+                self._pending_key = None
+            elif ch in _OPEN:
+                key = self._pending_key if self._stack and self._stack[-1][0] == "{" else None
+                if (
+                    ch == "{"
+                    and self._stack
+                    and self._stack[-1] == ("[", self.array_key)
+                    and self._finding_start is None
+                ):
+                    self._finding_start = i
+                self._stack.append((ch, key))
+                self._pending_key = None
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if (
+                    ch == "}"
+                    and self._finding_start is not None
+                    and self._stack
+                    and self._stack[-1] == ("[", self.array_key)
+                ):
+                    section = self._stack[-2][1] if len(self._stack) >= 2 else None
+                    try:
+                        completed.append((section, json.loads(text_[self._finding_start:i + 1])))
+                    except ValueError:
+                        pass
+                    self._finding_start = None
+            i += 1
+        self._pos = i
+        self.findings.extend(completed)
+        return completed
+
+
+def expand_finding(obj: dict, file_paths: List[str]) -> Optional[ReviewComment]:
+    """Expand one streamed compact finding, or None if it is malformed."""
+    try:
+        return CompactFinding.model_validate(obj).expand(file_paths)
+    except ValueError:
+        return None
+
+
+def salvage_comments(text: str, file_paths: List[str]) -> List[ReviewComment]:
+    """Recover every complete, valid finding from a (possibly truncated) response."""
+    comments = []
+    for _, obj in IncrementalFindingsParser().feed(text):
+        comment = expand_finding(obj, file_paths)
+        if comment is not None:
+            comments.append(comment)
+    return comments
+
+
+class FindingStream:
+    """Async channel of (agent_name, ReviewComment) pairs emitted mid-generation."""
+
+    _CLOSED = object()
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(self, agent_name: str, comment: ReviewComment) -> None:
+        self._queue.put_nowait((agent_name, comment))
+
+    def close(self) -> None:
+        self._queue.put_nowait(self._CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[str, ReviewComment]]:
+        while True:
+            item = await self._queue.get()
+            if item is self._CLOSED:
+                return
+            yield item
+
+
+_stream: contextvars.ContextVar[Optional[FindingStream]] = contextvars.ContextVar(
+    "finding_stream", default=None
+)
+
+
+def open_finding_stream() -> FindingStream:
+    """Publish findings from LLM calls made in the current context to a new stream."""
+    stream = FindingStream()
+    _stream.set(stream)
+    return stream
+
+
+def current_finding_stream() -> Optional[FindingStream]:
+    return _stream.get()
@@ -0,0 +1,52 @@
+"""Whitespace-aware comparison of changed lines, shared by triage and the prompt compiler.
+
+A change only counts as whitespace-only when every changed line keeps the
+same tokens: runs of non-space characters, with string literals compared
+verbatim (``"rm -rf /tmp"`` and ``"rm -rf / tmp"`` differ). In languages
+where indentation is syntax, each line must also keep its indentation.
+"""
+
+from __future__ import annotations
+import re
+from typing import List
+
+from agents.tokens import language_for
+
+# Languages where leading whitespace is syntax; unknown files are assumed to be.
+INDENTATION_SENSITIVE = {"python", "yaml", "markdown", ""}
+
+# A quoted literal (to the end of the line if unterminated) or a run of other non-space characters
+_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*(?:"|$)|\'(?:\\.|[^\'\\])*(?:\'|$)|`(?:\\.|[^`\\])*(?:`|$)|[^\s"\'`]+'
+)
+
+
+def indentation_matters(path: str) -> bool:
+    """True when re-indenting a line of ``path`` can change its meaning."""
+    return language_for(path) in INDENTATION_SENSITIVE
+
+
+def line_tokens(line: str) -> List[str]:
+    return _TOKEN.findall(line)
+
+
+def _indent(line: str) -> str:
+    return line[: len(line) - len(line.lstrip())]
+
+
+def whitespace_only(removed: List[str], added: List[str], path: str = "") -> bool:
+    """True when the removed lines become the added ones by whitespace edits alone.
+
+    Lines are paired in order (blank lines ignored) and must have equal
+    tokens. A line present unchanged on both sides was moved, which is not
+    a whitespace edit.
+    """
+    old = [l.rstrip() for l in removed if l.strip()]
+    new = [l.rstrip() for l in added if l.strip()]
+    if len(old) != len(new) or set(old) & set(new):
+        return False
+    indentation = indentation_matters(path)
+    return all(
+        line_tokens(a) == line_tokens(b) and (not indentation or _indent(a) == _indent(b))
+        for a, b in zip(old, new)
+    )
@@ -0,0 +1,152 @@
+"""Offline token estimator, calibrated per language from real LLM usage.
+
+``len(text) // 4`` undercounts symbol-dense code and non-ASCII text and
+overcounts indentation. This estimator needs no tokenizer download: it
+splits text the way BPE pre-tokenizers do (word pieces, 1-3 digit groups,
+punctuation runs, newline+indent runs, non-ASCII characters) and prices
+each piece. Raw counts are memoised per content.
+
+The LLM's reported ``input_tokens`` recalibrate a per-language scale
+(EWMA of actual / raw), so estimates converge on the deployed model's
+tokenizer. Scales persist in ``TOKEN_CALIBRATION_FILE`` across runs; the
+review writes them once, off the event loop, when it ends.
+"""
+
+from __future__ import annotations
+import functools
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+from config import TOKEN_CALIBRATION_FILE
+
+_WORD_PIECE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+_DIGITS = re.compile(r"[0-9]+")
+_SYMBOLS = re.compile(r"[!-/:-@\[-`{-~]+")
+_BREAKS = re.compile(r"[ \t]*\n[ \t\n]*|[ \t]{2,}")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+
+WORD_CHARS_FREE = 6  # word pieces up to this long are one token
+WORD_CHARS_PER_EXTRA_TOKEN = 4
+SYMBOL_CHARS_PER_TOKEN = 2
+NON_ASCII_TOKENS = 1.0
+
+EWMA_ALPHA = 0.2
+MIN_LANGUAGE_SAMPLES = 3
+SCALE_BOUNDS = (0.5, 2.0)
+
+_LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java", ".kt": "kotlin", ".go": "go", ".rs": "rust", ".rb": "ruby",
+    ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp", ".cs": "csharp",
+    ".php": "php", ".swift": "swift", ".scala": "scala", ".sql": "sql", ".sh": "shell",
+    ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".xml": "xml",
+    ".html": "html", ".css": "css", ".scss": "css", ".md": "markdown", ".rst": "markdown",
+    ".txt": "text", ".lock": "lockfile",
+}
+
+
+def language_for(path: str) -> str:
+    """Calibration bucket for a file path ("" when unknown)."""
+    return _LANGUAGES.get(os.path.splitext(path or "")[1].lower(), "")
+
+
+
+@functools.lru_cache(maxsize=8192)
+def raw_count(text: str) -> int:
+    """Uncalibrated token count of ``text`` (memoised per content)."""
+    if not text:
+        return 0
+    words = 0
+    for m in _WORD_PIECE.finditer(text):
+        words += 1 + max(0, m.end() - m.start() - WORD_CHARS_FREE) // WORD_CHARS_PER_EXTRA_TOKEN
+    digits = sum(math.ceil(len(d) / 3) for d in _DIGITS.findall(text))
+    symbols = sum(math.ceil(len(s) / SYMBOL_CHARS_PER_TOKEN) for s in _SYMBOLS.findall(text))
+    breaks = len(_BREAKS.findall(text))
+    non_ascii = len(_NON_ASCII.findall(text)) * NON_ASCII_TOKENS
+    return max(1, int(words + digits + symbols + breaks + non_ascii))
+
+
+class TokenEstimator:
+    """Raw counts scaled by per-language factors learned from reported usage."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or ""
+        # language -> [log scale, samples]; "" is the all-language scale
+        self.scales: Dict[str, list] = {}
+        self._unsaved = 0  # observations not yet written to ``path``
+        self.pinned = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.scales = {k: [float(v[0]), int(v[1])] for k, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, IndexError):
+            self.scales = {}
+
+    def flush(self) -> None:
+        """Write the scales to ``path`` if observations arrived since the last write."""
+        with self._lock:
+            if not self.path or not self._unsaved:
+                return
+            data = json.dumps(self.scales)
+            self._unsaved = 0
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def pin(self, scales: Dict[str, list]) -> None:
+        """Use ``scales`` from now on and stop learning from usage."""
+        with self._lock:
+            self.scales = {k: [float(v[0]), int(v[1])] for k, v in scales.items()}
+            self.pinned = True
+            self._unsaved = 0
+
+    def scale(self, language: str = "") -> float:
+        entry = self.scales.get(language)
+        if entry is None or entry[1] < MIN_LANGUAGE_SAMPLES:
+            entry = self.scales.get("")
+        return math.exp(entry[0]) if entry else 1.0
+
+    def estimate(self, text: str, language: str = "") -> int:
+        raw = raw_count(text)
+        return int(math.ceil(raw * self.scale(language))) if raw else 0
+
+    def observe(self, raw: int, actual: int, languages: Iterable[str] = ()) -> None:
+        """Fold one call's reported prompt tokens into the scales."""
+        if self.pinned or raw <= 0 or actual <= 0:
+            return
+        ratio = min(max(actual / raw, SCALE_BOUNDS[0]), SCALE_BOUNDS[1])
+        with self._lock:
+            for language in {"", *languages}:
+                entry = self.scales.get(language)
+                if entry is None:
+                    self.scales[language] = [math.log(ratio), 1]
+                else:
+                    entry[0] = (1 - EWMA_ALPHA) * entry[0] + EWMA_ALPHA * math.log(ratio)
+                    entry[1] += 1
+            self._unsaved += 1
+
+
+_estimator: Optional[TokenEstimator] = None
+
+
+def get_token_estimator() -> TokenEstimator:
+    global _estimator
+    if _estimator is None:
+        _estimator = TokenEstimator(TOKEN_CALIBRATION_FILE)
+    return _estimator
@@ -0,0 +1,194 @@
+"""Triage — a cheap first pass that drops mechanical hunks before deep review.
+
+On large PRs most hunks are imports, formatting, renames, comments or
+version bumps. Each hunk is scored per agent with local heuristics (no LLM
+call); hunks below the threshold are removed from the diff the agent sees,
+and files with no remaining hunks are not sent at all.
+"""
+
+from __future__ import annotations
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agents.diff_index import DiffIndex, split_hunks
+from agents.prescan import SENSITIVE_PATTERNS
+from agents.router import classify_file
+from agents.syntax import indentation_matters, whitespace_only
+from agents.tokens import language_for
+from utils import file_diff
+
+_HUNK_HEADER = re.compile(r"@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+_COMMENT = re.compile(r"^\s*(#|//|/\*|\*|<!--|--\s)")
+_IMPORT = re.compile(
+    r"^\s*(import\s|from\s+\S+\s+import\s|export\s+\*\s+from\s|using\s|package\s|use\s|"
+    r"#include\s|require\(|.*=\s*require\()"
+)
+_VERSION = re.compile(r"\d+(?:\.\d+)+")
+# A literal-valued assignment, field, keyword argument or mapping entry — order-free on its own
+_DECLARATION = re.compile(
+    r"""^\s*(?:(?:export|const|let|var|final|static|public|private|protected|readonly)\s+)*"""
+    r"""["']?[\w.\-]+["']?\s*(?::\s*[\w\[\], .|]+?)?\s*"""
+    r"""(?:(?:[:=]|=>)\s*(?:-?\d[\w.]*|"[^"]*"|'[^']*'|true|false|True|False|None|null|nil))?\s*[,;]?\s*$"""
+)
+_WORD = re.compile(r"\w+")
+_IDENTIFIER = re.compile(r"^[A-Za-z_]\w*$")
+_NOT_RENAMES = {
+    "True", "False", "None", "true", "false", "null", "nil", "undefined",
+    "and", "or", "not", "is", "in", "if", "else", "return", "await", "async",
+    "const", "let", "var", "public", "private", "protected", "static",
+}
+
+# Score given to each kind of hunk; hunks below the threshold are skipped.
+MECHANICAL_SCORE = 0.0
+COMMENT_SCORE = {"security": 0.0, "best_practices": 0.2}
+CODE_SCORE = {"security": 0.4, "best_practices": 0.5}
+SENSITIVE_SCORE = 1.0
+
+CONFIG_LANGUAGES = {"json", "yaml", "toml", "xml"}
+
+
+def _changed_lines(hunk: str) -> Tuple[List[str], List[str]]:
+    body = _HUNK_HEADER.sub("", hunk, count=1)
+    removed, added = [], []
+    for line in body.split("\n"):
+        if line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith("+"):
+            added.append(line[1:])
+    return removed, added
+
+
+def _indent(line: str) -> str:
+    return line[: len(line) - len(line.lstrip())]
+
+
+def _is_rename(removed: List[str], added: List[str]) -> bool:
+    """Two or more changed lines that each carry the same identifier substitution and nothing else."""
+    if len(removed) < 2 or len(removed) != len(added):
+        return False
+    subs = set()
+    for old, new in zip(removed, added):
+        if _indent(old) != _indent(new) or _WORD.sub("", old).split() != _WORD.sub("", new).split():
+            return False  # indentation, punctuation or operators changed too
+        a, b = _WORD.findall(old), _WORD.findall(new)
+        if len(a) != len(b):
+            return False
+        diffs = {(x, y) for x, y in zip(a, b) if x != y}
+        if len(diffs) != 1:
+            return False  # every line must carry the substitution
+        [(x, y)] = diffs
+        if x in b:
+            return False  # only some occurrences were replaced
+        subs |= diffs
+    if len(subs) != 1:
+        return False
+    old, new = next(iter(subs))
+    return all(_IDENTIFIER.match(t) and t not in _NOT_RENAMES for t in (old, new))
+
+
+def _is_config(path: str) -> bool:
+    return (
+        classify_file(path) == "dependency"
+        or language_for(path) in CONFIG_LANGUAGES
+        or os.path.splitext(path)[1].lower() in (".cfg", ".ini")
+    )
+
+
+def _is_version_bump(removed: List[str], added: List[str], path: str) -> bool:
+    """Dotted version strings changed in a dependency manifest, or on a config ``version`` line."""
+    if not path or not _is_config(path) or len(removed) != len(added):
+        return False
+    manifest = classify_file(path) == "dependency"
+    return all(
+        _VERSION.sub("0", a) == _VERSION.sub("0", b) and (manifest or "version" in a.lower())
+        for a, b in zip(removed, added)
+    )
+
+
+def is_mechanical(removed: List[str], added: List[str], path: str = "") -> bool:
+    """Imports, whitespace/formatting, reordered declarations, renames and version bumps."""
+    changed = [l for l in removed + added if l.strip()]
+    if not changed:
+        return True
+    if whitespace_only(removed, added, path):
+        return True  # formatting only
+    if all(_IMPORT.match(l) or _DECLARATION.match(l) for l in changed):
+        norm = str.rstrip if indentation_matters(path) else str.strip
+        if Counter(norm(l) for l in removed if l.strip()) == Counter(norm(l) for l in added if l.strip()):
+            return True  # imports or declarations reordered
+    if all(_IMPORT.match(l) for l in changed):
+        return True
+    if _is_version_bump(removed, added, path):
+        return True
+    return _is_rename(removed, added)
+
+
+def score_hunk(hunk: str, agent: str, path: str = "") -> float:
+    """Review-worthiness of one hunk of ``path`` for one agent, from 0.0 to 1.0."""
+    removed, added = _changed_lines(hunk)
+    changed = [l for l in removed + added if l.strip()]
+    if agent == "security" and any(SENSITIVE_PATTERNS.search(l) for l in changed):
+        return SENSITIVE_SCORE
+    if is_mechanical(removed, added, path):
+        return MECHANICAL_SCORE
+    if all(_COMMENT.match(l) for l in changed):
+        return COMMENT_SCORE.get(agent, 0.2)
+    return CODE_SCORE.get(agent, 0.5)
+
+
+@dataclass
+class TriageCounts:
+    hunks: int = 0
+    skipped_hunks: int = 0
+    skipped_files: int = 0
+
+
+class Triage:
+    """Filters each agent's files down to review-worthy hunks and counts the skips."""
+
+    def __init__(self, threshold: float, diff_index: Optional[DiffIndex] = None) -> None:
+        self.threshold = threshold
+        self.diff_index = diff_index
+        self.counts: Dict[str, TriageCounts] = {}
+
+    def _hunks(self, fc: dict) -> Tuple[str, List[str]]:
+        if "diff" not in fc and self.diff_index is not None:
+            fd = self.diff_index.get(fc)
+            return fd.header, fd.hunks
+        return split_hunks(file_diff(fc))
+
+    def filter(self, file_changes: List[dict], agent: str) -> List[dict]:
+        """Return copies of the files carrying only their kept hunks in ``"diff"``."""
+        counts = self.counts.setdefault(agent, TriageCounts())
+        kept_files = []
+        for fc in file_changes:
+            header, hunks = self._hunks(fc)
+            if not hunks:
+                kept_files.append(fc)
+                continue
+            kept = [h for h in hunks if score_hunk(h, agent, fc.get("path", "")) >= self.threshold]
+            counts.hunks += len(hunks)
+            counts.skipped_hunks += len(hunks) - len(kept)
+            if not kept:
+                counts.skipped_files += 1
+            elif len(kept) == len(hunks):
+                kept_files.append(fc)
+            else:
+                kept_files.append({**fc, "diff": header + "".join(kept)})
+        return kept_files
+
+    def render(self) -> str:
+        """One line of skip statistics for the review summary ("" if nothing was skipped)."""
+        parts = [
+            f"{agent} {c.skipped_hunks}/{c.hunks} hunks"
+            + (f" ({c.skipped_files} file(s) entirely)" if c.skipped_files else "")
+            for agent, c in self.counts.items()
+            if c.skipped_hunks
+        ]
+        if not parts:
+            return ""
+        return "Triage skipped mechanical changes (imports, formatting, renames, comments): " + "; ".join(parts)
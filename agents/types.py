@@ -1,7 +1,7 @@
 """Shared types for review agents."""
 
 from __future__ import annotations
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Literal, Optional
 
 
@@ -32,3 +32,133 @@ class ReviewResult(BaseModel):
     agent_name: str = ""
     comments: List[ReviewComment] = Field(default_factory=list)
     summary: str = ""
+    error: Optional[str] = None  # set when the reviewer failed (never cached)
+
+
+# ── Compact wire format ─────────────────────────────────────────────
+# What the LLM actually generates: short keys, integer codes for severity
+# and category, and an index into the prompt's file list instead of a
+# repeated path. Expanded into ReviewComment/ReviewResult locally.
+
+SEVERITY_CODES: List[str] = ["critical", "major", "minor", "nit"]
+CATEGORY_CODES: List[str] = [
+    "security",
+    "best-practice",
+    "style",
+    "test-coverage",
+    "performance",
+    "accessibility",
+    "dependency",
+    "pr-description",
+]
+
+
+class CompactFinding(BaseModel):
+    """One finding as generated: f=file index, l=line, s=severity code,
+    c=category code, m=message, x=suggested fix, p=confidence."""
+
+    f: int = -1
+    l: Optional[int] = None
+    s: int = 2
+    c: int = 1
+    m: str = ""
+    x: Optional[str] = None
+    p: float = 0.7
+
+    def expand(self, file_paths: List[str]) -> ReviewComment:
+        return ReviewComment(
+            file_path=file_paths[self.f] if 0 <= self.f < len(file_paths) else "",
+            line_number=self.l,
+            severity=SEVERITY_CODES[min(max(self.s, 0), len(SEVERITY_CODES) - 1)],
+            category=CATEGORY_CODES[self.c] if 0 <= self.c < len(CATEGORY_CODES) else "best-practice",
+            comment=self.m,
+            suggestion=self.x,
+            confidence=min(max(self.p, 0.0), 1.0),
+        )
+
+
+class CompactReviewResult(BaseModel):
+    """A reviewer's response in the compact wire format."""
+
+    findings: List[CompactFinding] = Field(default_factory=list)
+    summary: str = ""
+
+    def expand(self, agent_name: str, file_paths: List[str]) -> ReviewResult:
+        return ReviewResult(
+            agent_name=agent_name,
+            comments=[f.expand(file_paths) for f in self.findings],
+            summary=self.summary,
+        )
+
+
+def _compact_result_schema() -> dict:
+    nullable_int = {"type": ["integer", "null"]}
+    finding = {
+        "type": "object",
+        "properties": {
+            "f": {"type": "integer"},
+            "l": nullable_int,
+            "s": {"type": "integer", "enum": list(range(len(SEVERITY_CODES)))},
+            "c": {"type": "integer", "enum": list(range(len(CATEGORY_CODES)))},
+            "m": {"type": "string"},
+            "x": {"type": ["string", "null"]},
+            "p": {"type": "number"},
+        },
+        "required": ["f", "l", "s", "c", "m", "x", "p"],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "object",
+        "properties": {
+            "findings": {"type": "array", "items": finding},
+            "summary": {"type": "string"},
+        },
+        "required": ["findings", "summary"],
+        "additionalProperties": False,
+    }
+
+
+def review_response_format() -> dict:
+    """OpenAI structured-output format enforcing CompactReviewResult."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "review_result", "strict": True, "schema": _compact_result_schema()},
+    }
+
+
+class FusedReviewResult(BaseModel):
+    """Single-call output covering every agent, used for small PRs."""
+
+    # A response in some other shape must fail loudly, not parse as "no findings".
+    model_config = ConfigDict(extra="forbid")
+
+    security: CompactReviewResult = Field(default_factory=CompactReviewResult)
+    best_practices: CompactReviewResult = Field(default_factory=CompactReviewResult)
+    test_coverage: CompactReviewResult = Field(default_factory=CompactReviewResult)
+    dependency: CompactReviewResult = Field(default_factory=CompactReviewResult)
+    pr_description: CompactReviewResult = Field(default_factory=CompactReviewResult)
+
+    def split(self, file_paths: List[str]) -> List[ReviewResult]:
+        """Return one expanded ReviewResult per agent, named after its section."""
+        return [
+            getattr(self, name).expand(name, file_paths)
+            for name in type(self).model_fields
+        ]
+
+
+def fused_response_format() -> dict:
+    """OpenAI structured-output format enforcing FusedReviewResult."""
+    sections = list(FusedReviewResult.model_fields)
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "fused_review_result",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {name: _compact_result_schema() for name in sections},
+                "required": sections,
+                "additionalProperties": False,
+            },
+        },
+    }
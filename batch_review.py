@@ -0,0 +1,136 @@
+"""Offline batch review of many PRs through the OpenAI Batch API.
+
+    python batch_review.py collect <PR_ID> [<PR_ID> ...] [--job NAME]
+    python batch_review.py submit <JOB>
+    python batch_review.py poll <JOB> [--wait] [--interval SECONDS]
+    python batch_review.py resume <JOB> [--no-post]
+
+``collect`` fetches each PR and records every reviewer prompt, ``submit``
+uploads them as one batch, ``poll`` waits for it and downloads the results,
+and ``resume`` runs synthesis and posting from those results.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import openai
+
+from config import LLM_BATCH_COMPLETION_WINDOW, LLM_BATCH_DIR
+from providers.factory import get_provider
+from agents.backends import get_backend_pool
+from agents.batch import BatchJob, collect_requests, poll, replay_responses, submit
+from agents.diffChecker import build_diff_checker_graph
+from agents.reviewer import build_review_graph
+from agents.commenter import build_commenter_graph
+
+
+def _client() -> openai.AsyncOpenAI:
+    """Batch client for the first OpenAI-compatible backend in the pool."""
+    for backend in get_backend_pool().backends:
+        if not backend.azure_deployment:
+            return openai.AsyncOpenAI(api_key=backend.api_key, base_url=backend.base_url)
+    raise ValueError("Batch mode needs at least one non-Azure backend in LLM_BACKENDS")
+
+
+def _job(name: str) -> BatchJob:
+    return BatchJob(os.path.join(LLM_BATCH_DIR, name))
+
+
+async def collect(pr_ids: list, job: BatchJob) -> None:
+    provider = get_provider()
+    job.pin_calibration()
+    try:
+        for pr_id in pr_ids:
+            print(f"[collect] PR #{pr_id}")
+            diff_out = await build_diff_checker_graph().compile().ainvoke(
+                {"pr_id": pr_id, "provider": provider}
+            )
+            job.save_pr(pr_id, diff_out["file_changes"], diff_out["pr_metadata"])
+            collector = collect_requests()
+            await build_review_graph().compile().ainvoke({
+                "pr_id": pr_id,
+                "file_changes": diff_out["file_changes"],
+                "pr_metadata": diff_out["pr_metadata"],
+            })
+            total = job.write_requests(collector.requests)
+            print(f"  {len(collector.requests)} request(s); {total} in job")
+    finally:
+        await provider.close()
+    print(f"Collected job {job.name!r} in {job.root}")
+
+
+async def resume(job: BatchJob, post: bool) -> None:
+    state = job.load_state()
+    if not os.path.exists(job.results_path):
+        raise SystemExit(f"Job {job.name!r} has no results yet (status: {state.get('status')})")
+    responses = job.load_results()
+    print(f"[resume] {len(responses)} batch result(s) for {len(state.get('prs', []))} PR(s)")
+
+    job.pin_calibration()
+    provider = get_provider() if post else None
+    try:
+        for pr_id in state.get("prs", []):
+            pr = job.load_pr(pr_id)
+            replay = replay_responses(responses)
+            review_out = await build_review_graph().compile().ainvoke({
+                "pr_id": pr_id,
+                "file_changes": pr["file_changes"],
+                "pr_metadata": pr["pr_metadata"],
+            })
+            n = len(review_out.get("review_comments", []))
+            print(f"  PR #{pr_id}: {n} finding(s), {replay.hits} from batch, {replay.misses} live")
+            if provider is None:
+                print(review_out["summary"])
+                continue
+            comment_out = await build_commenter_graph().compile().ainvoke({
+                "pr_id": pr_id,
+                "provider": provider,
+                "review_comments": review_out.get("review_comments", []),
+                "summary": review_out["summary"],
+            })
+            print(f"  PR #{pr_id}: {comment_out['status']}")
+    finally:
+        if provider is not None:
+            await provider.close()
+    job.save_state(resumed=True)
+
+
+async def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("collect", help="fetch PRs and record reviewer prompts")
+    p.add_argument("pr_ids", nargs="+", type=int)
+    p.add_argument("--job", default=time.strftime("nightly-%Y%m%d-%H%M%S"))
+    p = sub.add_parser("submit", help="upload the recorded prompts as a batch")
+    p.add_argument("job")
+    p = sub.add_parser("poll", help="check the batch and download results")
+    p.add_argument("job")
+    p.add_argument("--wait", action="store_true", help="poll until the batch finishes")
+    p.add_argument("--interval", type=float, default=60.0)
+    p = sub.add_parser("resume", help="synthesise and post reviews from the results")
+    p.add_argument("job")
+    p.add_argument("--no-post", action="store_true", help="print summaries instead of posting")
+    args = parser.parse_args(argv)
+
+    job = _job(args.job)
+    if args.command == "collect":
+        await collect(args.pr_ids, job)
+    elif args.command == "submit":
+        batch_id = await submit(job, _client(), LLM_BATCH_COMPLETION_WINDOW)
+        print(f"Submitted job {job.name!r} as batch {batch_id}")
+    elif args.command == "poll":
+        client = _client()
+        while True:
+            status = await poll(job, client)
+            print(f"Batch status: {status} {job.load_state().get('request_counts', {})}")
+            if not args.wait or status in ("completed", "failed", "expired", "cancelled"):
+                break
+            await asyncio.sleep(args.interval)
+    else:
+        await resume(job, post=not args.no_post)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Benchmark the diff engines on inputs that are slow for difflib.
+
+    python benchmarks/diff_engine.py [--scale N]   # needs the usual .env (config is imported)
+
+Times ``difflib`` vs ``histogram`` on generated lockfile, JSON fixture and
+generated-code edits, and on a normal source edit, and reports the changed
+line counts each engine finds.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.diff_engine import get_opcodes  # noqa: E402
+
+
+def _edit(lines, rng, edits):
+    out = list(lines)
+    for _ in range(edits):
+        i = rng.randrange(len(out))
+        r = rng.random()
+        if r < 0.4:
+            out[i] = out[i].replace("1", "2") + "  # changed\n" if out[i].endswith("\n") else out[i] + "!"
+        elif r < 0.7:
+            out.insert(i, f"    inserted_{rng.randrange(10**6)}\n")
+        else:
+            del out[i]
+    return out
+
+
+def lockfile(n):
+    lines = []
+    for i in range(n // 6):
+        lines += [f"  /pkg-{i}/1.{i % 7}.0:\n", "    resolution:\n", "      integrity: sha512-x\n",
+                  "    dev: false\n", "    dependencies:\n", "\n"]
+    return lines
+
+
+def json_fixture(n):
+    lines = ["[\n"]
+    for i in range(n // 5):
+        lines += ["  {\n", f'    "id": {i % 50},\n', '    "active": true,\n', '    "tags": []\n', "  },\n"]
+    return lines + ["]\n"]
+
+
+def generated_code(n):
+    lines = []
+    for i in range(n // 4):
+        lines += [f"    def get_field_{i % 200}(self):\n", "        return self._data\n", "\n", "    @property\n"]
+    return lines
+
+
+def source(n):
+    return [f"def func_{i}(x):\n" if i % 10 == 0 else f"    value_{i} = compute(x, {i})\n" for i in range(n)]
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def _changed(codes):
+    return sum((i2 - i1) + (j2 - j1) for tag, i1, i2, j1, j2 in codes if tag != "equal")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=20_000, help="lines per input")
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    print(f"{'input':<16}{'lines':>8}{'difflib s':>12}{'histogram s':>14}{'speedup':>10}{'changed d/h':>16}")
+    for name, make in [("lockfile", lockfile), ("json fixture", json_fixture),
+                       ("generated code", generated_code), ("source", source)]:
+        a = make(args.scale)
+        b = _edit(a, rng, max(10, len(a) // 500))
+        t_d, d = _time(lambda: get_opcodes(a, b, "difflib"))
+        t_h, h = _time(lambda: get_opcodes(a, b, "histogram"))
+        print(f"{name:<16}{len(a):>8}{t_d:>12.3f}{t_h:>14.3f}{t_d / max(t_h, 1e-9):>9.1f}x"
+              f"{f'{_changed(d)}/{_changed(h)}':>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Event-loop lag while a review diffs large files, inline vs in the CPU pool.
+
+    python benchmarks/loop_lag.py [--files N] [--scale LINES]   # needs the usual .env
+
+Warms a ``DiffIndex`` over generated lockfile/fixture edits with each
+``CPU_POOL`` mode while a ``LoopLagMonitor`` samples the loop, and reports
+wall time and p95/max lag.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agents.cpu_pool as cpu_pool  # noqa: E402
+from agents.diff_index import DiffIndex  # noqa: E402
+from diff_engine import _edit, generated_code, json_fixture, lockfile  # noqa: E402
+
+
+def _files(n, scale):
+    rng = random.Random(11)
+    makers = [lockfile, json_fixture, generated_code]
+    files = []
+    for i in range(n):
+        before = makers[i % len(makers)](scale)
+        after = _edit(before, rng, max(10, len(before) // 500))
+        files.append({"path": f"gen/file_{i}.txt", "before": "".join(before), "after": "".join(after)})
+    return files
+
+
+async def _run(mode, files):
+    cpu_pool.CPU_POOL = mode
+    lag = cpu_pool.LoopLagMonitor(interval=0.005).start()
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await DiffIndex().warm(files)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.02)
+    await lag.stop()
+    return elapsed, lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--scale", type=int, default=20_000, help="lines per file")
+    args = parser.parse_args()
+    files = _files(args.files, args.scale)
+
+    print(f"{'CPU_POOL':<10}{'wall s':>8}{'p95 lag ms':>12}{'max lag ms':>12}")
+    for mode in ("inline", "thread", "process"):
+        elapsed, lag = asyncio.run(_run(mode, files))
+        print(f"{mode:<10}{elapsed:>8.2f}{lag.percentile(0.95) * 1000:>12.0f}{lag.max_lag * 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
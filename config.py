@@ -20,16 +20,94 @@ def _is_set(value: Optional[str]) -> bool:
 
 # ── Platform ────────────────────────────────────────────────────────
 PLATFORM: str = os.getenv("PLATFORM", "ado")  # "ado" or "github"
+# Use the platform's per-file patch instead of downloading before/after blobs (GitHub)
+PATCH_FIRST: bool = os.getenv("PATCH_FIRST", "true").lower() in ("1", "true", "yes")
 
 # ── LLM ─────────────────────────────────────────────────────────────
 GPT_MODEL: str = os.getenv("GPT_MODEL", "gpt-4.1")
 OPENAI_API_KEY: str = _require(os.getenv("OPENAI_API_KEY"), "OPENAI_API_KEY")
 
+# ── Model routing: small model for light agents (empty SMALL_MODEL disables) ──
+SMALL_MODEL: str = os.getenv("SMALL_MODEL", "gpt-4.1-mini")
+SMALL_MODEL_MAX_TOKENS: int = int(os.getenv("SMALL_MODEL_MAX_TOKENS", "16000"))
+ESCALATION_CONFIDENCE: float = float(os.getenv("ESCALATION_CONFIDENCE", "0.7"))
+
+# ── LLM backend pool (JSON list; empty = the single key/model above) ──
+# e.g. [{"name": "east", "api_key_env": "OPENAI_KEY_EAST", "tpm": 800000},
+#       {"name": "azure", "base_url": "https://x.openai.azure.com", "api_key_env": "AZURE_KEY",
+#        "azure_deployment": "gpt-4.1", "api_version": "2024-10-21", "tpm": 450000}]
+LLM_BACKENDS: str = os.getenv("LLM_BACKENDS", "")
+
+# ── LLM quota (shared by every review in the process) ───────────────
+LLM_TPM_LIMIT: int = int(os.getenv("LLM_TPM_LIMIT", "800000"))
+LLM_RPM_LIMIT: int = int(os.getenv("LLM_RPM_LIMIT", "5000"))
+LLM_QUOTA_HEADROOM: float = float(os.getenv("LLM_QUOTA_HEADROOM", "0.9"))
+LLM_EXPECTED_OUTPUT_TOKENS: int = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1000"))
+LLM_STREAMING: bool = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# ── Request hedging (opt-in): duplicate calls slower than the percentile ──
+LLM_HEDGING: bool = os.getenv("LLM_HEDGING", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MAX_RATE: float = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))
+LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
 # ── Retry / limits ──────────────────────────────────────────────────
 MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
 RETRY_BACKOFF: float = float(os.getenv("RETRY_BACKOFF", "2.0"))
 COMMENT_SCALE_FACTOR: float = float(os.getenv("COMMENT_SCALE_FACTOR", "2.0"))
 
+# ── Fused single-call review for small PRs (0 files disables) ─────
+FUSED_REVIEW_MAX_FILES: int = int(os.getenv("FUSED_REVIEW_MAX_FILES", "5"))
+FUSED_REVIEW_MAX_LINES: int = int(os.getenv("FUSED_REVIEW_MAX_LINES", "80"))
+
+# ── Hunk context: scope = widen hunks to their enclosing function/class + file outline, diff = plain ──
+CONTEXT_MODE: str = os.getenv("CONTEXT_MODE", "scope")  # scope | diff
+CONTEXT_MAX_SCOPE_LINES: int = int(os.getenv("CONTEXT_MAX_SCOPE_LINES", "120"))
+
+# ── New files: reviewers that do not need every line see this many, plus an outline of the rest ──
+NEW_FILE_BODY_LINES: int = int(os.getenv("NEW_FILE_BODY_LINES", "300"))
+
+# ── Lockfiles: review a table of added/removed/changed packages instead of the diff ──
+LOCKFILE_DELTAS: bool = os.getenv("LOCKFILE_DELTAS", "true").lower() in ("1", "true", "yes")
+LOCKFILE_MAX_ROWS: int = int(os.getenv("LOCKFILE_MAX_ROWS", "200"))
+
+# ── Known-vulnerability index built by import_advisories.py from OSV dumps (empty disables) ──
+ADVISORY_INDEX_FILE: str = os.getenv("ADVISORY_INDEX_FILE", ".cache/advisories.json")
+
+# ── Chunk packing: packed = fewest calls, stable = content-defined boundaries that survive pushes,
+#    locality = related files (imports, tests, directories) in the same call ──
+CHUNKING_MODE: str = os.getenv("CHUNKING_MODE", "packed")  # packed | stable | locality
+
+# ── Oversized files are split into hunk windows overlapping by this many diff lines ──
+SPLIT_OVERLAP_LINES: int = int(os.getenv("SPLIT_OVERLAP_LINES", "20"))
+
+# ── Diff engine: auto = difflib up to DIFF_ENGINE_AUTO_LINES, histogram above ──
+DIFF_ENGINE: str = os.getenv("DIFF_ENGINE", "auto")  # auto | difflib | histogram
+DIFF_ENGINE_AUTO_LINES: int = int(os.getenv("DIFF_ENGINE_AUTO_LINES", "2000"))
+
+# ── Token estimator calibration (learned from reported usage; empty = in-memory only) ──
+TOKEN_CALIBRATION_FILE: str = os.getenv("TOKEN_CALIBRATION_FILE", ".cache/token_calibration.json")
+
+# ── CPU pool: diffs and prompt rendering off the event loop ──────
+CPU_POOL: str = os.getenv("CPU_POOL", "process")  # process | thread | inline
+CPU_WORKERS: int = int(os.getenv("CPU_WORKERS", "0"))  # 0 = one per CPU
+CPU_OFFLOAD_MIN_LINES: int = int(os.getenv("CPU_OFFLOAD_MIN_LINES", "500"))  # smaller diffs stay inline
+
+# ── Security pre-scan: secrets reported locally; gate = only files with secrets, sinks or
+#    security keywords go to the LLM security review, report = all files, off = no scan ──
+SECURITY_PRESCAN: str = os.getenv("SECURITY_PRESCAN", "gate")  # gate | report | off
+
+# ── Triage: skip mechanical hunks on large PRs (threshold 0 keeps all) ──
+TRIAGE_MIN_CHANGED_LINES: int = int(os.getenv("TRIAGE_MIN_CHANGED_LINES", "300"))
+TRIAGE_THRESHOLD: float = float(os.getenv("TRIAGE_THRESHOLD", "0.3"))
+
+# ── Offline batch reviews (batch_review.py) ─────────────────────────
+LLM_BATCH_DIR: str = os.getenv("LLM_BATCH_DIR", ".cache/batches")
+LLM_BATCH_COMPLETION_WINDOW: str = os.getenv("LLM_BATCH_COMPLETION_WINDOW", "24h")
+
+# ── Finding cache (empty dir disables) ──────────────────────────────
+FINDING_CACHE_DIR: str = os.getenv("FINDING_CACHE_DIR", ".cache/findings")
+
 # ── Azure DevOps (required only when PLATFORM == "ado") ─────────────
 if PLATFORM == "ado":
     ORG_URL: str = _require(os.getenv("AZURE_DEVOPS_ORG_URL"), "AZURE_DEVOPS_ORG_URL")
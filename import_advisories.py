@@ -0,0 +1,34 @@
+"""Build the offline vulnerability index from OSV dumps.
+
+    python import_advisories.py PyPI-all.zip npm-all.zip ... [--out PATH]
+
+Each argument is an OSV dump: a per-ecosystem ``all.zip`` from
+https://osv-vulnerabilities.storage.googleapis.com/, a directory of OSV
+JSON files or a single advisory. The npm, PyPI, Go, crates.io, Maven and
+RubyGems advisories among them replace the index at ``ADVISORY_INDEX_FILE``,
+which reviews then check new dependency versions against.
+"""
+
+import argparse
+
+from agents.advisories import build_index, save_index
+from config import ADVISORY_INDEX_FILE
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("dumps", nargs="+", help="OSV zip dumps, directories or JSON files")
+    parser.add_argument("--out", default=ADVISORY_INDEX_FILE, help="index file to write")
+    args = parser.parse_args(argv)
+    if not args.out:
+        parser.error("set ADVISORY_INDEX_FILE or pass --out")
+
+    index = build_index(args.dumps)
+    save_index(index, args.out)
+    for ecosystem, packages in sorted(index.items()):
+        print(f"  {ecosystem}: {sum(map(len, packages.values()))} advisories for {len(packages)} packages")
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -112,6 +112,9 @@ class ADOProvider(PRProvider):
         )
 
     async def get_file_changes(self, pr_id: int) -> List[FileChange]:
+        # No patch-first mode here: Azure DevOps has no unified-diff endpoint
+        # for PR files (its file-diff API only returns changed line ranges),
+        # so both versions are downloaded and diffed locally.
         repo_id = await self._resolve_repo_id(pr_id)
 
         # get latest iteration
@@ -15,6 +15,9 @@ class FileChange:
     before: str = ""  # empty for adds
     after: str = ""  # empty for deletes
     old_path: Optional[str] = None  # set for renames
+    # Unified-diff hunks from the platform; when set, before/after are only
+    # filled in for files reviewed whole (new files)
+    patch: Optional[str] = None
 
 
 @dataclass
@@ -7,7 +7,9 @@ from typing import List, Optional
 import aiohttp
 import certifi
 
-from config import GITHUB_TOKEN, GITHUB_OWNER, GITHUB_REPO
+from agents.context import has_outline_parser
+from agents.lockfiles import needs_both_versions
+from config import CONTEXT_MODE, GITHUB_TOKEN, GITHUB_OWNER, GITHUB_REPO, PATCH_FIRST
 from providers.base import PRProvider, PRMetadata, FileChange
 from retry import with_retry
 
@@ -141,14 +143,31 @@ class GitHubProvider(PRProvider):
             path = f.get("filename", "")
             old_path = f.get("previous_filename")
 
+            # Patch-first: GitHub omits "patch" for binary and very large
+            # diffs, which fall back to downloading both versions.
+            patch = f.get("patch") if PATCH_FIRST else None
+            if PATCH_FIRST and patch is None and f.get("changes") == 0:
+                patch = ""  # pure rename / mode change: nothing to review
+
             before = ""
             after = ""
-            if change_type in ("edit", "rename"):
+            if change_type == "add":
+                after = await self._fetch_file(path, head_ref)  # reviewed whole
+            elif patch is not None:
+                # Scope context needs the new version of edited code files
+                if patch and CONTEXT_MODE == "scope" and change_type in ("edit", "rename") and has_outline_parser(path):
+                    after = await self._fetch_file(path, head_ref)
+                # Lockfiles and pinned manifests are compared version by version
+                if patch and change_type in ("edit", "rename") and needs_both_versions(path):
+                    before = await self._fetch_file(old_path or path, base_ref)
+                    after = after or await self._fetch_file(path, head_ref)
+                # Deleted code files are shown as the definitions they removed
+                if patch and change_type == "delete" and has_outline_parser(path):
+                    before = await self._fetch_file(path, base_ref)
+            elif change_type in ("edit", "rename"):
                 fetch_path = old_path or path
                 before = await self._fetch_file(fetch_path, base_ref)
                 after = await self._fetch_file(path, head_ref)
-            elif change_type == "add":
-                after = await self._fetch_file(path, head_ref)
             elif change_type == "delete":
                 before = await self._fetch_file(path, base_ref)
 
@@ -159,6 +178,7 @@ class GitHubProvider(PRProvider):
                     before=before,
                     after=after,
                     old_path=old_path if change_type == "rename" else None,
+                    patch=patch,
                 )
             )
 
@@ -8,10 +8,20 @@ from tenacity import (
     retry_if_exception_type,
 )
 import aiohttp
+import openai
 
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "2.0"))
 
+# Rate limits (429), timeouts, connection drops and 5xx are worth retrying;
+# other API errors (bad request, auth) are not.
+LLM_TRANSIENT_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
 
 def with_retry(func):
     """Wrap an async function with exponential-backoff retry on transient errors."""
@@ -23,3 +33,13 @@ def with_retry(func):
         ),
         reraise=True,
     )(func)
+
+
+def with_llm_retry(func):
+    """Wrap an async LLM call with exponential-backoff retry on 429/5xx/timeouts."""
+    return retry(
+        stop=stop_after_attempt(MAX_RETRIES),
+        wait=wait_exponential(multiplier=RETRY_BACKOFF, min=1, max=30),
+        retry=retry_if_exception_type(LLM_TRANSIENT_ERRORS),
+        reraise=True,
+    )(func)
@@ -0,0 +1,11 @@
+"""Shared test fixtures."""
+
+import pytest
+
+import agents.tokens
+
+
+@pytest.fixture(autouse=True)
+def _fresh_token_estimator(monkeypatch):
+    """Keep token calibration in memory and per test (no calibration file writes)."""
+    monkeypatch.setattr(agents.tokens, "_estimator", agents.tokens.TokenEstimator(None))
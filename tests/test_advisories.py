@@ -0,0 +1,82 @@
+"""Tests for the offline vulnerability index."""
+
+import json
+import zipfile
+
+from agents.advisories import (
+    build_index, cvss3_base_score, get_advisory_index, maven_key, pep440_key,
+    rubygems_key, save_index, scan_advisories, semver_key,
+)
+
+
+def _ordered(key, versions):
+    return sorted(versions, key=key) == versions
+
+
+def test_version_orderings():
+    assert _ordered(semver_key, ["1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-beta", "1.0.0-rc.1", "1.0.0", "1.2.0", "v1.10.0"])
+    assert _ordered(pep440_key, ["1.0.dev1", "1.0a1", "1.0b2", "1.0rc1", "1.0", "1.0.post1", "1.1", "1!0.5"])
+    assert pep440_key("2.0") == pep440_key("2.0.0")
+    assert _ordered(maven_key, ["1.0-alpha-1", "1.0-beta", "1.0-rc1", "1.0-SNAPSHOT", "1.0", "1.0-sp1", "1.0.1", "1.10"])
+    assert maven_key("1.0") == maven_key("1") == maven_key("1.0.0-final")
+    assert _ordered(rubygems_key, ["1.0.0.pre", "1.0.0.rc1", "1.0.0", "1.0.1", "1.10"])
+    assert semver_key("latest") is None
+
+
+def test_cvss3_base_score():
+    assert cvss3_base_score("CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H") == 9.8
+    assert cvss3_base_score("CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:C/C:H/I:H/A:H") == 10.0
+    assert cvss3_base_score("CVSS:3.1/AV:N/AC:L/PR:N/UI:R/S:C/C:L/I:L/A:N") == 6.1
+    assert cvss3_base_score("CVSS:4.0/AV:N") is None
+
+
+ADVISORIES = [
+    {
+        "id": "GHSA-lodash", "aliases": ["CVE-2021-23337"], "summary": "Command injection in lodash",
+        "database_specific": {"severity": "HIGH"},
+        "affected": [{"package": {"ecosystem": "npm", "name": "lodash"},
+                      "ranges": [{"type": "SEMVER", "events": [{"introduced": "0"}, {"fixed": "4.17.21"}]}]}],
+    },
+    {
+        "id": "PYSEC-requests", "summary": "Proxy-Authorization header leak",
+        "severity": [{"type": "CVSS_V3", "score": "CVSS:3.1/AV:N/AC:H/PR:N/UI:R/S:U/C:H/I:N/A:N"}],
+        "affected": [{"package": {"ecosystem": "PyPI", "name": "Requests"},
+                      "ranges": [{"type": "ECOSYSTEM", "events": [{"introduced": "2.3.0"}, {"fixed": "2.31.0"}]}]}],
+    },
+    {"id": "OLD", "withdrawn": "2020-01-01T00:00:00Z",
+     "affected": [{"package": {"ecosystem": "npm", "name": "left-pad"}, "versions": ["1.3.0"]}]},
+]
+
+
+def _index(tmp_path):
+    dump = tmp_path / "all.zip"
+    with zipfile.ZipFile(dump, "w") as zf:
+        for osv in ADVISORIES:
+            zf.writestr(f"{osv['id']}.json", json.dumps(osv))
+    path = str(tmp_path / "advisories.json")
+    save_index(build_index([str(dump)]), path)
+    return get_advisory_index(path)
+
+
+def test_scan_reports_vulnerable_new_versions(tmp_path):
+    index = _index(tmp_path)
+    assert index.lookup("npm", "left-pad", "1.3.0") == []  # withdrawn
+    yarn_before = 'lodash@^4.17.0:\n  version "4.17.21"\n'
+    yarn_after = 'lodash@^4.17.0:\n  version "4.17.20"\n\nleft-pad@^1.0.0:\n  version "1.3.0"\n'
+    files = [
+        {"path": "web/yarn.lock", "change_type": "edit", "before": yarn_before, "after": yarn_after},
+        {"path": "requirements.txt", "change_type": "edit", "before": "flask==2.0.0\n",
+         "after": "flask==2.0.0\nrequests[socks]==2.28.1  # http\n"},
+        {"path": "src/app.py", "change_type": "edit", "before": "a\n", "after": "b\n"},
+    ]
+    result = scan_advisories(files, index)
+    assert result.summary == "2 of 3 new dependency version(s) have known vulnerabilities."
+    lodash, requests = result.comments
+    assert (lodash.file_path, lodash.line_number, lodash.severity) == ("web/yarn.lock", 1, "critical")
+    assert "GHSA-lodash (CVE-2021-23337): Command injection" in lodash.comment
+    assert lodash.suggestion == "Upgrade lodash to 4.17.21 or later."
+    # CVSS 5.7 → moderate → major
+    assert (requests.file_path, requests.line_number, requests.severity) == ("requirements.txt", 2, "major")
+
+    assert scan_advisories(files[2:], index) is None
+    assert get_advisory_index(str(tmp_path / "missing.json")) is None
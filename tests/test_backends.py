@@ -0,0 +1,144 @@
+"""Tests for the LLM backend pool, against local stub endpoints."""
+
+import json
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain_core.messages import HumanMessage, SystemMessage
+
+import agents.backends as backends
+from agents.backends import Backend, BackendPool, load_backends
+from agents.llm import invoke_llm
+
+
+def _stub_app(status=200, content='{"findings": [], "summary": "ok"}'):
+    """OpenAI-compatible chat completions endpoint (streaming and plain)."""
+    hits = []
+
+    async def completions(request):
+        body = await request.json()
+        hits.append(body)
+        if status != 200:
+            return web.json_response(
+                {"error": {"message": "stub error", "type": "stub"}},
+                status=status,
+                headers={"retry-after": "30"},
+            )
+        if not body.get("stream"):
+            return web.json_response({
+                "id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            })
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        base = {"id": "x", "object": "chat.completion.chunk", "created": 0, "model": body["model"]}
+        for i in range(0, len(content), 8):
+            chunk = dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + 8]},
+                                         "finish_reason": None}])
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        usage = dict(base, choices=[], usage={"prompt_tokens": 10, "completion_tokens": 5,
+                                              "total_tokens": 15})
+        await resp.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode())
+        return resp
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app, hits
+
+
+@pytest.fixture
+async def stub_servers():
+    servers = []
+
+    async def start(**kwargs):
+        app, hits = _stub_app(**kwargs)
+        server = TestServer(app)
+        await server.start_server()
+        servers.append(server)
+        return str(server.make_url("/v1")), hits
+
+    yield start
+    for server in servers:
+        await server.close()
+
+
+def _messages():
+    return [SystemMessage(content="system"), HumanMessage(content="review")]
+
+
+class TestLoadBackends:
+    def test_default_single_backend(self):
+        pool = load_backends("")
+        assert [b.name for b in pool] == ["default"]
+
+    def test_parses_entries_and_key_env(self, monkeypatch):
+        monkeypatch.setenv("EAST_KEY", "sk-east")
+        pool = load_backends(json.dumps([
+            {"name": "east", "api_key_env": "EAST_KEY", "tpm": 1000},
+            {"name": "azure", "base_url": "https://x.openai.azure.com",
+             "azure_deployment": "gpt-4.1", "api_version": "2024-10-21"},
+        ]))
+        assert pool[0].api_key == "sk-east" and pool[0].tpm == 1000
+        assert pool[1].azure_deployment == "gpt-4.1"
+
+    def test_rejects_bad_spec(self):
+        with pytest.raises(ValueError):
+            load_backends("{not json")
+        with pytest.raises(ValueError):
+            load_backends('[{"name": "x", "region": "eu"}]')
+        with pytest.raises(ValueError):
+            load_backends('[{"name": "x", "azure_deployment": "d"}]')
+
+
+class TestRouting:
+    def test_least_outstanding_tokens_relative_to_quota(self):
+        small = Backend(name="small", api_key="k", tpm=1000)
+        big = Backend(name="big", api_key="k", tpm=10_000)
+        pool = BackendPool([small, big])
+        pool.begin(big, 5000)
+        pool.begin(small, 100)
+        assert pool.pick().name == "small"  # 10% vs 50% of quota in flight
+        pool.begin(small, 500)
+        assert pool.pick().name == "big"
+
+    def test_unhealthy_backend_is_skipped_until_cooldown(self):
+        now = [0.0]
+        a, b = Backend(name="a", api_key="k"), Backend(name="b", api_key="k")
+        pool = BackendPool([a, b], clock=lambda: now[0])
+        pool.mark_failure(a, RuntimeError("503"))
+        assert pool.pick().name == "b"
+        assert pool.pick(exclude=["b"]).name == "a"  # soonest to recover
+        now[0] = 5.0
+        assert pool.healthy(a)
+
+
+class TestFailover:
+    @pytest.mark.asyncio
+    async def test_fails_over_on_429_and_5xx(self, stub_servers, monkeypatch):
+        limited_url, limited_hits = await stub_servers(status=429)
+        broken_url, broken_hits = await stub_servers(status=503)
+        good_url, good_hits = await stub_servers()
+        pool = BackendPool([
+            Backend(name="limited", api_key="k", base_url=limited_url),
+            Backend(name="broken", api_key="k", base_url=broken_url),
+            Backend(name="good", api_key="k", base_url=good_url, tpm=1),
+        ])
+        monkeypatch.setattr(backends, "_pool", pool)
+
+        resp = await invoke_llm(_messages(), agent_name="security", file_paths=[])
+
+        assert json.loads(resp.content)["summary"] == "ok"
+        assert len(limited_hits) == len(broken_hits) == len(good_hits) == 1
+        assert not pool.healthy(pool.backends[0]) and not pool.healthy(pool.backends[1])
+        assert all(b.outstanding == 0 for b in pool.backends)
+
+    @pytest.mark.asyncio
+    async def test_backend_model_override(self, stub_servers, monkeypatch):
+        url, hits = await stub_servers()
+        monkeypatch.setattr(
+            backends, "_pool", BackendPool([Backend(name="a", api_key="k", base_url=url, model="m-1")])
+        )
+        await invoke_llm(_messages(), agent_name="security", file_paths=[])
+        assert hits[0]["model"] == "m-1"
@@ -0,0 +1,172 @@
+"""Tests for offline batch mode, against a local stand-in for the Batch API."""
+
+import json
+import pytest
+import openai
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import agents.llm as llm
+import agents.reviewer as reviewer
+import agents.tokens as tokens
+from agents.batch import (
+    BatchJob,
+    collect_requests,
+    parse_output,
+    placeholder_response,
+    poll,
+    replay_responses,
+    submit,
+)
+from agents.tokens import TokenEstimator, get_token_estimator
+from agents.types import FusedReviewResult, fused_response_format
+
+FINDING = {"f": 0, "l": 2, "s": 0, "c": 0, "m": "SQL injection", "x": None, "p": 0.9}
+
+
+def _answer(body: dict) -> str:
+    """Canned model output for a request, shaped by its response format."""
+    if body["response_format"]["json_schema"]["name"] == "fused_review_result":
+        empty = {"findings": [], "summary": "ok"}
+        sections = {name: empty for name in FusedReviewResult.model_fields}
+        sections["security"] = {"findings": [FINDING], "summary": "1 issue"}
+        return json.dumps(sections)
+    return json.dumps({"findings": [FINDING], "summary": "1 issue"})
+
+
+def _batch_api():
+    """Files + Batches endpoints; a batch completes on its second retrieval."""
+    files, batches = {}, {}
+
+    async def create_file(request):
+        form = await request.post()
+        data = form["file"].file.read().decode()
+        fid = f"file-{len(files)}"
+        files[fid] = data
+        return web.json_response({
+            "id": fid, "object": "file", "bytes": len(data), "created_at": 0,
+            "filename": "requests.jsonl", "purpose": "batch", "status": "processed",
+        })
+
+    def batch_obj(b):
+        return {k: v for k, v in b.items() if not k.startswith("_")}
+
+    async def create_batch(request):
+        body = await request.json()
+        bid = f"batch-{len(batches)}"
+        batches[bid] = {
+            "id": bid, "object": "batch", "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"], "completion_window": "24h",
+            "status": "validating", "created_at": 0, "_polls": 0,
+        }
+        return web.json_response(batch_obj(batches[bid]))
+
+    async def get_batch(request):
+        b = batches[request.match_info["id"]]
+        b["_polls"] += 1
+        if b["_polls"] < 2:
+            b["status"] = "in_progress"
+        else:
+            lines = []
+            for line in files[b["input_file_id"]].splitlines():
+                req = json.loads(line)
+                completion = {
+                    "id": "c", "object": "chat.completion", "created": 0, "model": "m",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": _answer(req["body"])}}],
+                    "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+                }
+                lines.append(json.dumps({
+                    "id": "r", "custom_id": req["custom_id"],
+                    "response": {"status_code": 200, "request_id": "q", "body": completion},
+                    "error": None,
+                }))
+            out = f"file-{len(files)}"
+            files[out] = "\n".join(lines) + "\n"
+            n = len(lines)
+            b.update(status="completed", output_file_id=out,
+                     request_counts={"total": n, "completed": n, "failed": 0})
+        return web.json_response(batch_obj(b))
+
+    async def file_content(request):
+        return web.Response(text=files[request.match_info["id"]])
+
+    app = web.Application()
+    app.router.add_post("/v1/files", create_file)
+    app.router.add_post("/v1/batches", create_batch)
+    app.router.add_get("/v1/batches/{id}", get_batch)
+    app.router.add_get("/v1/files/{id}/content", file_content)
+    return app
+
+
+PR = {
+    "file_changes": [
+        {"path": "api/db.py", "change_type": "edit", "old_path": None,
+         "before": "def q(id):\n    pass\n", "after": "def q(id):\n    run(f'... {id}')\n"},
+    ],
+    "pr_metadata": {"title": "Query by id", "description": "Adds a lookup used by the API."},
+}
+
+
+class TestBatchHelpers:
+    def test_placeholder_matches_schema(self):
+        body = {"response_format": fused_response_format()}
+        FusedReviewResult.model_validate_json(placeholder_response(body))
+
+    def test_parse_output_skips_failed_lines(self):
+        text = "\n".join([
+            json.dumps({"custom_id": "a", "response": {"status_code": 200, "body": {"x": 1}}}),
+            json.dumps({"custom_id": "b", "response": {"status_code": 500, "body": {}}}),
+            json.dumps({"custom_id": "c", "response": None, "error": {"code": "x"}}),
+        ])
+        assert parse_output(text) == {"a": {"x": 1}}
+
+
+class TestBatchRoundTrip:
+    @pytest.mark.asyncio
+    async def test_collect_submit_poll_resume(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(reviewer, "FINDING_CACHE_DIR", str(tmp_path / "cache"))
+
+        async def no_live_calls(*args, **kwargs):
+            raise AssertionError("batch mode made a live LLM call")
+
+        monkeypatch.setattr(llm, "_routed_call", no_live_calls)
+        job = BatchJob(str(tmp_path / "job"))
+
+        # collect
+        get_token_estimator().observe(100, 120)
+        job.pin_calibration()
+        job.save_pr(7, PR["file_changes"], PR["pr_metadata"])
+        collector = collect_requests()
+        await reviewer.run_all_reviewers(dict(PR))
+        assert job.write_requests(collector.requests) == len(collector.requests) >= 1
+        assert not (tmp_path / "cache").exists()  # placeholders are never cached
+
+        # submit + poll
+        server = TestServer(_batch_api())
+        await server.start_server()
+        try:
+            client = openai.AsyncOpenAI(api_key="k", base_url=str(server.make_url("/v1")))
+            assert (await submit(job, client)).startswith("batch-")
+            assert await poll(job, client) == "in_progress"
+            assert await poll(job, client) == "completed"
+        finally:
+            await server.close()
+        assert job.load_state()["request_counts"]["completed"] == len(collector.requests)
+
+        # resume, in a process whose calibration has moved on since collect
+        drifted = TokenEstimator(None)
+        drifted.observe(100, 190)
+        monkeypatch.setattr(tokens, "_estimator", drifted)
+        job.pin_calibration()
+        assert drifted.scale() == pytest.approx(1.2)
+        drifted.observe(100, 190)
+        assert drifted.scale() == pytest.approx(1.2)  # live fallbacks do not move it
+        pr = job.load_pr(7)
+        replay = replay_responses(job.load_results())
+        out = await reviewer.run_all_reviewers(pr)
+        assert replay.misses == 0 and replay.hits >= 1
+        assert any(
+            c["comment"] == "SQL injection" and c["file_path"] == "api/db.py"
+            for c in out["review_comments"]
+        )
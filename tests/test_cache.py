@@ -0,0 +1,80 @@
+"""Tests for the per-file finding cache."""
+
+import pytest
+from agents.cache import FindingCache
+from agents.types import ReviewResult, ReviewComment
+
+
+def _fc(path, before="old\n", after="new\n"):
+    return {"path": path, "change_type": "edit", "before": before, "after": after}
+
+
+def _comment(path, line=1, comment="issue"):
+    return ReviewComment(file_path=path, line_number=line, comment=comment)
+
+
+class TestFindingCache:
+    def test_miss_then_hit(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        files = [_fc("a.py"), _fc("b.py")]
+        missing, cached = cache.split("security", "prompt", files)
+        assert missing == files and cached == []
+
+        result = ReviewResult(agent_name="security", comments=[_comment("a.py")])
+        cache.store("security", "prompt", files, result)
+
+        missing, cached = cache.split("security", "prompt", files)
+        assert missing == []
+        assert [c.file_path for c in cached] == ["a.py"]
+
+    def test_content_change_invalidates_only_that_file(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        files = [_fc("a.py"), _fc("b.py")]
+        cache.store("security", "prompt", files, ReviewResult(agent_name="security"))
+
+        edited = [_fc("a.py", after="newer\n"), _fc("b.py")]
+        missing, _ = cache.split("security", "prompt", edited)
+        assert [fc["path"] for fc in missing] == ["a.py"]
+
+    def test_prompt_and_agent_are_part_of_key(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        files = [_fc("a.py")]
+        cache.store("security", "v1", files, ReviewResult(agent_name="security"))
+        assert cache.split("security", "v2", files)[0] == files
+        assert cache.split("dependency", "v1", files)[0] == files
+
+    def test_filtered_copies_are_keyed_on_their_diff(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        full = _fc("a.py")
+        trimmed = {**full, "diff": "--- a/a.py\n+++ b/a.py\n@@ -1 +1 @@\n-old\n+new\n"}
+        cache.store("security", "prompt", [trimmed], ReviewResult(agent_name="security"))
+        assert cache.split("security", "prompt", [full])[0] == [full]
+        assert cache.split("security", "prompt", [trimmed])[0] == []
+
+    def test_failed_results_are_not_cached(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        files = [_fc("a.py")]
+        cache.store("security", "p", files, ReviewResult(agent_name="security", error="Parse error"))
+        assert cache.split("security", "p", files)[0] == files
+
+    def test_excluded_comments_are_not_cached(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        files = [_fc("a.py")]
+        static = _comment("a.py", comment="static")
+        result = ReviewResult(comments=[static, _comment("a.py", comment="llm")])
+        cache.store("test_coverage", "p", files, result, exclude=[static])
+        _, cached = cache.split("test_coverage", "p", files)
+        assert [c.comment for c in cached] == ["llm"]
+
+    def test_leading_slash_paths_match(self, tmp_path):
+        cache = FindingCache(str(tmp_path))
+        files = [_fc("/src/a.py")]
+        cache.store("security", "p", files, ReviewResult(comments=[_comment("src/a.py")]))
+        _, cached = cache.split("security", "p", files)
+        assert len(cached) == 1
+
+    def test_disabled_cache(self):
+        cache = FindingCache("")
+        files = [_fc("a.py")]
+        cache.store("security", "p", files, ReviewResult())
+        assert cache.split("security", "p", files)[0] == files
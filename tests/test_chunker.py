@@ -1,12 +1,24 @@
 """Tests for the token-aware chunker."""
 
+import re
+
 import pytest
-from agents.chunker import estimate_tokens, chunk_file_changes, MAX_CHUNK_TOKENS
+from agents.chunker import (
+    MAX_CHUNK_TOKENS, PackingReport, chunk_file_changes, estimate_tokens, plan_chunks,
+    _sized_items, remap_part_findings, rendered_tokens, split_file,
+)
+from agents.types import ReviewComment, ReviewResult
+from utils import file_diff
 
 
 def test_estimate_tokens():
     assert estimate_tokens("") == 0
-    assert estimate_tokens("a" * 400) == 100
+    assert estimate_tokens("hello world") == 2
+    assert 90 <= estimate_tokens("a" * 400) <= 110
+    dense = "x={a:[1,2],b:(c||d)&&!e};" * 20
+    assert estimate_tokens(dense) > len(dense) // 4  # symbol-dense code
+    indented = "".join(f"{' ' * 16}pass\n" for _ in range(50))
+    assert estimate_tokens(indented, "a.py") < len(indented) // 4
 
 
 def test_single_small_file():
@@ -50,3 +62,116 @@ def test_sorted_by_path():
     chunks = chunk_file_changes(files)
     paths = [f["path"] for f in chunks[0]]
     assert paths == ["a.py", "b.py", "c.py"]
+
+
+def test_sized_by_diff_not_whole_file():
+    body = "".join(f"line_{i} = {i}\n" for i in range(5000))
+    files = [
+        {"path": f"big{i}.py", "change_type": "edit", "before": body, "after": body.replace("line_7 ", "line_seven ")}
+        for i in range(10)
+    ]
+    assert len(chunk_file_changes(files, budget=2_000)) == 1
+
+
+def test_first_fit_decreasing_uses_fewest_chunks():
+    def fc(path, n):
+        return {"path": path, "change_type": "add", "after": "word " * n}
+
+    # Path-order greedy needs 3 chunks here; FFD pairs 6+4 and 5+5.
+    files = [fc("a.py", 600), fc("b.py", 500), fc("c.py", 500), fc("d.py", 400)]
+    plan = plan_chunks(files, budget=1_050)
+    assert len(plan.chunks) == plan.lower_bound == 2
+    for chunk in plan.chunks:
+        assert [f["path"] for f in chunk] == sorted(f["path"] for f in chunk)
+    assert plan.efficiency > 0.9
+
+    report = PackingReport()
+    report.add("security", plan)
+    assert "2 call(s) for 4 file section(s)" in report.render()
+    single = PackingReport()
+    single.add("security", plan_chunks(files[:1]))
+    assert single.render() == PackingReport().render() == ""
+
+
+def _hunk_new_lines(diff):
+    """New-side line numbers each hunk of ``diff`` claims, checked against its body."""
+    numbers = []
+    for m in re.finditer(r"@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@\n((?:[ +-].*\n)*)", diff):
+        body = m.group(3).splitlines()
+        new = [l for l in body if l[:1] in " +"]
+        assert len(new) == int(m.group(2) or 1)
+        numbers.extend(range(int(m.group(1)), int(m.group(1)) + len(new)))
+    return numbers
+
+
+def test_oversized_file_split_into_overlapping_parts():
+    before = "".join(f"value_{i} = compute({i})\n" for i in range(3000))
+    after = "".join(
+        f"value_{i} = compute_fast({i})\n" if i % 5 == 0 else f"value_{i} = compute({i})\n"
+        for i in range(3000)
+    )
+    fc = {"path": "big.py", "change_type": "edit", "before": before, "after": after}
+    budget = 6_000
+    assert rendered_tokens(fc) > 3 * budget
+
+    parts = split_file(fc, budget, overlap=10)
+    assert len(parts) > 3
+    assert [p["part"] for p in parts] == [(k, len(parts)) for k in range(1, len(parts) + 1)]
+    covered = set()
+    for prev, part in zip([None] + parts, parts):
+        assert rendered_tokens(part) <= budget
+        lines = _hunk_new_lines(file_diff(part))
+        if prev is not None:
+            assert min(lines) < part["owned_from"]  # leading overlap for context
+        covered.update(lines)
+    assert covered == set(range(1, 3000))  # one hunk; the last line is past its context
+
+    plan = plan_chunks([fc, {"path": "small.py", "change_type": "add", "after": "x = 1\n"}], budget)
+    for chunk in plan.chunks:
+        assert len({f["path"] for f in chunk}) == len(chunk)
+    assert sum(1 for c in plan.chunks for f in c if f["path"] == "big.py") == len(parts)
+
+    # Parts are sized against the agent's own prompt policy
+    items = _sized_items([fc], budget, agent="security")
+    assert all(tokens == rendered_tokens(p, None, "security") <= budget for tokens, p in items)
+    assert items[0][0] > rendered_tokens(items[0][1])  # security headers carry the change type
+
+
+def test_split_new_file_findings_remapped():
+    after = "".join(f"setting_{i} = load_setting('{i}')\n" for i in range(2000))
+    fc = {"path": "settings.py", "change_type": "add", "before": "", "after": after}
+    parts = split_file(fc, 4_000, overlap=5)
+    assert len(parts) > 1
+    second = parts[1]
+    assert second["after"].startswith(f"setting_{second['line_offset']} =")
+
+    def finding(line):
+        return ReviewComment(
+            file_path="settings.py", line_number=line, severity="minor",
+            category="best-practice", comment="c",
+        )
+
+    # Line 1 of the window is in the overlap, which the first part already covered
+    result = ReviewResult(agent_name="best_practices", comments=[finding(1), finding(10)])
+    result = remap_part_findings(result, [second], content_offsets=True)
+    assert [c.line_number for c in result.comments] == [second["line_offset"] + 10]
+
+
+def test_stable_chunks_survive_a_follow_up_push():
+    def fc(path, n):
+        return {"path": path, "change_type": "add", "after": f"# {path}\n" + "item = value\n" * n}
+
+    def signatures(files):
+        return {tuple((f["path"], f["after"]) for f in chunk) for chunk in plan_chunks(files, 4_000, mode="stable").chunks}
+
+    files = [fc(f"src/mod_{i:02d}.py", 40) for i in range(60)]
+    first = signatures(files)
+    assert len(first) > 3
+
+    pushed = [fc(p["path"], 45) if p["path"] == "src/mod_31.py" else p for p in files]
+    pushed.append(fc("src/mod_07a.py", 40))
+    second = signatures(pushed)
+    assert len(second - first) <= 2  # only the chunks holding the edited and the new file
+    assert len(first - second) <= 2
+    with pytest.raises(ValueError):
+        plan_chunks(files, mode="alphabetical")
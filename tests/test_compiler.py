@@ -0,0 +1,73 @@
+"""Tests for the per-change-type prompt compiler."""
+
+from agents.compiler import compile_prompt, track_trims
+from agents.tokens import get_token_estimator
+
+MODULE = "".join(f"def func_{i}(x):\n    return x + {i}\n\n\n" for i in range(200))
+
+
+def test_change_type_policies():
+    report = track_trims()
+    files = [
+        {"path": "old/name.py", "change_type": "rename", "old_path": "name.py", "before": "x = 1\n", "after": "x = 1\n"},
+        {"path": "fmt.js", "change_type": "edit", "before": "function f() {\n  return 1;\n}\n", "after": "function f() {\n    return 1;\n}\n"},
+        {"path": "gone.py", "change_type": "delete", "before": MODULE, "after": ""},
+        {"path": "big.py", "change_type": "add", "before": "", "after": MODULE},
+    ]
+    compiled = compile_prompt("best_practices", files)
+
+    assert compiled.paths == ["fmt.js", "gone.py", "big.py"]  # pure rename omitted
+    assert "=== [0] fmt.js (whitespace-only) ===\n(only whitespace" in compiled.text
+    assert "=== [1] gone.py (DELETED) ===\nRemoved definitions" in compiled.text
+    assert "-    return x + 7" not in compiled.text
+    assert "=== [2] big.py (NEW FILE, first 300 of 801 lines) ===" in compiled.text
+    assert "return x + 75\n" not in compiled.text and "301-302: def func_75(x):" in compiled.text
+    assert "best_practices: 1 deleted file(s) as symbol list" in report.render()
+    assert "1 pure rename(s) omitted" in report.render()
+
+
+def test_reindents_keep_their_diff_where_indentation_is_syntax():
+    before = "def f(user):\n    if user.admin:\n        grant(user)\n    audit(user)\n"
+    after = "def f(user):\n    if user.admin:\n        grant(user)\n        audit(user)\n"
+    for path in ("app/perm.py", "deploy/app.yaml"):
+        fc = {"path": path, "change_type": "edit", "before": before, "after": after}
+        text = compile_prompt("security", [fc]).text
+        assert "whitespace-only" not in text and "+        audit(user)" in text
+
+
+def test_whitespace_inside_string_literals_is_not_collapsed():
+    fc = {
+        "path": "scripts/clean.js", "change_type": "edit",
+        "before": 'run("rm -rf /tmp/build");\n', "after": 'run("rm -rf / tmp/build");\n',
+    }
+    for agent in ("security", "best_practices"):
+        text = compile_prompt(agent, [fc]).text
+        assert "whitespace-only" not in text and '+run("rm -rf / tmp/build");' in text
+
+
+def test_test_coverage_sees_outlines_of_sources_but_whole_tests():
+    files = [
+        {"path": "src/mod.py", "change_type": "add", "after": MODULE},
+        {"path": "tests/test_mod.py", "change_type": "add", "after": "def test_one():\n    assert True\n"},
+    ]
+    text = compile_prompt("test_coverage", files).text
+    assert "(NEW FILE, outline)" in text and "return x + 1\n" not in text
+    assert "    assert True" in text
+
+
+def test_budget_degrades_largest_sections_first():
+    report = track_trims()
+    after = MODULE.replace("return x + 150", "return x - 150")
+    files = [
+        {"path": "a.py", "change_type": "edit", "before": MODULE, "after": after},
+        {"path": "b.py", "change_type": "add", "after": MODULE},
+    ]
+    full = compile_prompt("security", files).text
+    budget = 600
+    compiled = compile_prompt("security", files, budget=budget)
+    estimator = get_token_estimator()
+    assert estimator.estimate(compiled.text) < estimator.estimate(full)
+    assert estimator.estimate(compiled.text) <= budget * 1.1
+    assert "b.py (reduced to outline)" in report.render()
+    assert compiled.paths == ["a.py", "b.py"]
+    assert "-    return x + 150" in compiled.text
@@ -0,0 +1,84 @@
+"""Tests for enclosing-scope hunk context."""
+
+from agents.context import brace_scopes, new_file_outline, python_scopes, scoped_diff
+from utils import make_diff
+
+BEFORE = '''import os
+
+
+class Store:
+    """Keeps things."""
+
+    def __init__(self, path):
+        self.path = path
+        self.items = {}
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+        value = self.items[key]
+        value = value.strip()
+        value = value.lower()
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+
+
+def helper(x):
+    return x * 2
+'''
+
+
+def test_python_hunk_widened_to_enclosing_function():
+    after = BEFORE.replace("        return value\n", "        return value or None\n")
+    fc = {"path": "store.py", "change_type": "edit", "before": BEFORE, "after": after}
+    scoped = scoped_diff(fc)
+
+    assert " class Store:" in scoped  # enclosing class signature
+    assert "     def get(self, key):" in scoped  # whole enclosing method
+    assert "         if key not in self.items:" in scoped
+    assert "-        return value\n+        return value or None" in scoped
+    assert "7-9: def __init__(self, path):" in scoped  # outline of the rest
+    assert "23-24: def helper(x):" in scoped
+    assert "self.path = path" not in scoped
+
+
+def test_plain_diff_kept_without_a_parser_or_new_content():
+    fc = {"path": "notes.md", "change_type": "edit", "before": "a\nb\n", "after": "a\nc\n"}
+    assert scoped_diff(fc) == make_diff(fc["before"], fc["after"], "notes.md")
+    patch_only = {"path": "store.py", "change_type": "edit", "before": "", "after": "",
+                  "patch": "@@ -1,2 +1,2 @@\n a\n-b\n+c"}
+    assert scoped_diff(patch_only).endswith("+c")
+
+
+def test_patch_with_new_content_is_scoped():
+    after = BEFORE.replace("    return x * 2\n", "    return x * 3\n")
+    patch = "@@ -22,3 +22,3 @@ class Store:\n \n def helper(x):\n-    return x * 2\n+    return x * 3\n"
+    fc = {"path": "store.py", "change_type": "edit", "before": "", "after": after, "patch": patch}
+    scoped = scoped_diff(fc)
+    assert "@@ -21,4 +21,4 @@\n \n \n def helper(x):\n" in scoped and "Outline" in scoped
+    assert "\n4-20: class Store:" in scoped
+
+
+def test_brace_scopes_and_python_scopes():
+    ts = (
+        "export class Foo {\n"
+        "  render() {\n"
+        "    if (this.x) {\n"
+        "      return '}';\n"
+        "    }\n"
+        "  }\n"
+        "}\n"
+        "\n"
+        "export const useThing = (a: string) => {\n"
+        "  return a;\n"
+        "};\n"
+    )
+    assert [(s.start, s.end, s.depth) for s in brace_scopes(ts)] == [(1, 7, 0), (2, 6, 1), (9, 11, 0)]
+    assert [(s.start, s.end, s.depth) for s in python_scopes(BEFORE)] == [
+        (4, 20, 0), (7, 9, 1), (11, 17, 1), (19, 20, 1), (23, 24, 0),
+    ]
+    assert python_scopes("def broken(:\n") == []
+    outline = new_file_outline({"path": "store.py", "change_type": "add", "after": BEFORE})
+    assert outline.splitlines()[1:3] == ["4-20: class Store:", "  7-9: def __init__(self, path):"]
@@ -0,0 +1,37 @@
+"""Tests for off-loop CPU work and the event-loop lag monitor."""
+
+import asyncio
+import time
+
+from agents.cpu_pool import LoopLagMonitor, run_blocking, run_cpu
+from agents.diff_index import DiffIndex
+from utils import make_diff
+
+
+async def test_warm_diffs_large_files_in_the_pool():
+    files = [
+        {"path": f"f{i}.py", "before": "".join(f"l{j}\n" for j in range(50)),
+         "after": "".join(f"l{j}\n" for j in range(50) if j != i)}
+        for i in range(3)
+    ]
+    index = DiffIndex()
+    await index.warm(files, min_lines=0)
+    assert index.computed == 3
+    for fc in files:
+        assert index.diff(fc) == make_diff(fc["before"], fc["after"], fc["path"])
+    assert index.computed == 3  # served from the warmed index
+
+
+async def test_run_helpers_return_results():
+    assert await run_cpu(pow, 2, 10) == 1024
+    assert await run_blocking(lambda: "rendered") == "rendered"
+
+
+async def test_monitor_sees_a_blocked_loop():
+    lag = LoopLagMonitor(interval=0.005).start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # blocks the loop
+    await asyncio.sleep(0.02)
+    await lag.stop()
+    assert lag.max_lag >= 0.08
+    assert "Event-loop lag" in lag.render()
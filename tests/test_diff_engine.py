@@ -0,0 +1,73 @@
+"""Tests for the pluggable diff engine."""
+
+import difflib
+import random
+
+from agents.diff_engine import _intern, blocks_to_opcodes, get_opcodes, myers_blocks
+from utils import count_changed_lines, make_diff
+
+
+def _lcs(a, b):
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = 0
+        for j, y in enumerate(b):
+            prev, row[j + 1] = row[j + 1], prev + 1 if x == y else max(row[j + 1], row[j])
+    return row[-1]
+
+
+def _apply(codes, a, b):
+    """Check the opcodes cover both sides and that "equal" runs really are equal."""
+    i = j = 0
+    for tag, i1, i2, j1, j2 in codes:
+        assert (i1, j1) == (i, j)
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+
+
+def _pairs(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        a = [rng.choice("abcd") for _ in range(rng.randint(0, 25))]
+        b = list(a)
+        for _ in range(rng.randint(0, 6)):
+            if b and rng.random() < 0.5:
+                b.pop(rng.randrange(len(b)))
+            else:
+                b.insert(rng.randint(0, len(b)), rng.choice("abcz"))
+        yield a, b
+
+
+def test_myers_is_minimal():
+    for a, b in _pairs(300):
+        a_ids, b_ids = _intern(a, b)
+        blocks = []
+        assert myers_blocks(a_ids, b_ids, 0, len(a), 0, len(b), blocks)
+        _apply(blocks_to_opcodes(blocks, len(a), len(b)), a, b)
+        assert sum(size for _, _, size in blocks) == _lcs(a, b)
+
+
+def test_histogram_is_a_valid_edit_script():
+    for a, b in _pairs(300, seed=1):
+        _apply(get_opcodes(a, b, "histogram"), a, b)
+
+
+def test_auto_keeps_difflib_output_for_normal_files():
+    for a, b in _pairs(100, seed=2):
+        before, after = "\n".join(a) + "\n", "\n".join(b)
+        expected = "".join(difflib.unified_diff(
+            before.splitlines(keepends=True), after.splitlines(keepends=True),
+            fromfile="a/f.py", tofile="b/f.py", lineterm="",
+        ))
+        assert make_diff(before, after, "f.py") == expected
+
+
+def test_histogram_on_large_repetitive_file():
+    records = "".join(f'  {{\n    "id": {i % 50},\n    "ok": true\n  }},\n' for i in range(2000))
+    edited = records.replace('"id": 7,\n    "ok": true', '"id": 7,\n    "ok": false', 1)
+    fc = {"path": "fixture.json", "before": records, "after": edited}
+    assert count_changed_lines([fc]) == 2
+    diff = make_diff(records, edited, "fixture.json")
+    assert diff.count("\n-") == 1 and diff.count("\n+") == 1
@@ -0,0 +1,51 @@
+"""Tests for the per-review DiffIndex."""
+
+from agents.diff_index import DiffIndex, compute_file_diff, parse_patch
+from agents.triage import split_hunks
+from utils import count_changed_lines, file_diff, make_diff
+
+BEFORE = "".join(f"line {i}\n" for i in range(1, 31))
+AFTER = BEFORE.replace("line 2\n", "line two\n").replace("line 25\n", "line 25\nextra\n")
+
+
+def test_diff_matches_make_diff():
+    for before, after in [(BEFORE, AFTER), ("", "new\n"), ("gone\n", ""), ("a\nb", "a\nc"), ("x\n", "x\n")]:
+        assert compute_file_diff(before, after, "f.py").text == make_diff(before, after, "f.py")
+
+
+def test_hunks_counts_and_line_map():
+    fd = compute_file_diff(BEFORE, AFTER, "f.py")
+    assert fd.header + "".join(fd.hunks) == make_diff(BEFORE, AFTER, "f.py")
+    assert fd.hunks == split_hunks(fd.text)[1]
+    assert (fd.added, fd.removed) == (2, 1)
+    assert fd.is_added(2) and fd.old_line(2) is None
+    assert fd.old_line(1) == 1
+    assert fd.is_added(26)
+    assert fd.old_line(27) == 26
+
+
+def test_index_computes_each_file_once():
+    fc = {"path": "f.py", "before": BEFORE, "after": AFTER}
+    index = DiffIndex()
+    for _ in range(5):
+        assert file_diff(fc, index) == make_diff(BEFORE, AFTER, "f.py")
+    assert index.changed_lines([fc]) == count_changed_lines([fc]) == 3
+    assert index.computed == 1
+
+
+def test_precomputed_diff_wins():
+    fc = {"path": "f.py", "before": BEFORE, "after": AFTER, "diff": "kept hunks"}
+    assert file_diff(fc, DiffIndex()) == "kept hunks"
+
+
+def test_platform_patch_is_parsed_not_rediffed():
+    patch = "@@ -1,3 +1,3 @@ def f():\n a\n-b\n+B\n c\n@@ -10,2 +10,3 @@\n x\n+y\n z"
+    fd = parse_patch(patch, "f.py")
+    assert (fd.added, fd.removed) == (2, 1)
+    assert fd.is_added(2) and fd.old_line(3) == 3
+    assert fd.old_line(9) == 9 and fd.is_added(11) and fd.old_line(12) == 11
+
+    fc = {"path": "f.py", "before": "", "after": "", "patch": patch}
+    index = DiffIndex()
+    assert file_diff(fc, index) == file_diff(fc) == "--- a/f.py+++ b/f.py" + patch
+    assert index.changed_lines([fc]) == count_changed_lines([fc]) == 3
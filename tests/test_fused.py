@@ -0,0 +1,39 @@
+"""Tests for the fused small-PR review mode."""
+
+import pytest
+from agents.types import FusedReviewResult
+from agents.reviewers.fused import should_fuse
+
+
+class TestShouldFuse:
+    def test_small_pr_is_fused(self):
+        files = [{"path": f"f{i}.py"} for i in range(3)]
+        assert should_fuse(files, 40)
+
+    def test_large_pr_is_not_fused(self):
+        files = [{"path": f"f{i}.py"} for i in range(3)]
+        assert not should_fuse(files, 5000)
+        assert not should_fuse([{"path": f"f{i}.py"} for i in range(50)], 10)
+
+    def test_empty_pr_is_not_fused(self):
+        assert not should_fuse([], 0)
+
+
+class TestFusedReviewResult:
+    def test_split_names_each_agent(self):
+        fused = FusedReviewResult.model_validate_json(
+            '{"security": {"findings": [{"f": 0, "l": 3, "s": 0, "c": 0, "m": "SQLi", "x": null,'
+            ' "p": 0.9}], "summary": "1 issue"},'
+            ' "best_practices": {"findings": [], "summary": "ok"}}'
+        )
+        results = {r.agent_name: r for r in fused.split(["a.py"])}
+        assert set(results) == {
+            "security", "best_practices", "test_coverage", "dependency", "pr_description",
+        }
+        assert results["security"].comments[0].comment == "SQLi"
+        assert results["security"].comments[0].file_path == "a.py"
+        assert results["dependency"].comments == []
+
+    def test_wrong_shape_is_rejected(self):
+        with pytest.raises(ValueError):
+            FusedReviewResult.model_validate_json('{"agent_name": "x", "findings": []}')
@@ -0,0 +1,203 @@
+"""Tests for the shared LLM call layer."""
+
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage
+from agents.admission import AdmissionController
+from agents.llm import Hedger, UsageStats, hedged_send, parse_review_result
+from agents.prompts import build_review_messages
+
+
+class TestAdmissionController:
+    @pytest.mark.asyncio
+    async def test_admits_immediately_under_quota(self):
+        ctl = AdmissionController(tpm=1000, rpm=10, window=0.2)
+        await asyncio.wait_for(ctl.acquire(100), timeout=0.05)
+        await asyncio.wait_for(ctl.acquire(100), timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_waits_for_token_window(self):
+        ctl = AdmissionController(tpm=1000, rpm=10, window=0.2)
+        await ctl.acquire(900)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await ctl.acquire(200)
+        assert loop.time() - start >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_rpm_limit(self):
+        ctl = AdmissionController(tpm=10_000, rpm=2, window=0.2)
+        await ctl.acquire(1)
+        await ctl.acquire(1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(ctl.acquire(1), timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        ctl = AdmissionController(tpm=100, rpm=100, window=0.1)
+        await ctl.acquire(100)  # exhaust the window
+        order = []
+
+        async def call(name, priority):
+            await ctl.acquire(60, priority)
+            order.append(name)
+
+        low = asyncio.create_task(call("nit", 2))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(call("security", 0))
+        await asyncio.gather(low, high)
+        assert order == ["security", "nit"]
+
+    @pytest.mark.asyncio
+    async def test_oversized_call_runs_on_empty_window(self):
+        ctl = AdmissionController(tpm=100, rpm=10, window=0.2)
+        await asyncio.wait_for(ctl.acquire(5000), timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_reconcile_frees_overestimate(self):
+        ctl = AdmissionController(tpm=1000, rpm=10, window=5.0)
+        await ctl.acquire(900)
+        ctl.reconcile(900, 100)
+        await asyncio.wait_for(ctl.acquire(800), timeout=0.05)
+
+
+def _warm_hedger(max_rate=1.0, latency=0.02):
+    hedger = Hedger(percentile=0.9, max_rate=max_rate, min_samples=5)
+    for _ in range(10):
+        hedger.observe("security", latency)
+    return hedger
+
+
+class TestHedging:
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_fast_duplicate_wins(self):
+        hedger = _warm_hedger()
+        sent = []
+
+        async def send(publish):
+            sent.append(publish)
+            await asyncio.sleep(1.0 if publish else 0.01)
+            return AIMessage(content="hedge" if not publish else "primary")
+
+        ctl = AdmissionController(tpm=10_000, rpm=100)
+        resp = await asyncio.wait_for(hedged_send(send, "security", 100, ctl, hedger), timeout=0.5)
+        assert resp.content == "hedge"
+        assert sent == [True, False]
+        assert hedger.hedges == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        hedger = _warm_hedger(latency=0.5)
+
+        async def send(publish):
+            return AIMessage(content="primary")
+
+        resp = await hedged_send(send, "security", 100, AdmissionController(10_000, 100), hedger)
+        assert resp.content == "primary"
+        assert hedger.hedges == 0
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples_or_budget(self):
+        async def send(publish):
+            await asyncio.sleep(0.05)
+            return AIMessage(content="primary" if publish else "hedge")
+
+        cold = Hedger(min_samples=5)
+        assert cold.threshold("security") is None
+        resp = await hedged_send(send, "security", 100, AdmissionController(10_000, 100), cold)
+        assert resp.content == "primary"
+
+        capped = _warm_hedger(max_rate=0.0)
+        resp = await hedged_send(send, "security", 100, AdmissionController(10_000, 100), capped)
+        assert resp.content == "primary"
+        assert capped.hedges == 0
+
+    @pytest.mark.asyncio
+    async def test_primary_error_falls_back_to_hedge(self):
+        hedger = _warm_hedger()
+
+        async def send(publish):
+            if publish:
+                await asyncio.sleep(0.05)
+                raise RuntimeError("boom")
+            await asyncio.sleep(0.1)
+            return AIMessage(content="hedge")
+
+        resp = await hedged_send(send, "security", 100, AdmissionController(10_000, 100), hedger)
+        assert resp.content == "hedge"
+
+    def test_hedge_needs_spare_quota(self):
+        ctl = AdmissionController(tpm=1000, rpm=10)
+        assert ctl.try_acquire(900)
+        assert not ctl.try_acquire(200)
+
+
+class TestParseReviewResult:
+    def test_expands_compact_findings(self):
+        r = parse_review_result(
+            '{"findings": [{"f": 1, "l": 4, "s": 0, "c": 0, "m": "SQLi", "x": null, "p": 0.9}],'
+            ' "summary": "ok"}',
+            "security",
+            ["a.py", "b.py"],
+        )
+        assert r.summary == "ok"
+        assert r.error is None
+        c = r.comments[0]
+        assert (c.file_path, c.line_number, c.severity, c.category) == ("b.py", 4, "critical", "security")
+
+    def test_out_of_range_codes_are_clamped(self):
+        r = parse_review_result(
+            '{"findings": [{"f": 9, "s": 7, "c": 42, "m": "x", "p": 3}], "summary": ""}',
+            "best_practices",
+            ["a.py"],
+        )
+        c = r.comments[0]
+        assert (c.file_path, c.severity, c.category, c.confidence) == ("", "nit", "best-practice", 1.0)
+
+    def test_invalid_json_sets_error(self):
+        r = parse_review_result("not json", "security", [])
+        assert r.agent_name == "security"
+        assert r.error
+
+
+class TestUsageStats:
+    def test_records_cached_tokens(self):
+        stats = UsageStats()
+        resp = AIMessage(
+            content="{}",
+            usage_metadata={
+                "input_tokens": 2000,
+                "output_tokens": 100,
+                "total_tokens": 2100,
+                "input_token_details": {"cache_read": 1536},
+            },
+        )
+        stats.record("security", resp, 1.5)
+        assert stats.calls == 1
+        assert stats.cached_tokens == 1536
+        assert stats.by_agent["security"]["output_tokens"] == 100
+        assert "77%" in stats.render()
+
+    def test_reports_hedge_cost(self):
+        stats = UsageStats()
+        stats.record_hedge(1500)
+        assert stats.hedges == 1
+        assert "1 hedged (~1500 extra tokens)" in stats.render()
+
+    def test_missing_usage(self):
+        stats = UsageStats()
+        stats.record("security", AIMessage(content="{}"), 0.1)
+        assert stats.input_tokens == 0
+        assert stats.cache_hit_rate == 0.0
+
+
+class TestPromptLayout:
+    def test_shared_prefix_across_chunks_and_agents(self):
+        meta = {"title": "Fix login", "description": "Fixes redirect"}
+        a = build_review_messages("SECURITY PROMPT", meta, "diff of chunk 1")
+        b = build_review_messages("SECURITY PROMPT", meta, "diff of chunk 2")
+        c = build_review_messages("DEPENDENCY PROMPT", meta, "diff of chunk 1")
+        assert a[0].content == b[0].content == c[0].content
+        assert "Fix login" in a[0].content
+        assert a[1].content == b[1].content
+        assert a[-1].content == "diff of chunk 1"
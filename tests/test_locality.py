@@ -0,0 +1,52 @@
+"""Tests for file relationships and locality-aware chunking."""
+
+from agents.chunker import plan_chunks
+from agents.locality import file_clusters
+
+
+def _fc(path, after="", change_type="edit"):
+    return {"path": path, "change_type": change_type, "before": "", "after": after}
+
+
+def test_imports_and_tests_cluster_together():
+    files = [
+        _fc("web/components/Button.tsx", "import { useButton } from '../hooks/useButton'\n"),
+        _fc("web/hooks/useButton.ts", "import React from 'react'\nexport const useButton = () => 1\n"),
+        _fc("web/components/Button.test.tsx", "import { render } from '@testing-library/react'\n"),
+        _fc("web/pages/home.tsx", "const cfg = require('@/lib/config')\n"),
+        _fc("src/lib/config.js", "module.exports = {}\n"),
+        _fc("api/app/views.py", "from .models import Order\nfrom app.services import billing\n"),
+        _fc("api/app/models.py", "import decimal\n"),
+        _fc("api/app/services/billing.py", ""),
+        _fc("api/tests/test_views.py", "import pytest\n"),
+        _fc("docs/README.md", "import the thing from './Button'\n"),
+    ]
+    clusters = file_clusters(files)
+
+    def same(*paths):
+        return len({clusters[p] for p in paths}) == 1
+
+    assert same("web/components/Button.tsx", "web/hooks/useButton.ts", "web/components/Button.test.tsx")
+    assert same("web/pages/home.tsx", "src/lib/config.js")
+    assert same("api/app/views.py", "api/app/models.py", "api/app/services/billing.py", "api/tests/test_views.py")
+    assert len(set(clusters.values())) == 4
+    assert clusters == file_clusters(list(reversed(files)))
+
+
+def test_locality_chunks_keep_clusters_together():
+    body = "value = 1\n" * 120
+    files = []
+    for feature in ("alpha", "beta", "gamma", "delta"):
+        files += [
+            _fc(f"src/{feature}/view.py", f"from .{feature}_model import Model\n" + body, "add"),
+            _fc(f"src/{feature}/{feature}_model.py", body, "add"),
+            _fc(f"tests/test_{feature}_model.py", body, "add"),
+        ]
+    budget = 2_000
+    clusters = file_clusters(files)
+
+    locality = plan_chunks(files, budget, mode="locality")
+    assert all(len({clusters[f["path"]] for f in chunk}) == 1 for chunk in locality.chunks)
+    packed = plan_chunks(files, budget, mode="packed")
+    assert len(locality.chunks) == len(packed.chunks)
+    assert any(len({clusters[f["path"]] for f in chunk}) > 1 for chunk in packed.chunks)
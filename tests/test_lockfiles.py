@@ -0,0 +1,133 @@
+"""Tests for lockfile parsing and dependency delta tables."""
+
+import json
+
+from agents.compiler import compile_prompt
+from agents.lockfiles import dependency_delta, delta_table, parse_lockfile
+
+YARN_BEFORE = '''# yarn lockfile v1
+
+"@babel/core@^7.0.0", "@babel/core@^7.1.0":
+  version "7.1.0"
+  resolved "https://registry.yarnpkg.com/@babel/core/-/core-7.1.0.tgz"
+
+left-pad@^1.0.0:
+  version "1.3.0"
+'''
+YARN_AFTER = '''# yarn lockfile v1
+
+"@babel/core@^7.0.0", "@babel/core@^7.1.0":
+  version "7.2.0"
+  resolved "https://registry.yarnpkg.com/@babel/core/-/core-7.2.0.tgz"
+
+lodash@^4.17.21:
+  version "4.17.21"
+'''
+
+
+def _npm(packages: dict) -> str:
+    body = {"": {"name": "app"}}
+    body.update({f"node_modules/{k}": {"version": v} for k, v in packages.items()})
+    return json.dumps({"lockfileVersion": 3, "packages": body}, indent=2)
+
+
+def test_parsers():
+    assert parse_lockfile("yarn.lock", YARN_AFTER) == {"@babel/core": {"7.2.0": 3}, "lodash": {"4.17.21": 7}}
+    berry = '__metadata:\n  version: 6\n\n"react@npm:^18.2.0":\n  version: 18.2.0\n'
+    assert parse_lockfile("yarn.lock", berry) == {"react": {"18.2.0": 4}}
+    npm = parse_lockfile("package-lock.json", _npm({"a": "1.0.0", "a/node_modules/b": "2.0.0"}))
+    assert set(npm) == {"a", "b"} and set(npm["b"]) == {"2.0.0"}
+    npm_v1 = json.dumps({"dependencies": {"a": {"version": "1.0.0", "dependencies": {"b": {"version": "2.0.0"}}}}})
+    assert {k: set(v) for k, v in parse_lockfile("package-lock.json", npm_v1).items()} == {"a": {"1.0.0"}, "b": {"2.0.0"}}
+    cargo = '[[package]]\nname = "serde"\nversion = "1.0.1"\n\n[[package]]\nname = "serde"\nversion = "0.9.0"\n'
+    assert parse_lockfile("Cargo.lock", cargo) == {"serde": {"1.0.1": 2, "0.9.0": 6}}
+    pnpm = "lockfileVersion: '9.0'\n\npackages:\n\n  react@18.2.0:\n    resolution: {}\n\n  '@types/node@20.1.0(x@1.0.0)':\n    resolution: {}\n"
+    assert parse_lockfile("pnpm-lock.yaml", pnpm) == {"react": {"18.2.0": 5}, "@types/node": {"20.1.0": 8}}
+    go_sum = "golang.org/x/net v0.17.0 h1:abc=\ngolang.org/x/net v0.17.0/go.mod h1:def=\n"
+    assert parse_lockfile("go.sum", go_sum) == {"golang.org/x/net": {"v0.17.0": 1}}
+    gems = "GEM\n  specs:\n    rack (3.0.8)\n      base64 (>= 0)\n"
+    assert parse_lockfile("Gemfile.lock", gems) == {"rack": {"3.0.8": 3}}
+    assert parse_lockfile("package-lock.json", "<<<<<<< HEAD\n") is None
+
+
+def test_delta_classifies_changes():
+    before = {"a": {"1.0.0": 0}, "b": {"2.0.0": 0}, "c": {"1.10.0": 0}, "d": {"1.0.0": 0, "2.0.0": 0}}
+    after = {"a": {"1.2.0": 5}, "c": {"1.9.0": 9}, "d": {"2.0.0": 0}, "e": {"0.1.0": 12}}
+    assert [(c.package, c.change, c.old, c.new, c.line) for c in dependency_delta(before, after)] == [
+        ("a", "upgraded", "1.0.0", "1.2.0", 5),
+        ("b", "removed", "2.0.0", "", 0),
+        ("c", "downgraded", "1.10.0", "1.9.0", 9),
+        ("d", "changed", "1.0.0, 2.0.0", "2.0.0", 0),
+        ("e", "added", "", "0.1.0", 12),
+    ]
+
+
+def test_lockfile_renders_as_table_except_for_security():
+    fc = {"path": "web/yarn.lock", "change_type": "edit", "before": YARN_BEFORE, "after": YARN_AFTER}
+    table = delta_table(fc)
+    assert table.startswith("Dependency delta (1 added, 1 removed, 1 upgraded):")
+    assert "| @babel/core | upgraded | 7.1.0 | 7.2.0 | 3 |" in table
+    assert "| left-pad | removed | 1.3.0 | - |  |" in table
+    for agent in ("dependency", "best_practices", "fused"):
+        text = compile_prompt(agent, [fc]).text
+        assert "LOCKFILE" in text and "resolved" not in text
+    text = compile_prompt("security", [fc]).text
+    assert "LOCKFILE" not in text and "+  resolved" in text
+
+    # Without the old version (patch only), the diff is kept
+    assert delta_table(dict(fc, before="")) is None
+    assert delta_table({"path": "yarn.lock", "change_type": "add", "after": YARN_AFTER}).startswith(
+        "Dependency delta (2 added):"
+    )
+
+
+def test_source_only_lockfile_change_is_reported():
+    before = {"": {"name": "app"}, "node_modules/a": {
+        "version": "1.0.0",
+        "resolved": "https://registry.npmjs.org/a/-/a-1.0.0.tgz",
+        "integrity": "sha512-good",
+    }}
+    after = {"": {"name": "app"}, "node_modules/a": {
+        "version": "1.0.0",
+        "resolved": "https://evil.example.com/a-1.0.0.tgz",
+        "integrity": "sha512-evil",
+    }}
+    fc = {
+        "path": "package-lock.json",
+        "change_type": "edit",
+        "before": json.dumps({"lockfileVersion": 3, "packages": before}, indent=2),
+        "after": json.dumps({"lockfileVersion": 3, "packages": after}, indent=2),
+    }
+    assert "| a | source changed | 1.0.0 |" in delta_table(fc)
+    text = compile_prompt("dependency", [fc]).text
+    assert "evil.example.com" in text and "sha512-evil" in text
+
+
+def test_source_change_next_to_a_version_bump_gets_its_own_row():
+    def lock(left_pad: dict, lodash: str) -> str:
+        return json.dumps({"lockfileVersion": 3, "packages": {
+            "": {"name": "app"},
+            "node_modules/left-pad": {"version": "1.3.0", **left_pad},
+            "node_modules/lodash": {
+                "version": lodash,
+                "resolved": f"https://registry.npmjs.org/lodash/-/lodash-{lodash}.tgz",
+                "integrity": f"sha512-{lodash}",
+            },
+        }}, indent=2)
+
+    fc = {
+        "path": "package-lock.json",
+        "change_type": "edit",
+        "before": lock({"resolved": "https://registry.npmjs.org/left-pad/-/left-pad-1.3.0.tgz",
+                        "integrity": "sha512-GOOD"}, "4.17.20"),
+        "after": lock({"resolved": "https://evil.example.com/left-pad-1.3.0.tgz",
+                       "integrity": "sha512-EVIL"}, "4.17.21"),
+    }
+    table = delta_table(fc)
+    assert table.startswith("Dependency delta (1 source changed, 1 upgraded):")
+    assert (
+        '| left-pad | source changed | 1.3.0 | 1.3.0: "resolved": "https://evil.example.com/left-pad-1.3.0.tgz", '
+        '"integrity": "sha512-EVIL" | 7 |'
+    ) in table
+    assert "| lodash | upgraded | 4.17.20 | 4.17.21 | 12 |" in table
+    assert "evil.example.com" in compile_prompt("dependency", [fc]).text
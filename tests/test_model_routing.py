@@ -0,0 +1,55 @@
+"""Tests for per-agent model routing and confidence-based escalation."""
+
+import json
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agents.llm as llm
+from agents.model_routing import needs_escalation, select_model
+from config import GPT_MODEL, SMALL_MODEL, SMALL_MODEL_MAX_TOKENS
+
+
+def _response(*findings):
+    return json.dumps({"findings": list(findings), "summary": ""})
+
+
+class TestSelectModel:
+    def test_light_agents_use_small_model(self):
+        for agent in ("pr_description", "test_coverage", "dependency"):
+            assert select_model(agent, prompt_tokens=1000) == SMALL_MODEL
+
+    def test_security_and_fused_use_large_model(self):
+        assert select_model("security", prompt_tokens=100) == GPT_MODEL
+        assert select_model("fused", prompt_tokens=100) == GPT_MODEL
+
+    def test_best_practices_by_category(self):
+        assert select_model("best_practices", "frontend", 1000) == SMALL_MODEL
+        assert select_model("best_practices", "backend", 1000) == GPT_MODEL
+
+    def test_large_prompt_uses_large_model(self):
+        assert select_model("pr_description", prompt_tokens=SMALL_MODEL_MAX_TOKENS + 1) == GPT_MODEL
+
+
+class TestEscalation:
+    def test_low_confidence_critical_escalates(self):
+        assert needs_escalation(_response({"s": 0, "p": 0.4, "m": "maybe SQLi"}))
+
+    def test_confident_or_minor_findings_do_not(self):
+        assert not needs_escalation(_response({"s": 0, "p": 0.95}, {"s": 2, "p": 0.2}))
+        assert not needs_escalation("")
+
+    @pytest.mark.asyncio
+    async def test_invoke_llm_rechecks_on_large_model(self, monkeypatch):
+        models = []
+
+        async def fake_call(messages, agent_name, file_paths, model, llm_kwargs, tokens):
+            models.append(model)
+            p = 0.4 if model == SMALL_MODEL else 0.9
+            return AIMessage(content=_response({"f": 0, "s": 0, "c": 6, "m": "bad dep", "p": p}))
+
+        monkeypatch.setattr(llm, "_call_model", fake_call)
+        stats = llm.track_usage()
+        resp = await llm.invoke_llm([HumanMessage(content="x")], "dependency", ["package.json"])
+        assert models == [SMALL_MODEL, GPT_MODEL]
+        assert stats.escalations == 1
+        assert json.loads(resp.content)["findings"][0]["p"] == 0.9
@@ -95,6 +95,169 @@ class TestGitHubProviderFileChanges:
             assert types == {"add", "edit", "delete", "rename"}
             await provider.close()
 
+    @pytest.mark.asyncio
+    async def test_patch_first_downloads_only_new_files(self):
+        with patch.dict("os.environ", {
+            "GITHUB_TOKEN": "test-token",
+            "GITHUB_OWNER": "owner",
+            "GITHUB_REPO": "repo",
+            "PLATFORM": "github",
+            "OPENAI_API_KEY": "test",
+            "PATCH_FIRST": "true",
+            "CONTEXT_MODE": "diff",
+        }):
+            import importlib
+            import config
+            importlib.reload(config)
+            import providers.github
+            importlib.reload(providers.github)
+
+            provider = providers.github.GitHubProvider()
+            files_data = [
+                {"filename": "new.py", "status": "added", "changes": 1, "patch": "@@ -0,0 +1 @@\n+x = 1"},
+                {"filename": "edit.py", "status": "modified", "changes": 2,
+                 "patch": "@@ -1,2 +1,2 @@\n a\n-b\n+c"},
+                {"filename": "moved.py", "status": "renamed", "changes": 0, "previous_filename": "orig.py"},
+                {"filename": "logo.png", "status": "modified", "changes": 0},
+            ]
+
+            async def mock_get_json(url, **params):
+                if "/files" not in url:
+                    return {"base": {"sha": "base123"}, "head": {"sha": "head456"}}
+                return files_data
+
+            provider._get_json = mock_get_json
+            provider._fetch_file = AsyncMock(return_value="content")
+
+            new, edit, moved, binary = await provider.get_file_changes(1)
+            fetched = [c.args for c in provider._fetch_file.await_args_list]
+            assert fetched == [("new.py", "head456")]
+            assert new.after == "content"
+            assert edit.patch.endswith("+c") and edit.before == edit.after == ""
+            assert moved.patch == "" and binary.patch == ""
+            await provider.close()
+
+    @pytest.mark.asyncio
+    async def test_scope_context_fetches_new_version_of_edited_code(self):
+        with patch.dict("os.environ", {
+            "GITHUB_TOKEN": "test-token",
+            "GITHUB_OWNER": "owner",
+            "GITHUB_REPO": "repo",
+            "PLATFORM": "github",
+            "OPENAI_API_KEY": "test",
+            "PATCH_FIRST": "true",
+            "CONTEXT_MODE": "scope",
+        }):
+            import importlib
+            import config
+            importlib.reload(config)
+            import providers.github
+            importlib.reload(providers.github)
+
+            provider = providers.github.GitHubProvider()
+            files_data = [
+                {"filename": "edit.py", "status": "modified", "changes": 2,
+                 "patch": "@@ -1,2 +1,2 @@\n a\n-b\n+c"},
+                {"filename": "notes.md", "status": "modified", "changes": 2,
+                 "patch": "@@ -1 +1 @@\n-a\n+b"},
+            ]
+
+            async def mock_get_json(url, **params):
+                if "/files" not in url:
+                    return {"base": {"sha": "base123"}, "head": {"sha": "head456"}}
+                return files_data
+
+            provider._get_json = mock_get_json
+            provider._fetch_file = AsyncMock(return_value="content")
+
+            edit, notes = await provider.get_file_changes(1)
+            fetched = [c.args for c in provider._fetch_file.await_args_list]
+            assert fetched == [("edit.py", "head456")]
+            assert edit.after == "content" and edit.before == "" and edit.patch
+            await provider.close()
+
+    @pytest.mark.asyncio
+    async def test_patch_first_fetches_both_versions_of_lockfiles(self):
+        with patch.dict("os.environ", {
+            "GITHUB_TOKEN": "test-token",
+            "GITHUB_OWNER": "owner",
+            "GITHUB_REPO": "repo",
+            "PLATFORM": "github",
+            "OPENAI_API_KEY": "test",
+            "PATCH_FIRST": "true",
+            "CONTEXT_MODE": "diff",
+        }):
+            import importlib
+            import config
+            importlib.reload(config)
+            import providers.github
+            importlib.reload(providers.github)
+
+            provider = providers.github.GitHubProvider()
+            files_data = [
+                {"filename": "web/yarn.lock", "status": "modified", "changes": 2,
+                 "patch": '@@ -2 +2 @@\n-  version "1.0.0"\n+  version "1.1.0"'},
+                {"filename": "web/package.json", "status": "modified", "changes": 2,
+                 "patch": '@@ -2 +2 @@\n-"a": "1.0.0"\n+"a": "1.1.0"'},
+            ]
+
+            async def mock_get_json(url, **params):
+                if "/files" not in url:
+                    return {"base": {"sha": "base123"}, "head": {"sha": "head456"}}
+                return files_data
+
+            provider._get_json = mock_get_json
+            provider._fetch_file = AsyncMock(return_value="content")
+
+            lock, manifest = await provider.get_file_changes(1)
+            fetched = [c.args for c in provider._fetch_file.await_args_list]
+            assert fetched == [("web/yarn.lock", "base123"), ("web/yarn.lock", "head456")]
+            assert lock.before == lock.after == "content" and lock.patch
+            assert manifest.before == manifest.after == ""
+            await provider.close()
+
+    @pytest.mark.asyncio
+    async def test_patch_first_fetches_old_version_of_deleted_code(self):
+        with patch.dict("os.environ", {
+            "GITHUB_TOKEN": "test-token",
+            "GITHUB_OWNER": "owner",
+            "GITHUB_REPO": "repo",
+            "PLATFORM": "github",
+            "OPENAI_API_KEY": "test",
+            "PATCH_FIRST": "true",
+            "CONTEXT_MODE": "diff",
+        }):
+            import importlib
+            import config
+            importlib.reload(config)
+            import providers.github
+            importlib.reload(providers.github)
+            import dataclasses
+            from agents.compiler import compile_prompt
+
+            provider = providers.github.GitHubProvider()
+            files_data = [
+                {"filename": "app/gone.py", "status": "removed", "changes": 4,
+                 "patch": "@@ -1,4 +0,0 @@\n-def run(x):\n-    return x\n-\n-LIMIT = 3"},
+                {"filename": "notes.md", "status": "removed", "changes": 1, "patch": "@@ -1 +0,0 @@\n-a"},
+            ]
+
+            async def mock_get_json(url, **params):
+                if "/files" not in url:
+                    return {"base": {"sha": "base123"}, "head": {"sha": "head456"}}
+                return files_data
+
+            provider._get_json = mock_get_json
+            provider._fetch_file = AsyncMock(return_value="def run(x):\n    return x\n\nLIMIT = 3\n")
+
+            gone, notes = await provider.get_file_changes(1)
+            fetched = [c.args for c in provider._fetch_file.await_args_list]
+            assert fetched == [("app/gone.py", "base123")]
+            assert gone.before.startswith("def run") and notes.before == ""
+            text = compile_prompt("best_practices", [dataclasses.asdict(gone)]).text
+            assert "Removed definitions" in text and "def run(x)" in text
+            await provider.close()
+
 
 # ── Synthesizer Integration (no mocking needed) ────────────────────
 
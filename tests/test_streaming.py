@@ -0,0 +1,59 @@
+"""Tests for incremental parsing of streamed reviewer responses."""
+
+import json
+import pytest
+from agents.streaming import IncrementalFindingsParser, salvage_comments
+
+PATHS = ["a.py", "b.py"]
+RESPONSE = json.dumps({
+    "findings": [
+        {"f": 0, "l": 3, "s": 0, "c": 0, "m": "uses {braces} and \"quotes\"", "x": None, "p": 0.9},
+        {"f": 1, "l": 7, "s": 2, "c": 0, "m": "second", "x": None, "p": 0.6},
+    ],
+    "summary": "two issues",
+})
+
+
+class TestIncrementalFindingsParser:
+    def test_emits_each_finding_when_it_closes(self):
+        parser = IncrementalFindingsParser()
+        emitted = []
+        for i in range(0, len(RESPONSE), 7):
+            emitted.append(len(parser.feed(RESPONSE[i:i + 7])))
+        assert sum(emitted) == 2
+        # the first finding is available before the stream finishes
+        first = next(i for i, n in enumerate(emitted) if n)
+        assert first < len(emitted) - 1
+        assert parser.findings[0][1]["m"] == 'uses {braces} and "quotes"'
+        assert parser.findings[0][0] is None
+
+    def test_fused_sections(self):
+        text = json.dumps({
+            "security": {"findings": [{"m": "s"}], "summary": ""},
+            "best_practices": {"findings": [{"m": "b"}], "summary": ""},
+        })
+        found = IncrementalFindingsParser().feed(text)
+        assert [(sec, obj["m"]) for sec, obj in found] == [
+            ("security", "s"), ("best_practices", "b"),
+        ]
+
+    def test_ignores_code_fence(self):
+        found = IncrementalFindingsParser().feed("```json\n" + RESPONSE + "\n```")
+        assert len(found) == 2
+
+
+class TestSalvageComments:
+    def test_truncated_response_keeps_complete_findings(self):
+        cut = RESPONSE[: RESPONSE.index('"second"')]
+        comments = salvage_comments(cut, PATHS)
+        assert len(comments) == 1
+        assert comments[0].file_path == "a.py"
+        assert comments[0].severity == "critical"
+
+    def test_parse_review_result_salvages(self):
+        from agents.llm import parse_review_result
+        cut = RESPONSE[: RESPONSE.index('"summary"')]
+        result = parse_review_result(cut, "security", PATHS)
+        assert len(result.comments) == 2
+        assert result.comments[1].file_path == "b.py"
+        assert result.error
@@ -0,0 +1,19 @@
+"""Tests for whitespace-only change detection."""
+
+from agents.syntax import indentation_matters, line_tokens, whitespace_only
+
+
+def test_string_literals_are_single_tokens():
+    assert line_tokens('run("rm -rf /tmp", shell=True)  # it\'s  fine') == [
+        "run(", '"rm -rf /tmp"', ",", "shell=True)", "#", "it", "'s  fine",
+    ]
+
+
+def test_whitespace_only():
+    assert whitespace_only(["x = f(a,  b)"], ["x = f(a, b)"], "app.js")
+    assert whitespace_only(["  if (x) {"], ["    if (x) {"], "app.js")
+    assert not whitespace_only(["  if x:"], ["    if x:"], "app.py")
+    assert not whitespace_only(['run("rm -rf /tmp/build")'], ['run("rm -rf / tmp/build")'], "app.js")
+    assert not whitespace_only(["a()", "b()"], ["b()"], "app.js")
+    assert not whitespace_only(["b()"], ["b()"], "app.js")  # moved, not reformatted
+    assert indentation_matters("Makefile") and not indentation_matters("main.go")
@@ -89,3 +89,9 @@ class TestSynthesize:
         assert "MAJOR" in md
         assert "issue found" in md
         assert "agent summary" in md
+
+    def test_notes_listed_under_review_scope(self):
+        result = ReviewResult(agent_name="test", comments=[], summary="ok")
+        _, md = synthesize([result], 100, notes=["Triage skipped security 3/10 hunks"])
+        assert "### Review Scope" in md
+        assert "security 3/10 hunks" in md
@@ -0,0 +1,40 @@
+"""Tests for the calibrated token estimator."""
+
+from agents.tokens import TokenEstimator, language_for, raw_count
+
+
+def test_non_ascii_counts_per_character():
+    assert raw_count("数据库连接失败") >= 7
+    assert raw_count("naïve café") > raw_count("naive cafe")
+
+
+def test_raw_counts_are_memoised():
+    text = "def memo_probe(x):\n    return x * 2\n"
+    raw_count.cache_clear()
+    raw_count(text)
+    raw_count(text)
+    assert raw_count.cache_info().hits == 1
+
+
+def test_recalibrates_per_language_from_usage():
+    est = TokenEstimator(None)
+    code = "def f(a, b):\n    return a + b\n" * 10
+    base = est.estimate(code, "python")
+    for _ in range(10):
+        est.observe(raw_count(code), raw_count(code) * 3 // 2, {"python"})
+    assert est.estimate(code, "python") > base * 1.3
+    assert est.estimate(code, "markdown") > base  # unseen language uses the global scale
+    est.observe(100, 10_000, {"python"})  # outliers are clamped
+    assert est.scale("python") <= 2.0
+
+
+def test_calibration_persists(tmp_path):
+    path = str(tmp_path / "cal.json")
+    est = TokenEstimator(path)
+    for _ in range(3):
+        est.observe(100, 150, {"go"})
+    assert TokenEstimator(path).scales == {}  # observe never writes; the review flushes at its end
+    est.flush()
+    assert abs(TokenEstimator(path).scale("go") - est.scale("go")) < 1e-9
+    assert language_for("cmd/main.go") == "go" and language_for("Makefile") == ""
+
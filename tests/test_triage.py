@@ -0,0 +1,101 @@
+"""Tests for the heuristic triage pass."""
+
+from agents.triage import Triage, is_mechanical, score_hunk, split_hunks
+from utils import make_diff
+
+FILLER = "".join(f"x{i} = {i}\n" for i in range(20))
+
+
+def _fc(before, after, path="app/service.py"):
+    return {"path": path, "change_type": "edit", "before": before, "after": after}
+
+
+class TestMechanicalHunks:
+    def test_imports_formatting_reorder_rename_and_bumps(self):
+        assert is_mechanical(["import os"], ["import os", "import sys"])
+        assert is_mechanical(["x = f(a,  b)"], ["x = f(a, b)"])
+        assert is_mechanical(["a = 1", "b = 2"], ["b = 2", "a = 1"])
+        assert is_mechanical(["total = count + 1", "return count"], ["total = n + 1", "return n"])
+        assert is_mechanical(['"version": "1.2.3"'], ['"version": "1.3.0"'], "package.json")
+        assert is_mechanical(["    version: 1.2.3"], ["    version: 1.4.0"], "deploy/app.yaml")
+
+    def test_logic_change_is_not_mechanical(self):
+        assert not is_mechanical(["if user.is_admin:"], ["if user.is_admin or debug:"])
+
+    def test_dedent_is_formatting_only_where_indentation_is_not_syntax(self):
+        assert not is_mechanical(["    delete_item(item)"], ["delete_item(item)"], "app/views.py")
+        assert not is_mechanical(["        x = 1"], ["    x = 1"], "app/views.py")
+        assert not is_mechanical(["  debug: true"], ["debug: true"], "config.yaml")
+        assert is_mechanical(["    deleteItem(item);"], ["deleteItem(item);"], "app/views.js")
+
+    def test_whitespace_inside_tokens_and_strings_is_not_formatting(self):
+        for path in ("deploy.js", "deploy.py"):
+            assert not is_mechanical(['run("rm -rf /tmp/build")'], ['run("rm -rf / tmp/build")'], path)
+            assert not is_mechanical(["q = 'x y'"], ["q = 'xy'"], path)
+            assert not is_mechanical(["ok = a in b"], ["ok = ain b"], path)
+
+    def test_reordered_statements_are_not_mechanical(self):
+        removed = ["ensure_owner(user, item)", "delete_item(item)"]
+        assert not is_mechanical(removed, removed[::-1], "app/views.py")
+        assert not is_mechanical(["    delete_item(item)"], ["    delete_item(item)"], "app/views.py")  # moved line
+        assert is_mechanical(["A = 1", "B = 2"], ["B = 2", "A = 1"], "app/views.py")
+
+    def test_number_changes_outside_version_strings_are_not_mechanical(self):
+        assert not is_mechanical(["for i in range(n - 1):"], ["for i in range(n - 2):"], "app/loop.py")
+        assert not is_mechanical(["timeout=30,"], ["timeout=0,"], "app/client.py")
+        assert not is_mechanical(["timeout: 30"], ["timeout: 0"], "config.yaml")
+        assert not is_mechanical(["MAX_BODY = 1024 * 1024"], ["MAX_BODY = 64 * 1024 * 1024"], "app/limits.py")
+        assert not is_mechanical(['__version__ = "1.2.3"'], ['__version__ = "1.3.0"'], "app/__init__.py")
+
+    def test_single_identifier_swap_is_not_a_rename(self):
+        assert not is_mechanical(
+            ["total = price * qty", "return (total)"], ["total = price * discount", "return total"], "app/cart.py"
+        )
+        assert not is_mechanical(
+            ["total = price * qty", "log(qty)"], ["total = price * discount", "log(discount)"][::-1], "app/cart.py"
+        )
+        assert not is_mechanical(["f(qty, qty)", "g(qty)"], ["f(qty, n)", "g(n)"], "app/cart.py")
+
+
+class TestScoreHunk:
+    def test_security_sensitive_hunk_scores_high(self):
+        hunk = "@@ -1,1 +1,1 @@\n-x = 1\n+data = pickle.loads(body)\n"
+        assert score_hunk(hunk, "security") == 1.0
+
+    def test_moved_authorization_check_is_reviewed(self):
+        before = "def drop(item):\n    ensure_owner(user, item)\n    delete_item(item)\n"
+        after = "def drop(item):\n    delete_item(item)\n    ensure_owner(user, item)\n"
+        [hunk] = split_hunks(make_diff(before, after, "app/views.py"))[1]
+        assert score_hunk(hunk, "security", "app/views.py") >= 0.4
+        assert score_hunk(hunk, "best_practices", "app/views.py") >= 0.5
+
+    def test_comment_only_hunk_scores_low(self):
+        hunk = "@@ -1,1 +1,1 @@\n-# old wording\n+# new wording here\n"
+        assert score_hunk(hunk, "security") < 0.3
+        assert score_hunk(hunk, "best_practices") < 0.3
+
+
+class TestTriage:
+    def test_keeps_only_review_worthy_hunks(self):
+        before = "import os\n" + FILLER + "def f(a):\n    return a\n"
+        after = "import os\nimport sys\n" + FILLER + "def f(a):\n    return a * 2 if a else None\n"
+        diff = make_diff(before, after, "app/service.py")
+        assert len(split_hunks(diff)[1]) == 2
+
+        triage = Triage(threshold=0.3)
+        [kept] = triage.filter([_fc(before, after)], "best_practices")
+        assert "import sys" not in kept["diff"]
+        assert "return a * 2" in kept["diff"]
+        assert "app/service.py" in kept["diff"]  # file header kept
+        assert triage.counts["best_practices"].skipped_hunks == 1
+
+    def test_drops_fully_mechanical_files_and_reports(self):
+        triage = Triage(threshold=0.3)
+        kept = triage.filter([_fc("import os\n", "import os\nimport re\n")], "security")
+        assert kept == []
+        assert "security 1/1 hunks (1 file(s) entirely)" in triage.render()
+
+    def test_untouched_files_pass_through(self):
+        fc = _fc("a = 1\n", "a = compute()\n")
+        assert Triage(threshold=0.3).filter([fc], "best_practices") == [fc]
+        assert Triage(threshold=0.3).render() == ""
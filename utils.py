@@ -1,6 +1,7 @@
 """Shared helper functions."""
 
-import difflib
+from agents.diff_engine import get_opcodes, unified_hunks
+from agents.diff_index import parse_patch
 from agents.types import ReviewComment
 
 
@@ -8,24 +9,36 @@ def make_diff(before: str, after: str, path: str) -> str:
     """Return a unified diff string for two code versions of a given path."""
     before_lines = before.splitlines(keepends=True)
     after_lines = after.splitlines(keepends=True)
-    diff_lines = difflib.unified_diff(
-        before_lines,
-        after_lines,
-        fromfile=f"a/{path}",
-        tofile=f"b/{path}",
-        lineterm="",
-    )
-    return "".join(diff_lines)
+    hunks = unified_hunks(before_lines, after_lines, get_opcodes(before_lines, after_lines))
+    return f"--- a/{path}+++ b/{path}" + "".join(hunks) if hunks else ""
+
+
+def file_diff(fc: dict, diff_index=None) -> str:
+    """Diff to review for a file-change dict.
+
+    A precomputed ``"diff"`` (e.g. hunks kept by triage) takes precedence;
+    otherwise the review's ``DiffIndex`` is used if given, so each file is
+    diffed only once. Without one, a platform ``"patch"`` beats re-diffing.
+    """
+    if "diff" in fc:
+        return fc["diff"]
+    if diff_index is not None:
+        return diff_index.diff(fc)
+    if fc.get("patch") is not None:
+        return parse_patch(fc["patch"], fc["path"]).text
+    return make_diff(fc.get("before", ""), fc.get("after", ""), fc["path"])
 
 
 def count_changed_lines(file_changes: list) -> int:
     """Count total added + removed lines across all file changes."""
     total = 0
     for fc in file_changes:
+        if fc.get("patch") is not None:
+            total += parse_patch(fc["patch"], fc["path"]).changed
+            continue
         before_lines = fc.get("before", "").splitlines()
         after_lines = fc.get("after", "").splitlines()
-        sm = difflib.SequenceMatcher(None, before_lines, after_lines)
-        for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        for tag, i1, i2, j1, j2 in get_opcodes(before_lines, after_lines):
             if tag != "equal":
                 total += (i2 - i1) + (j2 - j1)
     return total